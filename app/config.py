@@ -28,6 +28,8 @@ class Settings(BaseSettings):
     CSRF_SECRET: str = "dev-csrf-secret-change-me-very-long-32-chars-min"
     ACCESS_TOKEN_EXPIRES_MIN: int = 1440
     MASTER_KEY: str = "dev-master-key-change-me-very-long-32-chars-min"
+    # Keys the stored share-link fingerprints; rotating it invalidates every share link
+    SHARE_HASH_KEY: str = "dev-share-hash-key-change-me-very-long-32-chars"
     # App
     APP_ENV: str = "development"
     CORS_ORIGINS: Union[str, List[str]] = "http://localhost:3000,http://127.0.0.1:3000"
@@ -39,6 +41,7 @@ class Settings(BaseSettings):
     # AI/ML
     EMBEDDINGS_PROVIDER: str = "phash"
     CLIP_MODEL: str = "clip-ViT-B-32"
+    YUNET_MODEL: str = "models/face_detection_yunet_2023mar.onnx"
     
     # Features
     ENABLE_GEOCODER: bool = True
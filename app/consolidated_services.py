@@ -21,7 +21,6 @@ from urllib.parse import urlencode
 import cv2
 import numpy as np
 import aiohttp
-import qrcode
 import secrets
 import string
 from PIL import Image
@@ -31,7 +30,6 @@ from argon2 import PasswordHasher
 from fastapi import HTTPException, UploadFile, Request, Depends, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.responses import Response
-from geopy.geocoders import Nominatim
 from prometheus_client import Counter, Histogram, generate_latest, CONTENT_TYPE_LATEST
 from cryptography.fernet import Fernet
 from tortoise import Tortoise
@@ -103,283 +101,8 @@ except ImportError:
 # ALBUM SERVICE
 # =============================================================================
 
-def _cosine_similarity(vec1: List[float], vec2: List[float]) -> float:
-    """Calculate cosine similarity between two vectors"""
-    if len(vec1) != len(vec2):
-        return 0.0
-    
-    dot_product = sum(a * b for a, b in zip(vec1, vec2))
-    norm1 = sum(a * a for a in vec1) ** 0.5
-    norm2 = sum(b * b for b in vec2) ** 0.5
-    
-    if norm1 == 0 or norm2 == 0:
-        return 0.0
-    
-    return dot_product / (norm1 * norm2)
-
-
-def _short_id(uuid_val) -> str:
-    """Generate short human-friendly ID from UUID"""
-    return str(uuid_val).split("-")[0].upper()
-
-
-class AlbumService:
-    """Service for automatic album generation and management"""
-    
-    @staticmethod
-    async def create_location_albums(user_id: str) -> List[Album]:
-        """Create albums based on location clustering"""
-        images = await ImageModel.filter(
-            user_id=user_id,
-            location_text__not_isnull=True
-        ).all()
-        
-        location_groups: Dict[str, List[ImageModel]] = {}
-        for img in images:
-            location = img.location_text or "Unknown"
-            if location not in location_groups:
-                location_groups[location] = []
-            location_groups[location].append(img)
-        
-        created_albums = []
-        for location, imgs in location_groups.items():
-            if len(imgs) >= 2:
-                existing = await Album.filter(
-                    user_id=user_id,
-                    location_text=location,
-                    is_auto_generated=True
-                ).first()
-                
-                if not existing:
-                    album = await Album.create(
-                        user_id=user_id,
-                        name=f"{location}",
-                        description=f"Photos from {location}",
-                        album_type="location",
-                        location_text=location,
-                        is_auto_generated=True,
-                        cover_image=imgs[0] if imgs else None
-                    )
-                    
-                    for img in imgs:
-                        await AlbumImage.create(album=album, image=img)
-                    
-                    created_albums.append(album)
-        
-        return created_albums
-    
-    @staticmethod
-    async def create_date_albums(user_id: str) -> List[Album]:
-        """Create albums based on date clustering"""
-        images = await ImageModel.filter(user_id=user_id).order_by("created_at").all()
-        
-        if not images:
-            return []
-        
-        date_groups: Dict[str, List[ImageModel]] = {}
-        current_group = []
-        current_date = None
-        
-        for img in images:
-            img_date = img.created_at.date()
-            
-            if current_date is None:
-                current_date = img_date
-                current_group = [img]
-            elif (img_date - current_date).days <= 7:
-                current_group.append(img)
-            else:
-                if len(current_group) >= 1:
-                    group_key = f"{current_date} to {current_group[-1].created_at.date()}"
-                    date_groups[group_key] = current_group.copy()
-                
-                current_date = img_date
-                current_group = [img]
-        
-        if len(current_group) >= 1:
-            group_key = f"{current_date} to {current_group[-1].created_at.date()}"
-            date_groups[group_key] = current_group
-        
-        created_albums = []
-        for date_range, imgs in date_groups.items():
-            existing = await Album.filter(
-                user_id=user_id,
-                name=date_range,
-                is_auto_generated=True
-            ).first()
-            
-            if not existing:
-                album = await Album.create(
-                    user_id=user_id,
-                    name=date_range,
-                    description=f"Photos from {date_range}",
-                    album_type="date",
-                    start_date=imgs[0].created_at.date(),
-                    end_date=imgs[-1].created_at.date(),
-                    is_auto_generated=True,
-                    cover_image=imgs[0] if imgs else None
-                )
-                
-                for img in imgs:
-                    await AlbumImage.create(album=album, image=img)
-                
-                created_albums.append(album)
-        
-        return created_albums
-    
-    @staticmethod
-    async def cluster_faces_by_similarity(user_id: str, similarity_threshold: float = 0.85) -> List[PersonCluster]:
-        """Cluster faces by similarity using embeddings"""
-        faces = await Face.filter(image__user_id=user_id).prefetch_related("image").all()
-        
-        if not faces:
-            return []
-        
-        face_embeddings = []
-        face_data = []
-        
-        for face in faces:
-            # Use per-face embeddings (not image-level)
-            if face.embedding_json:
-                face_embeddings.append(face.embedding_json)
-                face_data.append(face)
-        
-        if not face_embeddings:
-            return []
-        
-        clusters = []
-        used_faces = set()
-        
-        for i, embedding1 in enumerate(face_embeddings):
-            if i in used_faces:
-                continue
-            
-            cluster_faces = [face_data[i]]
-            used_faces.add(i)
-            
-            for j, embedding2 in enumerate(face_embeddings):
-                if j in used_faces or i == j:
-                    continue
-                
-                similarity = _cosine_similarity(embedding1, embedding2)
-                if similarity >= similarity_threshold:
-                    cluster_faces.append(face_data[j])
-                    used_faces.add(j)
-            
-            if len(cluster_faces) >= 2:
-                cluster = await PersonCluster.create(
-                    user_id=user_id,
-                    label=f"Person {len(clusters) + 1}"
-                )
-                
-                for face in cluster_faces:
-                    face.cluster = cluster
-                    await face.save()
-                
-                clusters.append(cluster)
-        
-        return clusters
-    
-    @staticmethod
-    async def create_person_albums(user_id: str) -> List[Album]:
-        """Create albums for each person cluster"""
-        clusters = await PersonCluster.filter(user_id=user_id).prefetch_related("faces__image").all()
-        
-        created_albums = []
-        for cluster in clusters:
-            images = list(set([face.image for face in cluster.faces]))
-            
-            if len(images) >= 2:
-                existing = await Album.filter(
-                    user_id=user_id,
-                    person_cluster=cluster,
-                    is_auto_generated=True
-                ).first()
-                
-                if not existing:
-                    album = await Album.create(
-                        user_id=user_id,
-                        name=f"{cluster.label}",
-                        description=f"Photos of {cluster.label}",
-                        album_type="person",
-                        person_cluster=cluster,
-                        is_auto_generated=True,
-                        cover_image=images[0] if images else None
-                    )
-                    
-                    for img in images:
-                        await AlbumImage.create(album=album, image=img)
-                    
-                    created_albums.append(album)
-        
-        return created_albums
-    
-    @staticmethod
-    async def auto_generate_all_albums(user_id: str) -> Dict[str, List[Album]]:
-        """Generate all types of albums automatically"""
-        results = {
-            "location_albums": await AlbumService.create_location_albums(user_id),
-            "date_albums": await AlbumService.create_date_albums(user_id),
-            "person_clusters": await AlbumService.cluster_faces_by_similarity(user_id),
-            "person_albums": []
-        }
-        
-        results["person_albums"] = await AlbumService.create_person_albums(user_id)
-        
-        return results
-
-    @staticmethod
-    async def create_top_n_person_albums(user_id: str, top_n: int = 10) -> List[Album]:
-        """
-        Pick top-N clusters by number of images and create 'person' albums
-        named like 'Person-<SHORTID>'. Skip if album exists.
-        Move encrypted files into person-specific folders.
-        """
-        import asyncio
-        
-        clusters = await PersonCluster.filter(user_id=user_id).prefetch_related("faces__image").all()
-        if not clusters:
-            return []
-
-        clist = []
-        for c in clusters:
-            imgs = list({f.image for f in c.faces if f.image is not None})
-            clist.append((c, imgs))
-
-        clist.sort(key=lambda t: len(t[1]), reverse=True)
-        top = clist[:top_n]
-
-        created = []
-        for idx, (cluster, images) in enumerate(top, start=1):
-            short = _short_id(cluster.id)
-            folder_name = f"person-{short}"
-            name = f"Person-{short}"
-            existing = await Album.filter(user_id=user_id, name=name, album_type="person").first()
-            if existing:
-                continue
-            album = await Album.create(
-                user_id=user_id,
-                name=name,
-                description=f"Auto person folder for cluster {cluster.id}",
-                album_type="person",
-                person_cluster=cluster,
-                is_auto_generated=True,
-                cover_image=images[0] if images else None,
-            )
-            for img in images:
-                await AlbumImage.create(album=album, image=img)
-                try:
-                    # Simplified storage handling - just keep the same key for now
-                    # if asyncio.iscoroutinefunction(storage.move_to_folder):
-                    #     new_key = await storage.move_to_folder(img.storage_key, folder_name)
-                    # else:
-                    #     new_key = storage.move_to_folder(img.storage_key, folder_name)
-                    # img.storage_key = new_key
-                    await img.save()
-                except Exception:
-                    pass
-            created.append(album)
-        return created
+# Single implementation lives in app.services.album_service
+from app.services.album_service import AlbumService, _cosine_similarity, _short_id  # noqa: E402,F401
 
 # =============================================================================
 # ALERTS SERVICE
@@ -535,9 +258,17 @@ async def cache_invalidate_prefix(prefix: str) -> int:
         return 0
     count = 0
     try:
-        for k in _client.scan_iter(f"{prefix}*"):
-            _client.delete(k)
-            count += 1
+        # One pipelined UNLINK batch per SCAN page instead of a DEL round-trip per key
+        cursor = 0
+        while True:
+            cursor, keys = _client.scan(cursor, match=f"{prefix}*", count=500)
+            if keys:
+                pipe = _client.pipeline(transaction=False)
+                for k in keys:
+                    pipe.unlink(k)
+                count += sum(pipe.execute())
+            if cursor == 0:
+                break
     except Exception:
         return 0
     return count
@@ -549,6 +280,13 @@ async def cache_invalidate_prefix(prefix: str) -> int:
 CDN_BASE_URL = os.getenv("CDN_BASE_URL", "")
 CDN_SIGNING_KEY = os.getenv("CDN_SIGNING_KEY", "")
 
+# Keyed BLAKE2b-128 URL signatures; keys longer than 64 bytes are hashed down
+_CDN_SIGNING_KEY = CDN_SIGNING_KEY.encode()
+if len(_CDN_SIGNING_KEY) > 64:
+    _CDN_SIGNING_KEY = hashlib.blake2b(_CDN_SIGNING_KEY).digest()
+# Pre-keyed template; copy() skips re-absorbing the key block per URL
+_CDN_SIGNER = hashlib.blake2b(key=_CDN_SIGNING_KEY, digest_size=16)
+
 
 def cdn_url(storage_key: str, *, expires_s: int = None, params: dict = None) -> str:
     """Generate CDN URL with optional signing"""
@@ -564,7 +302,9 @@ def cdn_url(storage_key: str, *, expires_s: int = None, params: dict = None) ->
     if expires_s and CDN_SIGNING_KEY:
         exp = int(time.time()) + int(expires_s)
         sig_payload = f"{path}{exp}".encode()
-        sig = hashlib.sha256(CDN_SIGNING_KEY.encode() + sig_payload).digest()
+        h = _CDN_SIGNER.copy()
+        h.update(sig_payload)
+        sig = h.digest()
         b64 = base64.urlsafe_b64encode(sig).decode().rstrip("=")
         query.update({"exp": str(exp), "sig": b64})
     
@@ -574,71 +314,19 @@ def cdn_url(storage_key: str, *, expires_s: int = None, params: dict = None) ->
 # COMPRESSION SERVICE
 # =============================================================================
 
-def compress_image_bytes(img_bytes: bytes, quality: int = 85, max_size: int = 1920) -> bytes:
-    """Compress and resize image bytes, keeping EXIF."""
-    with Image.open(io.BytesIO(img_bytes)) as im:
-        im_format = im.format
-        # Resize if needed
-        if max(im.size) > max_size:
-            scale = max_size / max(im.size)
-            new_size = (int(im.width * scale), int(im.height * scale))
-            im = im.resize(new_size, Image.LANCZOS)
-        buf = io.BytesIO()
-        im.save(buf, format=im_format, quality=quality, optimize=True)
-        return buf.getvalue()
+from app.services.compress import compress_image_bytes  # noqa: E402,F401
 
 # =============================================================================
 # DUPLICATE DETECTION SERVICE
 # =============================================================================
 
-def is_near_duplicate(phash_hex_a: str, phash_hex_b: str, threshold: int = 8) -> bool:
-    """
-    Check if two perceptual hashes represent near-duplicate images.
-    
-    Args:
-        phash_hex_a: First image's pHash as hex string
-        phash_hex_b: Second image's pHash as hex string  
-        threshold: Maximum Hamming distance to consider as duplicate (default: 8)
-    
-    Returns:
-        True if images are considered near-duplicates
-    """
-    if not phash_hex_a or not phash_hex_b:
-        return False
-    
-    try:
-        # Convert hex strings to integers
-        a, b = int(phash_hex_a, 16), int(phash_hex_b, 16)
-        
-        # Calculate Hamming distance (number of different bits)
-        hamming_distance = (a ^ b).bit_count()
-        
-        return hamming_distance <= threshold
-        
-    except (ValueError, TypeError):
-        # If conversion fails, assume not duplicate
-        return False
-
-
-def calculate_hamming_distance(phash_hex_a: str, phash_hex_b: str) -> int:
-    """
-    Calculate the exact Hamming distance between two pHash values.
-    
-    Args:
-        phash_hex_a: First image's pHash as hex string
-        phash_hex_b: Second image's pHash as hex string
-    
-    Returns:
-        Hamming distance (number of different bits)
-    """
-    if not phash_hex_a or not phash_hex_b:
-        return 64  # Maximum possible distance for 64-bit hash
-    
-    try:
-        a, b = int(phash_hex_a, 16), int(phash_hex_b, 16)
-        return (a ^ b).bit_count()
-    except (ValueError, TypeError):
-        return 64
+from app.services.duplicates import (  # noqa: E402,F401
+    is_near_duplicate,
+    calculate_hamming_distance,
+    pack_phashes,
+    hamming_distances,
+    find_near_duplicates,
+)
 
 # =============================================================================
 # EMBEDDINGS SERVICE
@@ -698,110 +386,41 @@ def get_image_embedding(img_bytes: bytes) -> List[np.ndarray]:
     return faces
 
 
-# Return 512-dim float32 vector (pad/trim as needed)
-def image_embedding(np_rgb: np.ndarray) -> np.ndarray:
-    global _model
-    if _ensure_clip():
-        vec = _model.encode(Image.fromarray(np_rgb), normalize_embeddings=True)
-        return vec.astype(np.float32)
-    # fallback: perceptual hash (phash)
-    import imagehash
-    img = Image.fromarray(np_rgb).convert("RGB")
-    ph = imagehash.phash(img)
-    bits = np.array([int(b) for b in bin(int(str(ph), 16))[2:].zfill(64)], dtype=np.float32)
-    if bits.shape[0] < 512:
-        bits = np.pad(bits, (0, 512 - bits.shape[0]))
-    return bits[:512].astype(np.float32)
-
-
-def text_embedding(query: str) -> np.ndarray:
-    global _model
-    if _ensure_clip():
-        vec = _model.encode(query, normalize_embeddings=True)
-        return vec.astype(np.float32)
-    # fallback: normalized digest vector
-    h = hashlib.sha256(query.lower().encode()).digest()
-    arr = np.frombuffer(h, dtype=np.uint8).astype(np.float32)
-    arr = (arr - arr.mean()) / (arr.std() + 1e-6)
-    if arr.shape[0] < 512:
-        arr = np.pad(arr, (0, 512 - arr.shape[0]))
-    return arr[:512]
+# Single implementation (batched CLIP encode, cached text queries) lives in
+# app.services.embeddings
+from app.services.embeddings import (  # noqa: E402,F401
+    image_embedding,
+    image_embedding_batch,
+    image_embedding_async,
+    text_embedding,
+)
 
 # =============================================================================
 # ENCRYPTION SERVICE
 # =============================================================================
 
-# MASTER_KEY protects per-user DEKs; images are encrypted with DEK.
-# Accept either a valid Fernet key or derive one deterministically from the provided string.
-_raw_key = settings.MASTER_KEY
-if isinstance(_raw_key, str):
-    _raw_key_bytes = _raw_key.encode()
-else:
-    _raw_key_bytes = _raw_key
-
-try:
-    _master = Fernet(_raw_key)  # try as-is
-except Exception:
-    # Derive a valid Fernet key from the provided value (deterministic)
-    digest = hashlib.sha256(_raw_key_bytes).digest()  # 32 bytes
-    derived_key = base64.urlsafe_b64encode(digest)
-    _master = Fernet(derived_key)
-
-
-def new_data_key() -> bytes:
-    return Fernet.generate_key()  # returns base64 urlsafe 32-byte key
-
-
-def wrap_dek(plain_key_b64: bytes) -> str:
-    return _master.encrypt(plain_key_b64).decode()
-
-
-def unwrap_dek(encrypted_b64: str) -> bytes:
-    return _master.decrypt(encrypted_b64.encode())
-
-
-def fernet_from_dek(dek_b64: bytes) -> Fernet:
-    return Fernet(dek_b64)
+# Single implementation lives in app.services.encryption (AES-GCM DEK wraps
+# with legacy Fernet reads)
+from app.services.encryption import (  # noqa: E402,F401
+    new_data_key,
+    wrap_dek,
+    unwrap_dek,
+    fernet_from_dek,
+    encrypt_blob,
+    decrypt_blob,
+)
 
 # =============================================================================
 # GEOCODING SERVICE
 # =============================================================================
 
-_geocoder = None
-if settings.ENABLE_GEOCODER and settings.GEOCODER_EMAIL:
-    _geocoder = Nominatim(user_agent=f"photovault/1 ({settings.GEOCODER_EMAIL})")
-
-
-async def reverse(lat: float, lng: float) -> str | None:
-    if not _geocoder:
-        return None
-    
-    try:
-        loc = _geocoder.reverse((lat, lng), language="en")
-        if loc and loc.raw and "address" in loc.raw:
-            a = loc.raw["address"]
-            # city or town or village, plus country short
-            city = a.get("city") or a.get("town") or a.get("village") or a.get("state")
-            cc = a.get("country_code", "").upper()
-            if city and cc:
-                return f"{city}, {cc}"
-            return loc.address
-    except Exception:
-        return None
-    
-    return None
+from app.services.geocode import reverse  # noqa: E402,F401
 
 # =============================================================================
 # JWT SERVICE
 # =============================================================================
 
-def create_jwt_token(data: dict, expires_in: int = 3600) -> str:
-    payload = data.copy()
-    payload["exp"] = int(time.time()) + expires_in
-    return jwt.encode(payload, settings.JWT_SECRET, algorithm="HS256")
-
-def decode_jwt_token(token: str) -> Dict[str, Any]:
-    return jwt.decode(token, settings.JWT_SECRET, algorithms=["HS256"])
+from app.services.jwt import create_jwt_token, decode_jwt_token  # noqa: E402,F401
 
 # =============================================================================
 # METRICS SERVICE
@@ -841,14 +460,7 @@ def record_share_viewed():
 # QR CODE SERVICE
 # =============================================================================
 
-def generate_qr_code(data: str) -> bytes:
-    qr = qrcode.QRCode(version=1, box_size=10, border=4)
-    qr.add_data(data)
-    qr.make(fit=True)
-    img = qr.make_image(fill="black", back_color="white")
-    buf = io.BytesIO()
-    img.save(buf, format="PNG")
-    return buf.getvalue()
+from app.services.qr import generate_qr_code, write_qr_png  # noqa: E402,F401
 
 # =============================================================================
 # QUEUE SERVICE
@@ -923,289 +535,37 @@ def get_secret(name: str) -> str:
 # SECURITY SERVICE
 # =============================================================================
 
-bearer = HTTPBearer()
-ph = PasswordHasher()
-
-
-class AuthUser:
-    def __init__(self, user_id: str, is_admin: bool = False):
-        self.user_id = user_id
-        self.is_admin = is_admin
-
-
-def create_token(user_id: str) -> str:
-    # Validate JWT secret
-    if not settings.JWT_SECRET or len(settings.JWT_SECRET.strip()) < 32:
-        raise ValueError("JWT_SECRET must be at least 32 characters long")
-    
-    # Use datetime.now() with UTC timezone instead of deprecated utcnow()
-    now = dt.datetime.now(dt.timezone.utc)
-    exp = now + dt.timedelta(minutes=settings.ACCESS_TOKEN_EXPIRES_MIN)
-    
-    payload = {
-        "sub": user_id,
-        "iat": int(now.timestamp()),
-        "exp": int(exp.timestamp())
-    }
-    
-    return jwt.encode(payload, settings.JWT_SECRET, algorithm="HS256")
-
-
-def verify_password(pw: str, pw_hash: str) -> bool:
-    try:
-        ph.verify(pw_hash, pw)
-        return True
-    except Exception:
-        return False
-
-
-def hash_password(pw: str) -> str:
-    return ph.hash(pw)
-
-
-async def require_user(creds: HTTPAuthorizationCredentials = Depends(bearer)) -> AuthUser:
-    if not creds or not creds.scheme.lower().startswith("bearer"):
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid auth")
-    
-    try:
-        payload = jwt.decode(
-            creds.credentials,
-            settings.JWT_SECRET,
-            algorithms=["HS256"],
-            options={"leeway": 30},  # 30s clock skew tolerance
-        )
-        user_id = str(payload["sub"])
-        db_user = await User.filter(id=user_id).first()
-        if not db_user:
-            raise HTTPException(status_code=401, detail="User not found")
-        return AuthUser(user_id, bool(db_user.is_admin))
-    except jwt.ExpiredSignatureError:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token expired")
-    except jwt.JWTError:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
-    except Exception:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
-
-
-# --- ADMIN GUARD ---
-async def require_admin(user: AuthUser = Depends(require_user)) -> AuthUser:
-    if not user.is_admin:
-        raise HTTPException(status_code=403, detail="Admin only")
-    return user
+from app.services.security import (  # noqa: E402,F401
+    bearer,
+    ph,
+    AuthUser,
+    create_token,
+    verify_password,
+    verify_password_async,
+    hash_password,
+    hash_password_async,
+    require_user,
+    require_admin,
+)
 
 
 # --- SHARE TOKENS (album-level) ---
-def create_share_token(user_id: str, album_id: str, hours: int = 72) -> str:
-    # Validate JWT secret
-    if not settings.JWT_SECRET or len(settings.JWT_SECRET.strip()) < 32:
-        raise ValueError("JWT_SECRET must be at least 32 characters long")
-    
-    now = dt.datetime.now(dt.timezone.utc)
-    exp = now + dt.timedelta(hours=hours)
-    payload = {
-        "typ": "share",
-        "sub": user_id,
-        "alb": album_id,
-        "iat": int(now.timestamp()),
-        "exp": int(exp.timestamp()),
-    }
-    return jwt.encode(payload, settings.JWT_SECRET, algorithm="HS256")
-
-
-def decode_share_token(token: str) -> dict:
-    # Validate JWT secret
-    if not settings.JWT_SECRET or len(settings.JWT_SECRET.strip()) < 32:
-        raise ValueError("JWT_SECRET must be at least 32 characters long")
-    
-    try:
-        data = jwt.decode(token, settings.JWT_SECRET, algorithms=["HS256"])
-        if data.get("typ") != "share":
-            raise jwt.JWTError("Wrong token type")
-        return data
-    except jwt.JWTError:
-        raise jwt.JWTError("Invalid share token")
+from app.services.security import create_share_token, decode_share_token  # noqa: E402,F401
 
 # =============================================================================
 # SHARES SERVICE
 # =============================================================================
 
-def _hash_token(tok: str) -> str:
-    """Hash token for secure storage"""
-    return hashlib.sha256(tok.encode()).hexdigest()
-
-
-def create_share_jwt(user_id: str, album_id: str, hours: int) -> str:
-    """
-    Create a JWT token for sharing an album.
-    
-    Args:
-        user_id: ID of the user who owns the album
-        album_id: ID of the album to share
-        hours: Hours until expiration
-    
-    Returns:
-        JWT token string
-    """
-    now = dt.datetime.now(dt.timezone.utc)
-    exp = now + dt.timedelta(hours=hours)
-    
-    payload = {
-        "typ": "share",
-        "sub": user_id,
-        "alb": album_id,
-        "iat": int(now.timestamp()),
-        "exp": int(exp.timestamp())
-    }
-    
-    return jwt.encode(payload, settings.JWT_SECRET, algorithm="HS256")
-
-
-def decode_share_jwt(token: str) -> dict:
-    """
-    Decode and validate a share JWT token.
-    
-    Args:
-        token: JWT token string
-    
-    Returns:
-        Decoded payload
-    """
-    return jwt.decode(token, settings.JWT_SECRET, algorithms=["HS256"])
-
-
-async def record_share(
-    album_id: str, 
-    created_by: str, 
-    token: str, 
-    hours: int, 
-    max_views: int | None = None
-) -> str:
-    """
-    Record a share link in the database.
-    
-    Args:
-        album_id: ID of the album being shared
-        created_by: ID of the user creating the share
-        token: JWT token for the share
-        hours: Hours until expiration
-        max_views: Maximum number of views (None for unlimited)
-    
-    Returns:
-        Share ID
-    """
-    token_hash = _hash_token(token)
-    expires_at = dt.datetime.now(dt.timezone.utc) + dt.timedelta(hours=hours)
-    share_id = str(uuid.uuid4())
-    
-    await Tortoise.get_connection("default").execute_query(
-        """
-        INSERT INTO public_shares (id, album_id, created_by, token_hash, scope, expires_at, max_views, view_count, revoked)
-        VALUES ($1, $2, $3, $4, 'view', $5, $6, 0, false)
-        """,
-        [share_id, album_id, created_by, token_hash, expires_at, max_views],
-    )
-    
-    return share_id
-
-
-async def validate_share(token: str) -> dict | None:
-    """
-    Validate a share token and return share information.
-    
-    Args:
-        token: JWT token string
-    
-    Returns:
-        Dictionary with JWT payload and share info, or None if invalid
-    """
-    try:
-        # Decode JWT
-        data = decode_share_jwt(token)
-    except Exception:
-        return None
-    
-    # Check database record
-    token_hash = _hash_token(token)
-    rows = await Tortoise.get_connection("default").execute_query_dict(
-        """
-        SELECT * FROM public_shares
-        WHERE token_hash = $1 AND revoked = false AND NOW() < expires_at
-        """,
-        [token_hash],
-    )
-    
-    if not rows:
-        return None
-    
-    share = rows[0]
-    
-    # Check view limit
-    max_views = share.get("max_views")
-    view_count = share.get("view_count", 0)
-    if max_views is not None and view_count >= max_views:
-        return None
-    
-    return {"jwt": data, "share": share}
-
-
-async def increment_share_view(token: str):
-    """
-    Increment the view count for a share.
-    
-    Args:
-        token: JWT token string
-    """
-    token_hash = _hash_token(token)
-    await Tortoise.get_connection("default").execute_query(
-        "UPDATE public_shares SET view_count = view_count + 1 WHERE token_hash = $1",
-        [token_hash],
-    )
-
-
-async def revoke_share(share_id: str):
-    """
-    Revoke a share link.
-    
-    Args:
-        share_id: ID of the share to revoke
-    """
-    await Tortoise.get_connection("default").execute_query(
-        "UPDATE public_shares SET revoked = true WHERE id = $1",
-        [share_id],
-    )
-
-
-async def get_share_stats(share_id: str) -> dict | None:
-    """
-    Get statistics for a share link.
-    
-    Args:
-        share_id: ID of the share
-    
-    Returns:
-        Dictionary with share statistics
-    """
-    rows = await Tortoise.get_connection("default").execute_query_dict(
-        """
-        SELECT view_count, max_views, expires_at, revoked, created_at
-        FROM public_shares
-        WHERE id = $1
-        """,
-        [share_id],
-    )
-    
-    if not rows:
-        return None
-    
-    share = rows[0]
-    return {
-        "view_count": share["view_count"],
-        "max_views": share["max_views"],
-        "expires_at": share["expires_at"],
-        "revoked": share["revoked"],
-        "created_at": share["created_at"],
-        "is_expired": dt.datetime.now(dt.timezone.utc) > share["expires_at"]
-    }
+from app.services.shares import (  # noqa: E402,F401
+    _hash_token,
+    create_share_jwt,
+    decode_share_jwt,
+    record_share,
+    validate_share,
+    increment_share_view,
+    revoke_share,
+    get_share_stats,
+)
 
 # =============================================================================
 # STORAGE SERVICES
@@ -1511,169 +871,26 @@ async def validate_and_process_upload(file: UploadFile):
 # VECTOR STORE SERVICE
 # =============================================================================
 
-class InMemoryVectorStore:
-    def __init__(self):
-        self.vectors: List[Tuple[int, np.ndarray]] = []  # (image_id, embedding)
-
-    def add(self, image_id: int, embedding: np.ndarray):
-        self.vectors.append((image_id, embedding))
-
-    def search(self, query: np.ndarray, top_k: int = 5) -> List[int]:
-        sims = [(image_id, float(np.dot(vec, query) / ((np.linalg.norm(vec) * np.linalg.norm(query)) or 1e-9)))
-                for image_id, vec in self.vectors]
-        sims.sort(key=lambda x: x[1], reverse=True)
-        return [image_id for image_id, _ in sims[:top_k]]
-
-
-def _is_postgres() -> bool:
-    """Check if we're using PostgreSQL (required for pgvector)"""
-    try:
-        conn = Tortoise.get_connection("default")
-        return conn.capabilities.dialect == "postgres"
-    except Exception:
-        return False
-
-
-async def upsert_image_vector(image_id: str, emb: List[float]) -> None:
-    """
-    Store or update image embedding in pgvector table.
-    
-    Args:
-        image_id: UUID of the image
-        emb: Embedding vector (list of floats)
-    """
-    if not _is_postgres():
-        return
-    
-    try:
-        await Tortoise.get_connection("default").execute_query(
-            """
-            INSERT INTO image_embeddings (image_id, emb)
-            VALUES ($1, $2)
-            ON CONFLICT (image_id)
-            DO UPDATE SET emb = EXCLUDED.emb
-            """,
-            [image_id, emb],
-        )
-    except Exception as e:
-        print(f"Failed to upsert vector embedding: {e}")
-
-
-async def search_vectors(query_vec: List[float], top_k: int = 20) -> List[Dict[str, Any]]:
-    """
-    Search for similar images using pgvector cosine similarity.
-    
-    Args:
-        query_vec: Query embedding vector
-        top_k: Number of results to return
-    
-    Returns:
-        List of results with image_id and similarity score
-    """
-    if not _is_postgres():
-        return []
-    
-    try:
-        rows = await Tortoise.get_connection("default").execute_query_dict(
-            """
-            SELECT image_id, 1 - (emb <=> $1) AS score
-            FROM image_embeddings
-            ORDER BY emb <=> $1
-            LIMIT $2
-            """,
-            [query_vec, top_k],
-        )
-        return rows
-    except Exception as e:
-        print(f"Vector search failed: {e}")
-        return []
-
-
-async def delete_image_vector(image_id: str) -> None:
-    """
-    Delete image embedding from pgvector table.
-    
-    Args:
-        image_id: UUID of the image to delete
-    """
-    if not _is_postgres():
-        return
-    
-    try:
-        await Tortoise.get_connection("default").execute_query(
-            "DELETE FROM image_embeddings WHERE image_id = $1",
-            [image_id],
-        )
-    except Exception as e:
-        print(f"Failed to delete vector embedding: {e}")
-
-
-async def get_vector_stats() -> Dict[str, Any]:
-    """
-    Get statistics about vector embeddings.
-    
-    Returns:
-        Dictionary with embedding count and other stats
-    """
-    if not _is_postgres():
-        return {"count": 0, "database": "not_postgres"}
-    
-    try:
-        result = await Tortoise.get_connection("default").execute_query_dict(
-            "SELECT COUNT(*) as count FROM image_embeddings"
-        )
-        return {
-            "count": result[0]["count"] if result else 0,
-            "database": "postgres_with_pgvector"
-        }
-    except Exception as e:
-        print(f"Failed to get vector stats: {e}")
-        return {"count": 0, "error": str(e)}
+from app.services.vector_store import (  # noqa: E402,F401
+    InMemoryVectorStore,
+    _is_postgres,
+    upsert_image_vector,
+    upsert_image_vectors,
+    search_vectors,
+    delete_image_vector,
+    get_vector_stats,
+    ensure_hnsw_index,
+    tune_hnsw_search,
+)
 
 # =============================================================================
 # VISION SERVICE
 # =============================================================================
 
-# Minimal face detection using OpenCV Haar cascades (offline & free).
-_face = cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_frontalface_default.xml")
-
-class Processed:
-    def __init__(self, exif, lat, lng, w, h, faces: List[Tuple[float, float, float, float]]):
-        self.exif = exif
-        self.lat = lat
-        self.lng = lng
-        self.width = w
-        self.height = h
-        self.faces = faces  # normalized [0..1]
-
-async def analyze(content_bytes: bytes) -> Processed:
-    # EXIF & GPS
-    exif, lat, lng, w, h = extract_exif(content_bytes)
-
-    # faces
-    npimg = np.frombuffer(content_bytes, np.uint8)
-    img = cv2.imdecode(npimg, cv2.IMREAD_COLOR)
-    if img is None:
-        # try via PIL
-        pil = Image.open(io.BytesIO(content_bytes)).convert("RGB")
-        img = cv2.cvtColor(np.array(pil), cv2.COLOR_RGB2BGR)
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-    det = _face.detectMultiScale(gray, scaleFactor=1.2, minNeighbors=5, minSize=(60, 60))
-    faces = []
-    H, W = gray.shape
-    for (x, y, w0, h0) in det:
-        fx, fy, fw, fh = (x / W), (y / H), (w0 / W), (h0 / H)
-        in01(fx, "face_x"); in01(fy, "face_y"); in01(fw, "face_w"); in01(fh, "face_h")
-        faces.append((fx, fy, fw, fh))
-    return Processed(exif, lat, lng, W, H, faces)
-
-def to_rgb_np(img_bytes: bytes) -> np.ndarray:
-    file_bytes = np.frombuffer(img_bytes, np.uint8)
-    bgr = cv2.imdecode(file_bytes, cv2.IMREAD_COLOR)
-    if bgr is None:
-        raise ValueError("Invalid image bytes")
-    rgb = cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB)
-    return rgb
-
-def preprocess_rgb(rgb: np.ndarray) -> np.ndarray:
-    denoised = cv2.fastNlMeansDenoisingColored(rgb)
+from app.services.vision import (  # noqa: E402,F401
+    Processed,
+    analyze,
+    to_rgb_np,
+    to_rgb_np_async,
+    preprocess_rgb,
+)
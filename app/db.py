@@ -2,6 +2,8 @@ import os
 import asyncio
 import logging
 from tortoise import Tortoise
+from tortoise.transactions import in_transaction
+from tortoise.utils import generate_schema_for_client
 from app.config import settings
 
 _logger = logging.getLogger("db")
@@ -55,6 +57,17 @@ def _build_tortoise_config() -> dict:
     "timezone": "UTC",
 }
 
+async def _generate_schemas() -> None:
+    """Create missing tables; on PostgreSQL the whole DDL script commits once."""
+    conn = Tortoise.get_connection("default")
+    if conn.capabilities.dialect != "postgres":
+        # sqlite's executescript commits on its own; keep the stock path
+        await Tortoise.generate_schemas(safe=True)
+        return
+    async with in_transaction("default") as tx:
+        await generate_schema_for_client(tx, safe=True)
+
+
 async def init_db(max_retries: int = 3, delay_seconds: float = 0.5) -> None:
     """Initialize database with retry logic in the current event loop.
 
@@ -66,7 +79,7 @@ async def init_db(max_retries: int = 3, delay_seconds: float = 0.5) -> None:
     for attempt in range(1, max_retries + 1):
         try:
             await Tortoise.init(config=config)
-            await Tortoise.generate_schemas(safe=True)
+            await _generate_schemas()
             _logger.info("Database initialized successfully")
             return
         except Exception as exc:
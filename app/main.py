@@ -17,6 +17,14 @@ from slowapi.errors import RateLimitExceeded
 from app.core.middleware import SecurityHeadersMiddleware
 from app.config import settings
 from app.db import init_db, close_db
+from app.services.audit import start_audit_flusher, stop_audit_flusher
+from app.services.vector_store import tune_hnsw_search
+try:
+    from app.services.cloud_storage import close_session as close_storage_session
+except Exception:
+    # aiohttp not installed: no shared session to close
+    async def close_storage_session():
+        return None
 from app.core.middleware import ErrorEnvelopeMiddleware
 from app.services.observability import init_observability, instrument_fastapi
 # module-level import guards for metrics
@@ -64,15 +72,19 @@ async def lifespan(app: FastAPI):
     try:
         await init_db()
         logging.info("Database initialized successfully")
+        await tune_hnsw_search()
     except Exception as e:
         logging.error(f"Database initialization failed: {e}")
         raise
+    start_audit_flusher()
     
     yield
     
     # Shutdown
     logging.info("Shutting down PhotoVault application...")
     try:
+        await stop_audit_flusher()
+        await close_storage_session()
         await close_db()
         logging.info("Database connections closed")
     except Exception as e:
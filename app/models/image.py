@@ -16,6 +16,7 @@ class Image(BaseModel):
     checksum_sha256 = fields.CharField(max_length=64, index=True)
     phash_hex = fields.CharField(max_length=16, null=True)
     embedding_json = fields.JSONField(null=True)
+    emb_version = fields.IntField(default=0)
 
     class Meta:
         table = "images"
@@ -9,12 +9,12 @@ import io
 from fastapi import APIRouter, HTTPException
 from fastapi.responses import StreamingResponse
 
-from app.services.shares import validate_share, increment_share_view
+from app.services.shares import validate_share
 from app.models.album import AlbumImage, Album
 from app.models.image import Image
 from app.models.user import User
 from app.services.deta_storage import storage
-from app.services.encryption import unwrap_dek, fernet_from_dek
+from app.services.encryption import unwrap_dek, decrypt_blob
 from app.services.metrics import record_share_viewed
 
 public_api = APIRouter(tags=["share"])
@@ -36,8 +36,7 @@ async def share_list(token: str):
     joins = await AlbumImage.filter(album_id=album_id).prefetch_related("image").order_by("added_at")
     images = [j.image for j in joins if j.image is not None]
     
-    # Increment view count
-    await increment_share_view(token)
+    # validate_share already counted the view
     record_share_viewed()
     
     return {
@@ -57,7 +56,9 @@ async def share_list(token: str):
 @public_api.get("/share/{token}/image/{image_id}")
 async def share_image(token: str, image_id: UUID):
     """View a single image from shared album (no login required)"""
-    val = await validate_share(token)
+    # Check only; the view is counted once the image has been decrypted, so
+    # bogus or failing requests don't use up a max_views share
+    val = await validate_share(token, count_view=False)
     if not val:
         raise HTTPException(status_code=401, detail="Invalid or expired link")
 
@@ -76,16 +77,16 @@ async def share_image(token: str, image_id: UUID):
 
     # Decrypt and stream image
     dek_b64 = unwrap_dek(user.dek_encrypted_b64)
-    fernet = fernet_from_dek(dek_b64)
     
-    enc = storage.read(img.storage_key)
+    enc = await storage.read(img.storage_key)
     try:
-        plain = fernet.decrypt(enc)
+        plain = decrypt_blob(dek_b64, enc, str(user.id).encode())
     except Exception:
         raise HTTPException(status_code=500, detail="Decryption failed")
     
-    # Increment view count
-    await increment_share_view(token)
+    # Atomic check-and-count: a share that hit max_views meanwhile is refused
+    if not await validate_share(token):
+        raise HTTPException(status_code=401, detail="Invalid or expired link")
     record_share_viewed()
     
     return StreamingResponse(
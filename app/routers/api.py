@@ -50,9 +50,8 @@ from app.consolidated_services import (
     new_data_key,
     wrap_dek,
     unwrap_dek,
-    fernet_from_dek,
     analyze,
-    to_rgb_np,
+    to_rgb_np_async,
     image_embedding,
     text_embedding,
     storage,
@@ -62,7 +61,9 @@ from app.consolidated_services import (
     make_thumbnail,
 )
 from app.config import settings
+from app.services.encryption import decrypt_blob, encrypt_blob
 from app.services.queue import enqueue_embeddings, enqueue_ai_tagging
+from app.services.image_embeddings_store import save_embedding as save_image_embedding
 
 api = APIRouter(tags=["api"])
 
@@ -268,7 +269,6 @@ async def upload_image(file: UploadFile = File(...), user: AuthUser = Depends(re
         raise HTTPException(status_code=401, detail="User not found")
 
     dek_b64 = await _ensure_user_dek(db_user)
-    fernet = fernet_from_dek(dek_b64)
 
     try:
         proc = await analyze(content)
@@ -283,12 +283,12 @@ async def upload_image(file: UploadFile = File(...), user: AuthUser = Depends(re
             location_text = None
 
     try:
-        np_rgb = await to_rgb_np(content)
-        emb = image_embedding(np_rgb)
+        np_rgb = await to_rgb_np_async(content)
+        emb = image_embedding(np_rgb).tolist()
     except Exception:
         emb = None
 
-    encrypted = fernet.encrypt(content)
+    encrypted = encrypt_blob(dek_b64, content, str(db_user.id).encode())
     original_name = file.filename or "upload"
     if hasattr(storage, 'save') and callable(getattr(storage, 'save')):
         if asyncio.iscoroutinefunction(storage.save):
@@ -303,7 +303,7 @@ async def upload_image(file: UploadFile = File(...), user: AuthUser = Depends(re
     try:
         thumb_bytes = make_thumbnail(content, max_side=512, quality=85)
         if thumb_bytes:
-            thumb_encrypted = fernet.encrypt(thumb_bytes)
+            thumb_encrypted = encrypt_blob(dek_b64, thumb_bytes, str(db_user.id).encode())
             thumb_filename = f"thumb_{original_name}"
             if asyncio.iscoroutinefunction(storage.save):
                 thumb_storage_key = await storage.save(user_id=str(db_user.id), filename=thumb_filename, data=thumb_encrypted)
@@ -322,12 +322,14 @@ async def upload_image(file: UploadFile = File(...), user: AuthUser = Depends(re
         checksum_sha256=_hash_sha256(content),
         storage_key=storage_key,
         thumb_storage_key=thumb_storage_key,
-        exif_json=proc.exif or None,
+        exif_json=dict(proc.exif) if proc.exif else None,
         gps_lat=proc.lat,
         gps_lng=proc.lng,
         location_text=location_text,
         embedding_json=emb,
     )
+    if emb is not None:
+        save_image_embedding(str(db_user.id), str(img.id), emb)
     # Background AI tasks: embeddings (pgvector) and tagging/categories
     try:
         enqueue_embeddings(str(img.id), str(db_user.id))
@@ -373,7 +375,6 @@ async def view_thumbnail(image_id: UUID, user: AuthUser = Depends(require_user))
     
     db_user = await User.filter(id=user.user_id).first()
     dek_b64 = await _ensure_user_dek(db_user)
-    fernet = fernet_from_dek(dek_b64)
     
     try:
         # Try thumbnail first, fallback to original
@@ -384,7 +385,7 @@ async def view_thumbnail(image_id: UUID, user: AuthUser = Depends(require_user))
         else:
             enc_bytes = storage.read(storage_key)
         
-        image_bytes = fernet.decrypt(enc_bytes)
+        image_bytes = decrypt_blob(dek_b64, enc_bytes, str(user.user_id).encode())
         media_type = "image/jpeg" if img.thumb_storage_key else (img.content_type or "image/jpeg")
         
         return StreamingResponse(
@@ -403,7 +404,6 @@ async def view_image(image_id: UUID, user: AuthUser = Depends(require_user)):
     
     db_user = await User.filter(id=user.user_id).first()
     dek_b64 = await _ensure_user_dek(db_user)
-    fernet = fernet_from_dek(dek_b64)
     
     try:
         if asyncio.iscoroutinefunction(storage.read):
@@ -411,7 +411,7 @@ async def view_image(image_id: UUID, user: AuthUser = Depends(require_user)):
         else:
             enc_bytes = storage.read(img.storage_key)
         
-        plain = fernet.decrypt(enc_bytes)
+        plain = decrypt_blob(dek_b64, enc_bytes, str(user.user_id).encode())
         return StreamingResponse(
             io.BytesIO(plain), 
             media_type=img.content_type or "image/jpeg",
@@ -12,7 +12,14 @@ import logging
 from app.schemas.auth import SignupPayload, LoginPayload, TokenOut
 from app.models.user import User
 from app.models.session import Session
-from app.services.security import hash_password, verify_password, create_token, require_user, AuthUser
+from app.services.security import (
+    hash_password_async,
+    verify_password_async,
+    create_token,
+    require_user,
+    AuthUser,
+    invalidate_user_cache,
+)
 from app.services import encryption
 from app.config import settings
 try:
@@ -78,7 +85,7 @@ async def signup(
     user = await User.create(
         email=payload.email,
         name=payload.name,
-        password_hash=hash_password(payload.password),
+        password_hash=await hash_password_async(payload.password),
         dek_encrypted_b64=encryption.wrap_dek(dek),
         is_admin=False
     )
@@ -111,7 +118,7 @@ async def login(
     validate_csrf_request(request, x_csrf_token)
 
     user = await User.filter(email=payload.email).first()
-    if not user or not verify_password(payload.password, user.password_hash):
+    if not user or not await verify_password_async(payload.password, user.password_hash):
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
     token = create_token(str(user.id))
@@ -188,6 +195,7 @@ async def logout_jwt(request: Request, response: Response, auth: AuthUser = Depe
         if s:
             s.revoked = True
             await s.save()
+    invalidate_user_cache(auth.user_id)
 
     response.delete_cookie("session_token")
     response.delete_cookie("csrf_token")
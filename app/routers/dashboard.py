@@ -472,7 +472,7 @@ async def get_dashboard_stats(auth: AuthUser = Depends(require_user)):
 
     try:
         if cache_get_json and cache_set_json:
-            await cache_set_json(cache_key, result, ttl=60)
+            await cache_set_json(cache_key, result, ttl=60, tag=f"user:{auth.user_id}")
     except (ConnectionError, TimeoutError, ValueError) as e:
         # Log cache set error but don't fail the request
         import logging
@@ -1,20 +1,27 @@
 # app/routers/images.py
 
+import asyncio
 import hashlib
 import io
 import os
 from uuid import UUID
 from typing import List
 
+import numpy as np
+from cryptography.exceptions import InvalidTag
+from cryptography.fernet import InvalidToken
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Response, Request, Header
 from fastapi.responses import StreamingResponse
 from typing import Optional
 from app.schemas.image import ImageOut
 from app.consolidated_services import require_user, AuthUser
-from app.services import encryption, vision, embeddings
+from app.services import encryption, vision, embeddings, content_cache
 from app.services.deta_storage import storage
 from app.services.upload_validate import validate_and_process_upload
-from app.services.observability import trace_operation, record_upload, record_error
+from app.services.duplicates import phash_hex_from_bytes
+from app.services.face_embeddings_store import save_embedding as save_face_embedding, delete_embeddings as delete_face_embeddings
+from app.services.image_embeddings_store import save_embedding as save_image_embedding, delete_embeddings as delete_image_embeddings
+from app.services.observability import trace_operation
 from app.models.image import Image
 from app.models.face import Face
 from app.models.user import User
@@ -29,10 +36,6 @@ async def _get_user(user_id: str) -> User:
     return u
 
 
-# Module: app/routers/api.py — top imports and APIRouter
-from __future__ import annotations
-
-
 # Method: upload_image()
 @router.post("/upload", response_model=ImageOut)
 async def upload_image(
@@ -71,8 +74,19 @@ async def upload_image(
         )
 
     proc = await vision.analyze(content)
-    rgb_np = await vision.to_rgb_np(content)
-    emb = embeddings.image_embedding(rgb_np)
+    rgb_np = await vision.to_rgb_np_async(content)
+
+    # Retries and re-uploads of the same bytes reuse the earlier pHash/embedding
+    digest = content_cache.content_digest(content)
+
+    async def _embed() -> bytes:
+        return np.asarray(await embeddings.image_embedding_async(rgb_np), dtype="<f4").tobytes()
+
+    emb_ns = await asyncio.to_thread(embeddings.embedding_cache_namespace)
+    emb = np.frombuffer(await content_cache.get_or_compute(digest, emb_ns, _embed), dtype="<f4")
+    phash_hex = (await content_cache.get_or_compute(
+        digest, "phash:v2", lambda: (phash_hex_from_bytes(content) or "").encode()
+    )).decode() or None
 
     loc_text = None
     if proc.lat and proc.lng:
@@ -84,12 +98,11 @@ async def upload_image(
 
     user = await _get_user(auth.user_id)
     dek_b64 = encryption.unwrap_dek(user.dek_encrypted_b64)
-    fernet = encryption.fernet_from_dek(dek_b64)
-    encrypted_bytes = fernet.encrypt(content)
+    encrypted_bytes = encryption.encrypt_blob(dek_b64, content, str(auth.user_id).encode())
 
     safe_name = (file.filename or "image").replace(os.sep, "_")
     filename = f"{checksum[:8]}_{safe_name}"
-    storage_key = storage.save(str(auth.user_id), filename, encrypted_bytes)
+    storage_key = await storage.save(str(auth.user_id), filename, encrypted_bytes)
 
     img = await Image.create(
         user_id=auth.user_id,
@@ -103,6 +116,7 @@ async def upload_image(
         location_text=loc_text,
         storage_key=storage_key,
         checksum_sha256=checksum,
+        phash_hex=phash_hex,
         embedding_json=emb.tolist() if hasattr(emb, "tolist") else emb,
     )
 
@@ -119,6 +133,7 @@ async def upload_image(
             for fobj, vec in zip(faces_objs, faces_embeddings):
                 fobj.embedding_json = vec.tolist() if hasattr(vec, "tolist") else list(map(float, vec))
                 await fobj.save()
+                save_face_embedding(str(auth.user_id), str(fobj.id), fobj.embedding_json)
     except Exception:
         pass
 
@@ -128,6 +143,8 @@ async def upload_image(
         await upsert_image_vector(str(img.id), img.embedding_json)
     except Exception:
         pass
+    if img.embedding_json:
+        save_image_embedding(str(auth.user_id), str(img.id), img.embedding_json)
 
     # Derive simple AI metadata for immediate response
     tags = []
@@ -174,20 +191,25 @@ async def view_image(image_id: str, auth: AuthUser = Depends(require_user)):
     if not img:
         raise HTTPException(status_code=404, detail="Not found")
 
-    enc = storage.read(img.storage_key)
+    enc = await storage.read(img.storage_key)
 
     user = await _get_user(auth.user_id)
     dek_b64 = encryption.unwrap_dek(user.dek_encrypted_b64)
-    fernet = encryption.fernet_from_dek(dek_b64)
     try:
-        plain = fernet.decrypt(enc)
-    except (ValueError, TypeError, OSError) as e:
+        plain = encryption.decrypt_blob(dek_b64, enc, str(auth.user_id).encode())
+    except (ValueError, TypeError, OSError, InvalidToken, InvalidTag) as e:
         import logging
         logging.error(f"Image decryption failed for image {image_id}: {e}")
         raise HTTPException(status_code=500, detail="Decryption failed")
 
-    return StreamingResponse(
-        iter([plain]),
+    # decrypt_blob authenticates the whole blob before returning (the AES-GCM
+    # tag, or the HMAC on legacy Fernet tokens), so the plaintext is already
+    # one contiguous buffer; hand it to the server as a single body
+    # with Content-Length instead of re-chunking it through a streaming iterator.
+    # (Spooling decrypted bytes to a tempfile for sendfile would put plaintext
+    # on disk, which defeats the point of encrypting at rest.)
+    return Response(
+        content=plain,
         media_type=img.content_type or "image/jpeg",
         headers={
             "Cache-Control": "private, max-age=3600",
@@ -207,14 +229,13 @@ async def view_thumb(image_id: UUID, auth: AuthUser = Depends(require_user)):
 
     user = await _get_user(auth.user_id)
     dek_b64 = encryption.unwrap_dek(user.dek_encrypted_b64)
-    fernet = encryption.fernet_from_dek(dek_b64)
 
     key = img.thumb_storage_key or img.storage_key
-    enc = storage.read(key)
+    enc = await storage.read(key)
 
     try:
-        plain = fernet.decrypt(enc)
-    except (ValueError, TypeError, OSError) as e:
+        plain = encryption.decrypt_blob(dek_b64, enc, str(auth.user_id).encode())
+    except (ValueError, TypeError, OSError, InvalidToken, InvalidTag) as e:
         import logging
         logging.error(f"Thumbnail decryption failed for image {image_id}: {e}")
         raise HTTPException(status_code=500, detail="Decryption failed")
@@ -236,10 +257,13 @@ async def delete_image(image_id: str, auth: AuthUser = Depends(require_user)):
     if not img:
         raise HTTPException(status_code=404, detail="Not found")
 
-    storage.delete(img.storage_key)
+    await storage.delete(img.storage_key)
     if img.thumb_storage_key:
-        storage.delete(img.thumb_storage_key)
+        await storage.delete(img.thumb_storage_key)
 
+    face_ids = await Face.filter(image_id=img.id).values_list("id", flat=True)
     await img.delete()
+    delete_image_embeddings(str(auth.user_id), [img.id])
+    delete_face_embeddings(str(auth.user_id), face_ids)
 
     return {"ok": True}
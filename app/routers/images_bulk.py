@@ -1,12 +1,14 @@
 from typing import List
 from fastapi import APIRouter, Depends, UploadFile, File, HTTPException
 
-from app.consolidated_services import require_user, AuthUser, storage
+from app.consolidated_services import require_user, AuthUser
+from app.services import storage_batch
+from app.services.deta_storage import storage
 from app.models.image import Image
-from app.services.encryption import fernet_from_dek
+from app.services.encryption import encrypt_blob
 from app.models.user import User
 from app.routers.api import _ensure_user_dek, _hash_sha256, _image_to_out
-from app.services.queue import enqueue_thumbnail, enqueue_embeddings  # optional
+from app.services.queue import enqueue_many  # optional
 from app.services.cache import cache_invalidate_prefix
 
 # Change prefix to avoid conflict with images.py
@@ -28,48 +30,56 @@ async def bulk_upload_images(
         
         # Ensure user has DEK
         dek_b64 = await _ensure_user_dek(user)
-        fernet = fernet_from_dek(dek_b64)
+        aad = str(auth.user_id).encode()
         
         results = []
+        image_ids = []
+        pending = []  # (file, sha256, size) for files that passed validation
+        items = []
         
         for file in files:
+            # Validate file
+            if not file.content_type or not file.content_type.startswith('image/'):
+                results.append({
+                    "filename": file.filename,
+                    "status": "error",
+                    "error": "Invalid file type"
+                })
+                continue
+            
+            # Read and process file
+            content = await file.read()
+            if len(content) > 10 * 1024 * 1024:  # 10MB limit
+                results.append({
+                    "filename": file.filename,
+                    "status": "error", 
+                    "error": "File too large (max 10MB)"
+                })
+                continue
+            
+            sha256 = _hash_sha256(content)
+            pending.append((file, sha256, len(content)))
+            items.append((f"{sha256}.enc", encrypt_blob(dek_b64, content, aad)))
+        
+        # Upload the encrypted blobs concurrently, then create the records
+        keys = await storage_batch.save_many(storage.save, str(auth.user_id), items, return_exceptions=True)
+        
+        for (file, sha256, size), storage_key in zip(pending, keys):
             try:
-                # Validate file
-                if not file.content_type or not file.content_type.startswith('image/'):
-                    results.append({
-                        "filename": file.filename,
-                        "status": "error",
-                        "error": "Invalid file type"
-                    })
-                    continue
-                
-                # Read and process file
-                content = await file.read()
-                if len(content) > 10 * 1024 * 1024:  # 10MB limit
-                    results.append({
-                        "filename": file.filename,
-                        "status": "error", 
-                        "error": "File too large (max 10MB)"
-                    })
-                    continue
-                
-                # Create image record
-                sha256 = _hash_sha256(content)
-                encrypted = fernet.encrypt(content)
-                storage_key = storage.save(auth.user_id, f"{sha256}.enc", encrypted)
+                if isinstance(storage_key, BaseException):
+                    raise storage_key
                 
                 image = await Image.create(
                     user_id=auth.user_id,
-                    filename=file.filename or f"upload_{sha256[:8]}.jpg",
+                    original_filename=file.filename or f"upload_{sha256[:8]}.jpg",
                     storage_key=storage_key,
-                    file_size=len(content),
-                    sha256=sha256,
+                    size_bytes=size,
+                    checksum_sha256=sha256,
                     content_type=file.content_type
                 )
                 
-                # Enqueue background tasks
-                enqueue_thumbnail(str(image.id), auth.user_id)
-                enqueue_embeddings(str(image.id), auth.user_id)
+                # Background tasks are enqueued as one batch after the loop
+                image_ids.append(str(image.id))
                 
                 results.append({
                     "filename": file.filename,
@@ -84,8 +94,12 @@ async def bulk_upload_images(
                     "error": str(e)
                 })
         
+        if image_ids:
+            enqueue_many("thumbnail", image_ids, auth.user_id)
+            enqueue_many("embeddings", image_ids, auth.user_id)
+        
         # Invalidate cache
-        cache_invalidate_prefix(f"user:{auth.user_id}")
+        await cache_invalidate_prefix(f"user:{auth.user_id}")
         
         return {
             "results": results,
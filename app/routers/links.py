@@ -39,7 +39,8 @@ async def link_verify(token: str = Body(...), image: UploadFile = File(...)):
     Verify a share link by facial scan.
     Checks the owner's saved face against the provided image.
     """
-    val = await validate_share(token)
+    # A face check is not a view of the album
+    val = await validate_share(token, count_view=False)
     if not val:
         raise HTTPException(status_code=401, detail="Invalid or expired link")
     sub_user_id = val["jwt"]["sub"]
@@ -1,8 +1,15 @@
+import asyncio
+from typing import List
+
+import numpy as np
+
 from fastapi import APIRouter, Depends, HTTPException, Query
 from app.consolidated_services import require_user, AuthUser, text_embedding, search_vectors
 from app.models.image import Image
+from app.models.face import Face
 from app.schemas.image import ImageOut
-from app.utils.math import safe_cosine
+from app.services.image_embeddings_store import load_embeddings as load_image_embeddings
+from app.utils.math import quantize_int8, topk_cosine, topk_cosine_int8
 
 
 router = APIRouter(prefix="/search", tags=["search"])
@@ -13,6 +20,49 @@ def _image_to_out(img):
     return ImageOut.model_validate(img.__dict__)
 
 
+async def _rank_by_embedding(query_vec, user_id, top_k: int, exclude=None):
+    """Rank the user's images against ``query_vec`` in one vectorised pass; returns [(score, img)].
+
+    The user's int8 embedding matrix is the scan source, so only image ids come
+    from the database; images missing from it are quantised on the fly. Without
+    a matrix of the query's dimension the float embeddings are scanned instead.
+    """
+    dim = len(query_vec)
+    q = Image.filter(user_id=user_id, embedding_json__isnull=False)
+    if exclude is not None:
+        q = q.exclude(id=exclude)
+    stored = await asyncio.to_thread(load_image_embeddings, str(user_id))
+    if stored is None or stored[1].shape[1] != dim:
+        rows = [(str(i), e) for i, e in await q.values_list("id", "embedding_json") if e and len(e) == dim]
+        if not rows:
+            return []
+        ids = [i for i, _ in rows]
+        idx, scores = topk_cosine([e for _, e in rows], query_vec, top_k)
+    else:
+        live = {str(i) for i in await q.values_list("id", flat=True)}
+        stored_ids, Q, scale = stored
+        hit = [r for r, image_id in enumerate(stored_ids) if image_id in live]
+        ids = [stored_ids[r] for r in hit]
+        Q, scale = Q[hit], scale[hit]
+        missing = live.difference(ids)
+        if missing:
+            rows = [
+                (str(i), e)
+                for i, e in await Image.filter(id__in=list(missing)).values_list("id", "embedding_json")
+                if e and len(e) == dim
+            ]
+            if rows:
+                Qm, sm = quantize_int8([e for _, e in rows])
+                ids += [i for i, _ in rows]
+                Q, scale = np.concatenate([Q, Qm]), np.concatenate([scale, sm])
+        if not ids:
+            return []
+        idx, scores = topk_cosine_int8(Q, scale, query_vec, top_k)
+    top = [(float(s), ids[i]) for i, s in zip(idx, scores)]
+    imgs = {str(m.id): m for m in await Image.filter(id__in=[i for _, i in top])}
+    return [(s, imgs[i]) for s, i in top if i in imgs]
+
+
 @router.get("")
 async def search_images(
     q: str = Query(..., min_length=1),
@@ -46,17 +96,8 @@ async def search_images(
             results.append({"image": _image_to_out(m), "score": float(r["score"])})
         return {"query": q, "results": results}
 
-    # Fallback to in-Python cosine similarity
-    imgs = await Image.filter(user_id=auth.user_id).all()
-    scored = []
-    
-    for m in imgs:
-        if m.embedding_json:
-            score = safe_cosine(query_vec, list(map(float, m.embedding_json)))
-            scored.append((score, m))
-    
-    scored.sort(key=lambda t: t[0], reverse=True)
-    top = scored[:top_k]
+    # Fallback to in-process cosine similarity
+    top = await _rank_by_embedding(query_vec, auth.user_id, top_k)
     
     # faces-only filter (derived)
     out = []
@@ -93,13 +134,6 @@ async def similar_images(
                 results.append({"image": _image_to_out(m), "score": float(r["score"])})
         return {"query_image_id": image_id, "results": results}
 
-    # Fallback (Python cosine)
-    imgs = await Image.filter(user_id=auth.user_id).exclude(id=image_id).all()
-    scored = []
-    for m in imgs:
-        if m.embedding_json:
-            score = safe_cosine(query_vec, list(map(float, m.embedding_json)))
-            scored.append((score, m))
-    scored.sort(key=lambda t: t[0], reverse=True)
-    top = scored[:top_k]
+    # Fallback (in-process cosine)
+    top = await _rank_by_embedding(query_vec, auth.user_id, top_k, exclude=image_id)
     return {"query_image_id": image_id, "results": [{"image": _image_to_out(m), "score": float(s)} for s, m in top]}
\ No newline at end of file
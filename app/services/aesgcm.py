@@ -2,34 +2,53 @@ import os
 import json
 import hmac
 import hashlib
+from functools import lru_cache
 from typing import Tuple
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
 from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 
+_TAG_LEN = 16
+
 # Secret for HMAC signing
 LINK_HMAC_SECRET = (os.getenv("LINK_HMAC_SECRET") or "dev-secret").encode()
+# Keyed once; copy() reuses the inner/outer pad state instead of rekeying per call
+_HMAC_TEMPLATE = hmac.new(LINK_HMAC_SECRET, b"", hashlib.sha256)
 
 def generate_key() -> bytes:
     return AESGCM.generate_key(bit_length=256)
 
+@lru_cache(maxsize=128)
+def _aes(key: bytes) -> algorithms.AES:
+    # The algorithm object is immutable and reusable across nonces
+    return algorithms.AES(key)
+
 def encrypt_json(data: dict, key: bytes) -> Tuple[bytes, bytes]:
     """
     Encrypt dict using AES-256-GCM.
-    Returns (nonce, ciphertext) bytes.
+    Returns (nonce, ciphertext) bytes; ciphertext carries the 16-byte tag
+    at the end, the same layout AESGCM.encrypt produces.
     """
-    aesgcm = AESGCM(key)
     nonce = os.urandom(12)
-    ct = aesgcm.encrypt(nonce, json.dumps(data).encode("utf-8"), associated_data=None)
-    return nonce, ct
+    pt = json.dumps(data).encode("utf-8")
+    enc = Cipher(_aes(key), modes.GCM(nonce)).encryptor()
+    buf = bytearray(len(pt) + _TAG_LEN)
+    n = enc.update_into(pt, buf)
+    enc.finalize()
+    buf[n:n + _TAG_LEN] = enc.tag
+    return nonce, bytes(buf[:n + _TAG_LEN])
 
 def decrypt_json(nonce: bytes, ciphertext: bytes, key: bytes) -> dict:
-    aesgcm = AESGCM(key)
-    pt = aesgcm.decrypt(nonce, ciphertext, associated_data=None)
-    return json.loads(pt.decode("utf-8"))
+    body, tag = ciphertext[:-_TAG_LEN], ciphertext[-_TAG_LEN:]
+    dec = Cipher(_aes(key), modes.GCM(nonce, tag)).decryptor()
+    buf = bytearray(len(body) + _TAG_LEN)
+    n = dec.update_into(body, buf)
+    dec.finalize()  # raises InvalidTag on tamper
+    return json.loads(buf[:n].decode("utf-8"))
 
 def sign_token(b: bytes) -> str:
-    mac = hmac.new(LINK_HMAC_SECRET, b, hashlib.sha256).hexdigest()
-    return mac
+    h = _HMAC_TEMPLATE.copy()
+    h.update(b)
+    return h.hexdigest()
 
 def verify_token(b: bytes, sig: str) -> bool:
-    mac = hmac.new(LINK_HMAC_SECRET, b, hashlib.sha256).hexdigest()
-    return hmac.compare_digest(mac, sig)
\ No newline at end of file
+    return hmac.compare_digest(sign_token(b), sig)
@@ -1,17 +1,48 @@
+import atexit
 import json
 import os
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
 from typing import Dict, Any, Optional
 from app.config import settings
 
+try:
+    import orjson  # type: ignore
+except ImportError:  # pragma: no cover - optional dependency at runtime
+    orjson = None  # type: ignore
+
 BASE = Path(settings.STORAGE_DIR).resolve() / "metadata"
 
-def _user_dir(user_id: str) -> Path:
-    d = BASE / str(user_id)
+# File reads release the GIL, so a small pool overlaps the open/read syscalls
+_READ_POOL = ThreadPoolExecutor(max_workers=16, thread_name_prefix="metadata-read")
+
+# updates.jsonl stays open for the life of the process
+_EV_LOCK = threading.Lock()
+_EV_FH = None
+
+def _dumps(obj: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False).encode("utf-8")
+
+def _loads(raw: bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+@lru_cache(maxsize=4096)
+def _user_dir_cached(user_id: str) -> Path:
+    d = BASE / user_id
     d.mkdir(parents=True, exist_ok=True)
     return d
 
+def _user_dir(user_id: str) -> Path:
+    # mkdir once per user per process rather than on every metadata op
+    return _user_dir_cached(str(user_id))
+
 def _image_path(user_id: str, image_id: str) -> Path:
     return _user_dir(user_id) / f"{image_id}.json"
 
@@ -20,7 +51,10 @@ def save_metadata(user_id: str, image_id: str, data: Dict[str, Any]) -> None:
     meta["image_id"] = image_id
     meta["updated_at"] = int(time.time())
     p = _image_path(user_id, image_id)
-    p.write_text(json.dumps(meta, ensure_ascii=False), encoding="utf-8")
+    # Write aside and rename so readers never see a half-written file
+    tmp = p.with_suffix(".json.tmp")
+    tmp.write_bytes(_dumps(meta))
+    os.replace(tmp, p)
     append_update_event(user_id, image_id, meta)
 
 def load_metadata(user_id: str, image_id: str) -> Optional[Dict[str, Any]]:
@@ -28,29 +62,49 @@ def load_metadata(user_id: str, image_id: str) -> Optional[Dict[str, Any]]:
     if not p.exists():
         return None
     try:
-        return json.loads(p.read_text(encoding="utf-8"))
+        return _loads(p.read_bytes())
     except Exception:
         return None
 
+def _read(p: Path) -> Optional[bytes]:
+    try:
+        return p.read_bytes()
+    except OSError:
+        return None
+
 def list_metadata(user_id: str) -> Dict[str, Dict[str, Any]]:
     d = _user_dir(user_id)
+    paths = list(d.glob("*.json"))
     out: Dict[str, Dict[str, Any]] = {}
-    for f in d.glob("*.json"):
+    for p, raw in zip(paths, _READ_POOL.map(_read, paths)):
+        if raw is None:
+            continue
         try:
-            obj = json.loads(f.read_text(encoding="utf-8"))
-            out[f.stem] = obj
+            out[p.stem] = _loads(raw)
         except Exception:
             continue
     return out
 
+def _close_events() -> None:
+    global _EV_FH
+    with _EV_LOCK:
+        if _EV_FH is not None:
+            _EV_FH.close()
+            _EV_FH = None
+
 def append_update_event(user_id: str, image_id: str, meta: Dict[str, Any]) -> None:
-    ev_path = BASE / "updates.jsonl"
-    ev_path.parent.mkdir(parents=True, exist_ok=True)
-    line = json.dumps({
+    global _EV_FH
+    line = _dumps({
         "user_id": str(user_id),
         "image_id": str(image_id),
         "metadata": meta,
         "ts": int(time.time()),
-    }, ensure_ascii=False)
-    with ev_path.open("a", encoding="utf-8") as f:
-        f.write(line + "\n")
\ No newline at end of file
+    }) + b"\n"
+    with _EV_LOCK:
+        if _EV_FH is None:
+            ev_path = BASE / "updates.jsonl"
+            ev_path.parent.mkdir(parents=True, exist_ok=True)
+            # Unbuffered append: each event is a single write(2) at EOF
+            _EV_FH = open(ev_path, "ab", buffering=0)
+            atexit.register(_close_events)
+        _EV_FH.write(line)
@@ -1,12 +1,21 @@
+import asyncio
 from datetime import datetime, timedelta
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Tuple
 from app.models.image import Image
 from app.models.album import Album, AlbumImage
 from app.models.face import Face
 from app.models.user import PersonCluster
 from app.services.embeddings import image_embedding
+from app.services.face_embeddings_store import load_embeddings, retain_embeddings
 import numpy as np
 
+try:
+    from scipy.sparse import csr_matrix
+    from scipy.sparse.csgraph import connected_components
+except ImportError:  # optional; numpy BFS fallback below
+    csr_matrix = None
+    connected_components = None
+
 
 def _cosine_similarity(vec1: List[float], vec2: List[float]) -> float:
     """Calculate cosine similarity between two vectors"""
@@ -23,6 +32,57 @@ def _cosine_similarity(vec1: List[float], vec2: List[float]) -> float:
     return dot_product / (norm1 * norm2)
 
 
+def _similarity_matrix(embeddings: List[List[float]]) -> np.ndarray:
+    """Pairwise cosine similarity of equal-length embeddings as one (N, N) matmul"""
+    E = np.asarray(embeddings, dtype=np.float32)
+    E /= np.linalg.norm(E, axis=1, keepdims=True).clip(min=1e-12)
+    return E @ E.T
+
+
+def _component_labels(adj: np.ndarray) -> np.ndarray:
+    """Connected-component label per node of a symmetric boolean adjacency matrix"""
+    if connected_components is not None:
+        _, labels = connected_components(csr_matrix(adj), directed=False)
+        return labels
+    n = adj.shape[0]
+    labels = np.full(n, -1, dtype=np.int64)
+    comp = 0
+    for seed in range(n):
+        if labels[seed] >= 0:
+            continue
+        labels[seed] = comp
+        frontier = np.array([seed])
+        while frontier.size:
+            reached = adj[frontier].any(axis=0) & (labels < 0)
+            frontier = np.flatnonzero(reached)
+            labels[frontier] = comp
+        comp += 1
+    return labels
+
+
+def _unique_images(faces) -> List[Image]:
+    """Distinct images of a set of faces, in face order (keyed by image id)"""
+    seen: Dict[Any, Image] = {}
+    for f in faces:
+        if f.image_id not in seen and f.image is not None:
+            seen[f.image_id] = f.image
+    return list(seen.values())
+
+
+async def _get_or_create_album(user_id: str, name: str, **defaults) -> Tuple[Album, bool]:
+    """Fetch the user's album by name or create it; names are unique per user"""
+    return await Album.get_or_create(defaults=defaults, user_id=user_id, name=name)
+
+
+async def _add_images(album: Album, images: List[Image]) -> None:
+    """Attach images to an album with one multi-row INSERT"""
+    if images:
+        await AlbumImage.bulk_create(
+            [AlbumImage(album=album, image=img) for img in images],
+            batch_size=500,
+        )
+
+
 def _short_id(uuid_val) -> str:
     """Generate short human-friendly ID from UUID"""
     return str(uuid_val).split("-")[0].upper()
@@ -49,25 +109,18 @@ class AlbumService:
         created_albums = []
         for location, imgs in location_groups.items():
             if len(imgs) >= 2:
-                existing = await Album.filter(
-                    user_id=user_id,
+                album, created = await _get_or_create_album(
+                    user_id,
+                    f"{location}",
+                    description=f"Photos from {location}",
+                    album_type="location",
                     location_text=location,
-                    is_auto_generated=True
-                ).first()
+                    is_auto_generated=True,
+                    cover_image=imgs[0] if imgs else None
+                )
                 
-                if not existing:
-                    album = await Album.create(
-                        user_id=user_id,
-                        name=f"{location}",
-                        description=f"Photos from {location}",
-                        album_type="location",
-                        location_text=location,
-                        is_auto_generated=True,
-                        cover_image=imgs[0] if imgs else None
-                    )
-                    
-                    for img in imgs:
-                        await AlbumImage.create(album=album, image=img)
+                if created:
+                    await _add_images(album, imgs)
                     
                     created_albums.append(album)
         
@@ -81,52 +134,34 @@ class AlbumService:
         if not images:
             return []
         
+        # Each window starts at the first unassigned image and runs 7 days
+        # (inclusive) from it; with the dates sorted, each window end is one
+        # binary search instead of a per-image timedelta comparison.
+        dates = np.array([img.created_at.date() for img in images], dtype="datetime64[D]")
         date_groups: Dict[str, List[Image]] = {}
-        current_group = []
-        current_date = None
-        
-        for img in images:
-            img_date = img.created_at.date()
-            
-            if current_date is None:
-                current_date = img_date
-                current_group = [img]
-            elif (img_date - current_date).days <= 7:
-                current_group.append(img)
-            else:
-                if len(current_group) >= 1:
-                    group_key = f"{current_date} to {current_group[-1].created_at.date()}"
-                    date_groups[group_key] = current_group.copy()
-                
-                current_date = img_date
-                current_group = [img]
-        
-        if len(current_group) >= 1:
-            group_key = f"{current_date} to {current_group[-1].created_at.date()}"
-            date_groups[group_key] = current_group
+        start = 0
+        while start < len(images):
+            end = int(np.searchsorted(dates, dates[start] + np.timedelta64(7, "D"), side="right"))
+            group = images[start:end]
+            group_key = f"{group[0].created_at.date()} to {group[-1].created_at.date()}"
+            date_groups[group_key] = group
+            start = end
         
         created_albums = []
         for date_range, imgs in date_groups.items():
-            existing = await Album.filter(
-                user_id=user_id,
-                name=date_range,
-                is_auto_generated=True
-            ).first()
+            album, created = await _get_or_create_album(
+                user_id,
+                date_range,
+                description=f"Photos from {date_range}",
+                album_type="date",
+                start_date=imgs[0].created_at.date(),
+                end_date=imgs[-1].created_at.date(),
+                is_auto_generated=True,
+                cover_image=imgs[0] if imgs else None
+            )
             
-            if not existing:
-                album = await Album.create(
-                    user_id=user_id,
-                    name=date_range,
-                    description=f"Photos from {date_range}",
-                    album_type="date",
-                    start_date=imgs[0].created_at.date(),
-                    end_date=imgs[-1].created_at.date(),
-                    is_auto_generated=True,
-                    cover_image=imgs[0] if imgs else None
-                )
-                
-                for img in imgs:
-                    await AlbumImage.create(album=album, image=img)
+            if created:
+                await _add_images(album, imgs)
                 
                 created_albums.append(album)
         
@@ -135,51 +170,68 @@ class AlbumService:
     @staticmethod
     async def cluster_faces_by_similarity(user_id: str, similarity_threshold: float = 0.85) -> List[PersonCluster]:
         """Cluster faces by similarity using embeddings"""
-        faces = await Face.filter(image__user_id=user_id).prefetch_related("image").all()
+        # Only ids come from the database; the float16 matrix supplies the
+        # vectors and the JSON column fills in faces it does not cover
+        face_ids = [
+            str(i) for i in await Face.filter(
+                image__user_id=user_id, embedding_json__isnull=False
+            ).values_list("id", flat=True)
+        ]
         
-        if not faces:
+        if not face_ids:
             return []
         
-        face_embeddings = []
-        face_data = []
+        stored = await asyncio.to_thread(load_embeddings, user_id)
+        stored_ids, stored_E = stored if stored else ([], None)
+        live = set(face_ids)
+        if not live.issuperset(stored_ids):
+            # faces were deleted since the rows were written; drop them
+            await asyncio.to_thread(retain_embeddings, user_id, live)
+        row_of = {fid: i for i, fid in enumerate(stored_ids)}
+        missing = [fid for fid in face_ids if fid not in row_of]
+        json_of = {}
+        for i in range(0, len(missing), 1000):
+            rows = await Face.filter(id__in=missing[i:i + 1000]).values_list("id", "embedding_json")
+            json_of.update((str(fid), emb) for fid, emb in rows)
         
-        for face in faces:
+        # Group by embedding length; vectors of different sizes never match
+        by_dim: Dict[int, List[str]] = {}
+        vectors: Dict[int, list] = {}
+        for fid in face_ids:
             # Use per-face embeddings (not image-level)
-            if face.embedding_json:
-                face_embeddings.append(face.embedding_json)
-                face_data.append(face)
+            row = row_of.get(fid)
+            vec = stored_E[row] if row is not None else json_of.get(fid)
+            if vec is not None and len(vec):
+                by_dim.setdefault(len(vec), []).append(fid)
+                vectors.setdefault(len(vec), []).append(vec)
         
-        if not face_embeddings:
+        if not by_dim:
             return []
         
-        clusters = []
-        used_faces = set()
+        # Faces are linked when similarity clears the threshold; clusters are the
+        # connected components, so A~B and B~C put A, B and C together.
+        groups = []
+        for dim, face_data in by_dim.items():
+            S = _similarity_matrix(vectors[dim])
+            labels = _component_labels(S >= similarity_threshold)
+            members: Dict[int, List[str]] = {}
+            for fid, label in zip(face_data, labels.tolist()):
+                members.setdefault(label, []).append(fid)
+            groups.extend(members.values())
         
-        for i, embedding1 in enumerate(face_embeddings):
-            if i in used_faces:
-                continue
-            
-            cluster_faces = [face_data[i]]
-            used_faces.add(i)
-            
-            for j, embedding2 in enumerate(face_embeddings):
-                if j in used_faces or i == j:
-                    continue
-                
-                similarity = _cosine_similarity(embedding1, embedding2)
-                if similarity >= similarity_threshold:
-                    cluster_faces.append(face_data[j])
-                    used_faces.add(j)
-            
-            if len(cluster_faces) >= 2:
+        clusters = []
+        for cluster_face_ids in groups:
+            if len(cluster_face_ids) >= 2:
                 cluster = await PersonCluster.create(
                     user_id=user_id,
                     label=f"Person {len(clusters) + 1}"
                 )
                 
-                for face in cluster_faces:
-                    face.cluster = cluster
-                    await face.save()
+                # One UPDATE ... WHERE id IN (...) per cluster, not one per face
+                for i in range(0, len(cluster_face_ids), 1000):
+                    await Face.filter(
+                        id__in=cluster_face_ids[i:i + 1000]
+                    ).update(cluster_id=cluster.id)
                 
                 clusters.append(cluster)
         
@@ -192,28 +244,21 @@ class AlbumService:
         
         created_albums = []
         for cluster in clusters:
-            images = list(set([face.image for face in cluster.faces]))
+            images = _unique_images(cluster.faces)
             
             if len(images) >= 2:
-                existing = await Album.filter(
-                    user_id=user_id,
+                album, created = await _get_or_create_album(
+                    user_id,
+                    f"{cluster.label}",
+                    description=f"Photos of {cluster.label}",
+                    album_type="person",
                     person_cluster=cluster,
-                    is_auto_generated=True
-                ).first()
+                    is_auto_generated=True,
+                    cover_image=images[0] if images else None
+                )
                 
-                if not existing:
-                    album = await Album.create(
-                        user_id=user_id,
-                        name=f"{cluster.label}",
-                        description=f"Photos of {cluster.label}",
-                        album_type="person",
-                        person_cluster=cluster,
-                        is_auto_generated=True,
-                        cover_image=images[0] if images else None
-                    )
-                    
-                    for img in images:
-                        await AlbumImage.create(album=album, image=img)
+                if created:
+                    await _add_images(album, images)
                     
                     created_albums.append(album)
         
@@ -247,9 +292,21 @@ class AlbumService:
         if not clusters:
             return []
 
+        # Storage moves are network round-trips; overlap up to 32 at a time
+        sem = asyncio.Semaphore(32)
+
+        async def _move(img: Image, folder_name: str) -> None:
+            async with sem:
+                if asyncio.iscoroutinefunction(storage.move_to_folder):
+                    new_key = await storage.move_to_folder(img.storage_key, folder_name)
+                else:
+                    new_key = storage.move_to_folder(img.storage_key, folder_name)
+                img.storage_key = new_key
+                await img.save()
+
         clist = []
         for c in clusters:
-            imgs = list({f.image for f in c.faces if f.image is not None})
+            imgs = _unique_images(c.faces)
             clist.append((c, imgs))
 
         clist.sort(key=lambda t: len(t[1]), reverse=True)
@@ -260,28 +317,21 @@ class AlbumService:
             short = _short_id(cluster.id)
             folder_name = f"person-{short}"
             name = f"Person-{short}"
-            existing = await Album.filter(user_id=user_id, name=name, album_type="person").first()
-            if existing:
-                continue
-            album = await Album.create(
-                user_id=user_id,
-                name=name,
+            album, was_created = await _get_or_create_album(
+                user_id,
+                name,
                 description=f"Auto person folder for cluster {cluster.id}",
                 album_type="person",
                 person_cluster=cluster,
                 is_auto_generated=True,
                 cover_image=images[0] if images else None,
             )
-            for img in images:
-                await AlbumImage.create(album=album, image=img)
-                try:
-                    if asyncio.iscoroutinefunction(storage.move_to_folder):
-                        new_key = await storage.move_to_folder(img.storage_key, folder_name)
-                    else:
-                        new_key = storage.move_to_folder(img.storage_key, folder_name)
-                    img.storage_key = new_key
-                    await img.save()
-                except Exception:
-                    pass
+            if not was_created:
+                continue
+            await _add_images(album, images)
+            await asyncio.gather(
+                *[_move(img, folder_name) for img in images],
+                return_exceptions=True,
+            )
             created.append(album)
         return created
\ No newline at end of file
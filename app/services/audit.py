@@ -3,9 +3,116 @@ Audit logging service for PhotoVault
 Tracks important user actions and system events
 """
 
+import asyncio
 import uuid
 from tortoise import Tortoise
 
+_COLUMNS = "(id, user_id, action, subject_type, subject_id, ip, ua)"
+_BATCH_MAX = 500
+_FLUSH_INTERVAL_S = 0.1
+_STOP_TIMEOUT_S = 10.0
+# SQLite's default SQLITE_MAX_VARIABLE_NUMBER is 999 bound parameters
+_SQLITE_MAX_ROWS = 999 // 7
+_STOP = object()  # queued by stop_audit_flusher: drain, then exit
+
+# Events are buffered here and written by a background flusher when it is running
+_audit_queue: asyncio.Queue | None = None
+_flusher_task: asyncio.Task | None = None
+
+
+async def _insert_rows(rows: list[list]) -> None:
+    """Write audit rows with multi-row INSERTs (several on SQLite)."""
+    try:
+        conn = Tortoise.get_connection("default")
+        step = _SQLITE_MAX_ROWS if conn.capabilities.dialect == "sqlite" else len(rows)
+    except Exception:
+        step = len(rows)
+    for i in range(0, len(rows), max(step, 1)):
+        await _insert_chunk(rows[i:i + step])
+
+
+async def _insert_chunk(rows: list[list]) -> None:
+    placeholders = []
+    params: list = []
+    for row in rows:
+        base = len(params)
+        placeholders.append("(" + ", ".join(f"${base + i + 1}" for i in range(len(row))) + ")")
+        params.extend(row)
+    try:
+        await Tortoise.get_connection("default").execute_query(
+            f"INSERT INTO audit_events {_COLUMNS} VALUES " + ", ".join(placeholders),
+            params,
+        )
+    except Exception as e:
+        print(f"Failed to log {len(rows)} audit event(s): {e}")
+
+
+async def _flusher() -> None:
+    assert _audit_queue is not None
+    loop = asyncio.get_running_loop()
+    batch: list = []
+    try:
+        while True:
+            # Wait for one event, then gather more for up to the flush interval
+            item = await _audit_queue.get()
+            deadline = loop.time() + _FLUSH_INTERVAL_S
+            while item is not _STOP:
+                batch.append(item)
+                timeout = deadline - loop.time()
+                if len(batch) >= _BATCH_MAX or timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(_audit_queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+            rows, batch = batch, []
+            if rows:
+                await _insert_rows(rows)
+            if item is _STOP:
+                # everything queued before the marker has now been written
+                return
+    except asyncio.CancelledError:
+        if batch:
+            await _insert_rows(batch)
+        raise
+
+
+def start_audit_flusher() -> None:
+    """Start buffering audit events; call from application startup."""
+    global _audit_queue, _flusher_task
+    if _flusher_task is not None:
+        return
+    _audit_queue = asyncio.Queue(maxsize=10000)
+    _flusher_task = asyncio.create_task(_flusher())
+
+
+async def stop_audit_flusher() -> None:
+    """Stop the flusher and write whatever is still buffered."""
+    global _audit_queue, _flusher_task
+    if _flusher_task is None:
+        return
+    # Let the flusher write out the backlog itself; only cancel if it hangs
+    if _audit_queue is not None and not _flusher_task.done():
+        await _audit_queue.put(_STOP)
+    try:
+        await asyncio.wait_for(asyncio.shield(_flusher_task), _STOP_TIMEOUT_S)
+    except asyncio.TimeoutError:
+        _flusher_task.cancel()
+        try:
+            await _flusher_task
+        except asyncio.CancelledError:
+            pass
+    except Exception:
+        pass
+    pending = []
+    while _audit_queue is not None and not _audit_queue.empty():
+        item = _audit_queue.get_nowait()
+        if item is not _STOP:
+            pending.append(item)
+    _audit_queue, _flusher_task = None, None
+    for i in range(0, len(pending), _BATCH_MAX):
+        await _insert_rows(pending[i:i + _BATCH_MAX])
+
 
 async def audit(
     user_id: str | None, 
@@ -18,6 +125,9 @@ async def audit(
     """
     Log an audit event to the database.
     
+    The event is queued for the background flusher when it is running,
+    otherwise (or if the queue is full) it is written immediately.
+    
     Args:
         user_id: ID of the user performing the action (None for system events)
         action: Action being performed (e.g., 'upload_image', 'create_share', 'login')
@@ -26,16 +136,14 @@ async def audit(
         ip: IP address of the client
         ua: User agent string
     """
-    try:
-        await Tortoise.get_connection("default").execute_query(
-            """
-            INSERT INTO audit_events (id, user_id, action, subject_type, subject_id, ip, ua)
-            VALUES ($1, $2, $3, $4, $5, $6, $7)
-            """,
-            [str(uuid.uuid4()), user_id, action, subject_type, subject_id, ip, ua],
-        )
-    except Exception as e:
-        print(f"Failed to log audit event: {e}")
+    row = [str(uuid.uuid4()), user_id, action, subject_type, subject_id, ip, ua]
+    if _audit_queue is not None:
+        try:
+            _audit_queue.put_nowait(row)
+            return
+        except asyncio.QueueFull:
+            pass
+    await _insert_rows([row])
 
 
 async def get_audit_logs(
@@ -3,49 +3,95 @@ import json
 from typing import Any, Optional
 
 try:
-    import redis  # type: ignore
+    from redis import asyncio as aioredis  # type: ignore
 except Exception:  # pragma: no cover - optional dependency at runtime
-    redis = None  # type: ignore
+    aioredis = None  # type: ignore
+
+try:
+    import orjson  # type: ignore
+except ImportError:  # pragma: no cover - optional dependency at runtime
+    orjson = None  # type: ignore
 
 
 _REDIS_URL = os.getenv("REDIS_URL", "redis://127.0.0.1:6379/0")
 _client = None
-if redis is not None:
+if aioredis is not None:
     try:
-        _client = redis.from_url(_REDIS_URL)
+        # Connections are opened lazily on first command
+        _client = aioredis.Redis.from_url(_REDIS_URL, decode_responses=False)
     except Exception:
         _client = None
 
 
+# Invalidation is tag based: every key cached under a tag (e.g. "user:<id>") is
+# recorded in the Redis set "<tag>:keys", so dropping a tag touches only the keys
+# that were actually written for it instead of SCANning the whole keyspace.
+# UNLINK frees the values on Redis' background thread.
+_INVALIDATE_TAG_LUA = """
+local keys = redis.call('SMEMBERS', KEYS[1])
+local n = 0
+for i = 1, #keys, 500 do
+    n = n + redis.call('UNLINK', unpack(keys, i, math.min(i + 499, #keys)))
+end
+redis.call('UNLINK', KEYS[1])
+return n
+"""
+_invalidate_tag = None
+if _client is not None:
+    try:
+        _invalidate_tag = _client.register_script(_INVALIDATE_TAG_LUA)
+    except Exception:
+        _invalidate_tag = None
+
+
+def _dumps(value: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value).encode("utf-8")
+
+
+def _loads(raw: bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def _tag_set(tag: str) -> str:
+    return f"{tag}:keys"
+
+
 async def cache_get_json(key: str) -> Optional[Any]:
     if _client is None:
         return None
     try:
-        raw = _client.get(key)
-        return json.loads(raw) if raw else None
+        raw = await _client.get(key)
+        return _loads(raw) if raw else None
     except Exception:
         return None
 
 
-async def cache_set_json(key: str, value: Any, ttl: int = 60) -> None:
+async def cache_set_json(key: str, value: Any, ttl: int = 60, tag: Optional[str] = None) -> None:
     if _client is None:
         return
     try:
-        _client.setex(key, ttl, json.dumps(value))
+        if tag is None:
+            await _client.setex(key, ttl, _dumps(value))
+            return
+        tag_set = _tag_set(tag)
+        pipe = _client.pipeline(transaction=False)
+        pipe.setex(key, ttl, _dumps(value))
+        pipe.sadd(tag_set, key)
+        pipe.expire(tag_set, ttl)
+        await pipe.execute()
     except Exception:
         return
 
 
 async def cache_invalidate_prefix(prefix: str) -> int:
-    if _client is None:
+    """Drop every key cached under the tag ``prefix`` in one round-trip."""
+    if _invalidate_tag is None:
         return 0
-    count = 0
     try:
-        for k in _client.scan_iter(f"{prefix}*"):
-            _client.delete(k)
-            count += 1
+        return int(await _invalidate_tag(keys=[_tag_set(prefix)]))
     except Exception:
         return 0
-    return count
-
-
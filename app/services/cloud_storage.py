@@ -1,11 +1,40 @@
 import os
-import base64
-from typing import Optional
+from typing import AsyncIterator, Dict, List, Optional
 from app.config import settings
+from app.services import storage_batch
 import aiohttp
 import json
 
 
+# One pooled session per process so keep-alive connections to Cloudinary are
+# reused instead of paying a TCP+TLS handshake on every call.
+_CHUNK = 64 * 1024
+# Gallery pages check the same keys over and over; remember HEAD results
+# (including 404s) for a few minutes instead of re-asking Cloudinary.
+_exists_cache = storage_batch.ExistsCache(maxsize=100_000, ttl=300)
+_session: Optional[aiohttp.ClientSession] = None
+
+
+async def _get_session() -> aiohttp.ClientSession:
+    global _session
+    if _session is None or _session.closed:
+        _session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=100, limit_per_host=32, keepalive_timeout=75, ttl_dns_cache=300
+            ),
+            timeout=aiohttp.ClientTimeout(total=30),
+        )
+    return _session
+
+
+async def close_session() -> None:
+    """Close the shared HTTP session; call on application shutdown."""
+    global _session
+    if _session is not None and not _session.closed:
+        await _session.close()
+    _session = None
+
+
 class CloudinaryStorage:
     """Free cloud storage using Cloudinary's free tier"""
     
@@ -19,42 +48,39 @@ class CloudinaryStorage:
     async def save(self, user_id: str, filename: str, data: bytes, folder: str | None = None) -> str:
         """Save encrypted image data to Cloudinary"""
         try:
-            # Encode data as base64
-            encoded_data = base64.b64encode(data).decode('utf-8')
-            
             # Create unique public_id for the image
             base = f"photovault/{user_id}"
             public_id = f"{base}/{folder}/{filename}" if folder else f"{base}/{filename}"
             
-            # Prepare upload data
-            upload_data = {
-                'file': f'data:application/octet-stream;base64,{encoded_data}',
-                'public_id': public_id,
-                'resource_type': 'auto',
-                'folder': base if folder is None else f"{base}/{folder}",
-                'access_mode': 'authenticated'  # Requires authentication to access
-            }
+            # Multipart upload: the raw bytes go out as the file part, with no
+            # base64 data: URI inflating the body by a third
+            upload_data = aiohttp.FormData()
+            upload_data.add_field('file', data, filename=filename, content_type='application/octet-stream')
+            upload_data.add_field('public_id', public_id)
+            upload_data.add_field('resource_type', 'auto')
+            upload_data.add_field('folder', base if folder is None else f"{base}/{folder}")
+            upload_data.add_field('access_mode', 'authenticated')  # Requires authentication to access
             
             # Upload to Cloudinary
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    f"{self.base_url}/image/upload",
-                    data=upload_data,
-                    auth=aiohttp.BasicAuth(self.api_key, self.api_secret)
-                ) as response:
-                    if response.status == 200:
-                        result = await response.json()
-                        return result['public_id']  # Return the public_id as storage key
-                    else:
-                        raise Exception(f"Cloudinary upload failed: {response.status}")
+            session = await _get_session()
+            async with session.post(
+                f"{self.base_url}/image/upload",
+                data=upload_data,
+                auth=aiohttp.BasicAuth(self.api_key, self.api_secret)
+            ) as response:
+                if response.status == 200:
+                    result = await response.json()
+                    _exists_cache.set(result['public_id'], True)
+                    return result['public_id']  # Return the public_id as storage key
+                else:
+                    raise Exception(f"Cloudinary upload failed: {response.status}")
         
         except Exception as e:
             # Fallback to local storage if cloud storage fails
             from app.services.storage import storage
             return storage.save(user_id, filename, data)
     
-    async def read(self, storage_key: str) -> bytes:
-        """Read encrypted image data from Cloudinary"""
+    def _download_url(self, storage_key: str) -> str:
         # Validate storage_key to prevent path traversal
         if not storage_key or ".." in storage_key or storage_key.startswith("/"):
             raise ValueError("Invalid storage key")
@@ -63,46 +89,88 @@ class CloudinaryStorage:
         import re
         if not re.match(r'^[a-zA-Z0-9/_.-]+$', storage_key):
             raise ValueError("Storage key contains invalid characters")
+        return f"https://res.cloudinary.com/{self.cloud_name}/image/upload/{storage_key}"
+
+    async def read(self, storage_key: str) -> bytes:
+        """Read encrypted image data from Cloudinary"""
+        download_url = self._download_url(storage_key)
         
         try:
             # Download from Cloudinary
-            download_url = f"https://res.cloudinary.com/{self.cloud_name}/image/upload/{storage_key}"
-            
-            async with aiohttp.ClientSession() as session:
-                async with session.get(download_url) as response:
-                    if response.status == 200:
-                        return await response.read()
-                    else:
-                        raise Exception(f"Cloudinary download failed: {response.status}")
+            session = await _get_session()
+            async with session.get(download_url) as response:
+                if response.status != 200:
+                    raise Exception(f"Cloudinary download failed: {response.status}")
+                if response.content_length is None:
+                    return await response.read()
+                # Fill a buffer sized from Content-Length instead of letting
+                # aiohttp grow one chunk by chunk
+                buf = bytearray(response.content_length)
+                off = 0
+                async for chunk in response.content.iter_chunked(_CHUNK):
+                    buf[off:off + len(chunk)] = chunk
+                    off += len(chunk)
+                del buf[off:]
+                return bytes(buf)
         
         except Exception as e:
             # Fallback to local storage if cloud storage fails
             from app.services.storage import storage
             return storage.read(storage_key)
+
+    async def read_stream(self, storage_key: str) -> AsyncIterator[bytes]:
+        """Yield encrypted image data in 64 KiB chunks as it arrives"""
+        download_url = self._download_url(storage_key)
+        started = False
+        try:
+            session = await _get_session()
+            async with session.get(download_url) as response:
+                if response.status != 200:
+                    raise Exception(f"Cloudinary download failed: {response.status}")
+                async for chunk in response.content.iter_chunked(_CHUNK):
+                    started = True
+                    yield chunk
+        except Exception:
+            # Once bytes have gone out a fallback would corrupt the stream
+            if started:
+                raise
+            from app.services.storage import storage
+            yield storage.read(storage_key)
     
     async def delete(self, storage_key: str) -> bool:
         """Delete image from Cloudinary"""
+        _exists_cache.discard(storage_key)
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.delete(
-                    f"{self.base_url}/image/destroy",
-                    data={'public_id': storage_key},
-                    auth=aiohttp.BasicAuth(self.api_key, self.api_secret)
-                ) as response:
-                    return response.status == 200
+            session = await _get_session()
+            async with session.delete(
+                f"{self.base_url}/image/destroy",
+                data={'public_id': storage_key},
+                auth=aiohttp.BasicAuth(self.api_key, self.api_secret)
+            ) as response:
+                return response.status == 200
         except Exception:
             return False
     
     async def exists(self, storage_key: str) -> bool:
         """Check if image exists in Cloudinary"""
+        cached = _exists_cache.get(storage_key)
+        if cached is not None:
+            return cached
         try:
             download_url = f"https://res.cloudinary.com/{self.cloud_name}/image/upload/{storage_key}"
-            async with aiohttp.ClientSession() as session:
-                async with session.head(download_url) as response:
-                    return response.status == 200
+            session = await _get_session()
+            async with session.head(download_url) as response:
+                found = response.status == 200
+                if found or response.status == 404:
+                    _exists_cache.set(storage_key, found)
+                return found
         except Exception:
             return False
 
+    async def exists_many(self, storage_keys: List[str]) -> Dict[str, bool]:
+        """Check many keys at once; cached answers skip the HEAD entirely"""
+        return await storage_batch.exists_many(self.exists, storage_keys)
+
     async def move_to_folder(self, storage_key: str, new_folder: str) -> str:
         """Move encrypted file to a new folder"""
         # Validate inputs to prevent path traversal
@@ -154,6 +222,11 @@ class HybridStorage:
             # Fallback to local storage (not async)
             return self.local_storage.read(storage_key)
     
+    async def read_stream(self, storage_key: str) -> AsyncIterator[bytes]:
+        """Stream from cloud storage; CloudinaryStorage.read_stream falls back to local"""
+        async for chunk in self.cloud_storage.read_stream(storage_key):
+            yield chunk
+    
     async def delete(self, storage_key: str) -> bool:
         """Delete from cloud storage, fallback to local"""
         try:
@@ -181,6 +254,10 @@ class HybridStorage:
             # Fallback to local storage
             return self.local_storage.exists(storage_key)
 
+    async def exists_many(self, storage_keys: List[str]) -> Dict[str, bool]:
+        """Check many keys concurrently; see CloudinaryStorage.exists_many"""
+        return await storage_batch.exists_many(self.exists, storage_keys)
+
     async def save_in_folder(self, user_id: str, folder: str, filename: str, data: bytes) -> str:
         """Save to cloud storage in specific folder, fallback to local"""
         try:
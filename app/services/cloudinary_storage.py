@@ -3,9 +3,14 @@ import cloudinary
 import cloudinary.uploader
 import cloudinary.api
 from io import BytesIO
+import asyncio
+import inspect
 import os
-from typing import Optional
+from typing import Dict, List, Optional
 import requests
+from app.services import storage_batch
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 
 # Configure Cloudinary with environment variables
@@ -16,18 +21,47 @@ cloudinary.config(
     secure=True,
 )
 
+# Shared keep-alive pool for reads/HEADs against res.cloudinary.com
+_req = requests.Session()
+_req.mount(
+    "https://",
+    HTTPAdapter(pool_connections=32, pool_maxsize=64, max_retries=Retry(total=3, backoff_factor=2)),
+)
+
+# HEAD results (including 404s) per secure URL, so gallery pages do not
+# re-check the same keys on every render
+_exists_cache = storage_batch.ExistsCache(maxsize=100_000, ttl=300)
+
+
+def _download(url: str) -> bytes:
+    # Stream into a buffer sized from Content-Length rather than letting
+    # requests concatenate chunks into .content
+    with _req.get(url, timeout=30, stream=True) as response:
+        response.raise_for_status()
+        size = response.headers.get("Content-Length")
+        if not size:
+            return response.content
+        buf = bytearray(int(size))
+        off = 0
+        for chunk in response.iter_content(64 * 1024):
+            buf[off:off + len(chunk)] = chunk
+            off += len(chunk)
+        del buf[off:]
+        return bytes(buf)
+
 
 class CloudinaryStorage:
     """Cloudinary-based storage for production deployment"""
     
-    def save(self, user_id: str, filename: str, data: bytes) -> str:
+    async def save(self, user_id: str, filename: str, data: bytes) -> str:
         """Save encrypted image data to Cloudinary"""
         try:
             # Create unique public_id for the image
             public_id = f"photovault/{user_id}/{filename}"
             
             # Upload to Cloudinary
-            result = cloudinary.uploader.upload(
+            result = await asyncio.to_thread(
+                cloudinary.uploader.upload,
                 BytesIO(data),
                 public_id=public_id,
                 resource_type="auto",  # auto-detect file type
@@ -37,6 +71,7 @@ class CloudinaryStorage:
             )
             
             # Return the secure URL as storage key
+            _exists_cache.set(result["secure_url"], True)
             return result["secure_url"]
             
         except Exception as e:
@@ -44,13 +79,11 @@ class CloudinaryStorage:
             from app.services.storage import storage as local_storage
             return local_storage.save(user_id, filename, data)
     
-    def read(self, storage_key: str) -> bytes:
+    async def read(self, storage_key: str) -> bytes:
         """Read encrypted image data from Cloudinary URL"""
         try:
             # storage_key is the Cloudinary secure URL
-            response = requests.get(storage_key, timeout=30)
-            response.raise_for_status()
-            return response.content
+            return await asyncio.to_thread(_download, storage_key)
             
         except Exception as e:
             # Try fallback to local storage
@@ -60,13 +93,19 @@ class CloudinaryStorage:
             except Exception:
                 raise Exception(f"Failed to read from Cloudinary: {e}")
     
-    def exists(self, storage_key: str) -> bool:
+    async def exists(self, storage_key: str) -> bool:
         """Check if image exists at Cloudinary URL"""
         try:
             # For Cloudinary URLs, do a HEAD request
             if storage_key.startswith("https://res.cloudinary.com"):
-                response = requests.head(storage_key, timeout=10)
-                return response.status_code == 200
+                cached = _exists_cache.get(storage_key)
+                if cached is not None:
+                    return cached
+                response = await asyncio.to_thread(_req.head, storage_key, timeout=10)
+                found = response.status_code == 200
+                if found or response.status_code == 404:
+                    _exists_cache.set(storage_key, found)
+                return found
             else:
                 # Fallback to local storage check
                 from app.services.storage import storage as local_storage
@@ -75,8 +114,9 @@ class CloudinaryStorage:
         except Exception:
             return False
     
-    def delete(self, storage_key: str) -> bool:
+    async def delete(self, storage_key: str) -> bool:
         """Delete image from Cloudinary"""
+        _exists_cache.discard(storage_key)
         try:
             # Extract public_id from secure URL
             if "photovault/" in storage_key:
@@ -87,7 +127,7 @@ class CloudinaryStorage:
                     idx = parts.index("photovault")
                     public_id = "/".join(parts[idx:]).split(".")[0]  # Remove extension
                     
-                    result = cloudinary.uploader.destroy(public_id)
+                    result = await asyncio.to_thread(cloudinary.uploader.destroy, public_id)
                     return result.get("result") == "ok"
             
             return False
@@ -96,6 +136,13 @@ class CloudinaryStorage:
             return False
 
 
+async def _maybe_await(result):
+    # Local storage is synchronous; the Cloudinary backend returns coroutines
+    if inspect.isawaitable(result):
+        return await result
+    return result
+
+
 class HybridCloudStorage:
     """
     Hybrid storage for production:
@@ -117,22 +164,26 @@ class HybridCloudStorage:
             self.storage = local_storage
             self.storage_type = "local"
     
-    def save(self, user_id: str, filename: str, data: bytes) -> str:
+    async def save(self, user_id: str, filename: str, data: bytes) -> str:
         """Save to appropriate storage backend"""
-        return self.storage.save(user_id, filename, data)
+        return await _maybe_await(self.storage.save(user_id, filename, data))
     
-    def read(self, key: str) -> bytes:
+    async def read(self, key: str) -> bytes:
         """Read from appropriate storage backend"""
-        return self.storage.read(key)
+        return await _maybe_await(self.storage.read(key))
     
-    def exists(self, key: str) -> bool:
+    async def exists(self, key: str) -> bool:
         """Check if exists in appropriate storage backend"""
-        return self.storage.exists(key)
+        return await _maybe_await(self.storage.exists(key))
+    
+    async def exists_many(self, keys: List[str]) -> Dict[str, bool]:
+        """Check many keys concurrently; Cloudinary answers are cached for 5 minutes"""
+        return await storage_batch.exists_many(self.exists, keys)
     
-    def delete(self, key: str) -> bool:
+    async def delete(self, key: str) -> bool:
         """Delete from appropriate storage backend"""
         if hasattr(self.storage, 'delete'):
-            return self.storage.delete(key)
+            return await _maybe_await(self.storage.delete(key))
         return False
 
 
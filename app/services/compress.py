@@ -1,6 +1,14 @@
 import io
 from PIL import Image
 
+try:
+    import numpy as np
+    from turbojpeg import TurboJPEG, TJPF_RGB, TJSAMP_420  # type: ignore
+    _tj = TurboJPEG()
+except Exception:  # optional libjpeg-turbo binding; PIL's encoder is used instead
+    _tj = None
+
+
 def compress_image_bytes(img_bytes: bytes, quality: int = 85, max_size: int = 1920) -> bytes:
     """Compress and resize image bytes, keeping EXIF."""
     with Image.open(io.BytesIO(img_bytes)) as im:
@@ -9,7 +17,25 @@ def compress_image_bytes(img_bytes: bytes, quality: int = 85, max_size: int = 19
         if max(im.size) > max_size:
             scale = max_size / max(im.size)
             new_size = (int(im.width * scale), int(im.height * scale))
-            im = im.resize(new_size, Image.LANCZOS)
+            # JPEG can decode straight at 1/2, 1/4 or 1/8 size via DCT scaling
+            im.draft(im.mode, new_size)
+            # Bilinear is indistinguishable from Lanczos after JPEG quantisation
+            # for mild downscales and several times cheaper
+            resample = Image.BILINEAR if scale > 0.5 else Image.LANCZOS
+            im = im.resize(new_size, resample, reducing_gap=3.0)
+        if im_format == "JPEG" and _tj is not None:
+            return _tj.encode(
+                np.asarray(im.convert("RGB")),
+                quality=quality,
+                pixel_format=TJPF_RGB,
+                jpeg_subsample=TJSAMP_420,
+            )
         buf = io.BytesIO()
-        im.save(buf, format=im_format, quality=quality, optimize=True)
-        return buf.getvalue()
\ No newline at end of file
+        # No optimize=True: the second Huffman pass costs ~2x CPU for ~1% size
+        if im_format == "JPEG":
+            # Baseline 4:2:0, same as the turbojpeg path; progressive scans
+            # cost extra CPU for no size win at these dimensions
+            im.save(buf, format=im_format, quality=quality, subsampling=2, progressive=False)
+        else:
+            im.save(buf, format=im_format, quality=quality)
+        return buf.getvalue()
@@ -0,0 +1,77 @@
+"""
+Content-addressed cache for per-photo derived values (pHash, embeddings).
+
+Keys are a BLAKE2b-128 digest of the uploaded bytes, so client retries and
+re-uploads of the same photo reuse the earlier pHash/CLIP work instead of
+recomputing it. Values live in Redis when it is reachable, with a small
+in-process LRU in front of it.
+"""
+
+import hashlib
+import inspect
+import io
+import threading
+from collections import OrderedDict
+from typing import Awaitable, Callable, Optional, Union
+
+from app.services import cache
+
+_TTL_SECONDS = 7 * 24 * 60 * 60
+_LOCAL_MAX = 2048
+_local: "OrderedDict[str, bytes]" = OrderedDict()
+_local_lock = threading.Lock()
+
+
+def content_digest(data: bytes) -> str:
+    """BLAKE2b-128 hex digest of ``data``; used as the cache key namespace."""
+    if hasattr(hashlib, "file_digest"):  # Python 3.11+
+        return hashlib.file_digest(io.BytesIO(data), lambda: hashlib.blake2b(digest_size=16)).hexdigest()
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def _local_get(k: str) -> Optional[bytes]:
+    with _local_lock:
+        v = _local.get(k)
+        if v is not None:
+            _local.move_to_end(k)
+        return v
+
+
+def _local_put(k: str, v: bytes) -> None:
+    with _local_lock:
+        _local[k] = v
+        _local.move_to_end(k)
+        while len(_local) > _LOCAL_MAX:
+            _local.popitem(last=False)
+
+
+async def get_or_compute(
+    digest: str,
+    key: str,
+    compute_fn: Callable[[], Union[bytes, Awaitable[bytes]]],
+    ttl: int = _TTL_SECONDS,
+) -> bytes:
+    """Return the cached ``key:digest`` value, computing and storing it on a miss."""
+    k = f"{key}:{digest}"
+    v = _local_get(k)
+    if v is not None:
+        return v
+    client = cache._client
+    if client is not None:
+        try:
+            v = await client.get(k)
+        except Exception:
+            v = None
+        if v is not None:
+            _local_put(k, v)
+            return v
+    v = compute_fn()
+    if inspect.isawaitable(v):
+        v = await v
+    _local_put(k, v)
+    if client is not None:
+        try:
+            await client.setex(k, ttl, v)
+        except Exception:
+            pass
+    return v
@@ -1,6 +1,8 @@
 # app/services/deta_storage.py
 from deta import Deta
 from typing import Optional
+import asyncio
+import inspect
 import os
 from app.config import settings
 
@@ -17,48 +19,61 @@ except Exception:
 
 
 class DetaDriveStorage:
-    """Deta Drive storage for cloud deployment"""
+    """Deta Drive storage for cloud deployment.
+
+    The Deta SDK is blocking HTTP, so each call runs in a worker thread to keep
+    the event loop free while the request is in flight.
+    """
     
-    def save(self, user_id: str, filename: str, data: bytes) -> str:
+    async def save(self, user_id: str, filename: str, data: bytes) -> str:
         """Save encrypted image data to Deta Drive"""
         if not DETA_AVAILABLE or not _drive:
             raise Exception("Deta Drive not available")
         
         key = f"{user_id}/{filename}"
-        _drive.put(key, data=data)   # store bytes
+        await asyncio.to_thread(_drive.put, key, data=data)   # store bytes
         return key
 
-    def read(self, key: str) -> bytes:
+    async def read(self, key: str) -> bytes:
         """Read encrypted image data from Deta Drive"""
         if not DETA_AVAILABLE or not _drive:
             raise Exception("Deta Drive not available")
         
-        f = _drive.get(key)
-        return f.read() if f else b""
+        def _get() -> bytes:
+            f = _drive.get(key)
+            return f.read() if f else b""
+        return await asyncio.to_thread(_get)
 
-    def exists(self, key: str) -> bool:
+    async def exists(self, key: str) -> bool:
         """Check if file exists in Deta Drive"""
         if not DETA_AVAILABLE or not _drive:
             return False
         
         try:
-            f = _drive.get(key)
+            f = await asyncio.to_thread(_drive.get, key)
             return f is not None
         except Exception:
             return False
 
-    def delete(self, key: str) -> bool:
+    async def delete(self, key: str) -> bool:
         """Delete file from Deta Drive"""
         if not DETA_AVAILABLE or not _drive:
             return False
         
         try:
-            _drive.delete(key)
+            await asyncio.to_thread(_drive.delete, key)
             return True
         except Exception:
             return False
 
 
+async def _maybe_await(result):
+    # Local storage is synchronous; remote backends return coroutines
+    if inspect.isawaitable(result):
+        return await result
+    return result
+
+
 class HybridCloudStorage:
     """
     Hybrid storage that uses:
@@ -76,22 +91,22 @@ class HybridCloudStorage:
             self.storage = local_storage
             self.storage_type = "local"
     
-    def save(self, user_id: str, filename: str, data: bytes) -> str:
+    async def save(self, user_id: str, filename: str, data: bytes) -> str:
         """Save to appropriate storage backend"""
-        return self.storage.save(user_id, filename, data)
+        return await _maybe_await(self.storage.save(user_id, filename, data))
     
-    def read(self, key: str) -> bytes:
+    async def read(self, key: str) -> bytes:
         """Read from appropriate storage backend"""
-        return self.storage.read(key)
+        return await _maybe_await(self.storage.read(key))
     
-    def exists(self, key: str) -> bool:
+    async def exists(self, key: str) -> bool:
         """Check if exists in appropriate storage backend"""
-        return self.storage.exists(key)
+        return await _maybe_await(self.storage.exists(key))
     
-    def delete(self, key: str) -> bool:
+    async def delete(self, key: str) -> bool:
         """Delete from appropriate storage backend"""
         if hasattr(self.storage, 'delete'):
-            return self.storage.delete(key)
+            return await _maybe_await(self.storage.delete(key))
         else:
             # Fallback for local storage
             try:
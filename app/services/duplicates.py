@@ -3,6 +3,16 @@ Duplicate detection service using perceptual hashing (pHash)
 Detects near-duplicate images using Hamming distance
 """
 
+import io
+from typing import Iterable
+
+import numpy as np
+
+_M1 = np.uint64(0x5555555555555555)
+_M2 = np.uint64(0x3333333333333333)
+_M4 = np.uint64(0x0F0F0F0F0F0F0F0F)
+_H01 = np.uint64(0x0101010101010101)
+
 
 def is_near_duplicate(phash_hex_a: str, phash_hex_b: str, threshold: int = 8) -> bool:
     """
@@ -52,3 +62,101 @@ def calculate_hamming_distance(phash_hex_a: str, phash_hex_b: str) -> int:
         return (a ^ b).bit_count()
     except (ValueError, TypeError):
         return 64
+
+
+def phash_hex_from_bytes(img_bytes: bytes) -> str | None:
+    """
+    pHash straight from encoded bytes.
+    
+    pHash only looks at a 32x32 grayscale thumbnail, so JPEGs are decoded
+    with libjpeg's DCT-domain scaling (up to 1/8 size, luma only) instead of
+    a full-resolution RGB decode. Other formats decode normally. The EXIF
+    orientation is applied first, so the hash describes the image as shown.
+    The scaled decode can move a few bits against a full decode, which the
+    Hamming threshold absorbs.
+    
+    Returns None when imagehash is not installed or the bytes do not decode.
+    """
+    try:
+        import imagehash
+        from PIL import Image, ImageOps
+    except ImportError:
+        return None
+    try:
+        with Image.open(io.BytesIO(img_bytes)) as im:
+            if img_bytes[:3] == b"\xff\xd8\xff":
+                im.draft("L", (32, 32))
+            return str(imagehash.phash(ImageOps.exif_transpose(im).convert("L")))
+    except Exception:
+        return None
+
+
+def pack_phashes(phash_hexes: Iterable[str]) -> np.ndarray:
+    """
+    Parse pHash hex strings once into a uint64 array for find_near_duplicates.
+    
+    Unparseable or empty hashes are stored as 0; callers that care should
+    filter them out beforehand.
+    """
+    out = []
+    for h in phash_hexes:
+        try:
+            out.append(int(h, 16) if h else 0)
+        except (ValueError, TypeError):
+            out.append(0)
+    return np.array(out, dtype=np.uint64)
+
+
+def _popcount64(x: np.ndarray) -> np.ndarray:
+    if hasattr(np, "bitwise_count"):  # numpy >= 2.0
+        return np.bitwise_count(x)
+    # SWAR popcount, one vectorised pass per step
+    x = x - ((x >> np.uint64(1)) & _M1)
+    x = (x & _M2) + ((x >> np.uint64(2)) & _M2)
+    x = (x + (x >> np.uint64(4))) & _M4
+    return (x * _H01) >> np.uint64(56)
+
+
+def hamming_distances(query_hex: str, db: np.ndarray) -> np.ndarray:
+    """
+    Hamming distance from one pHash to every entry of a packed uint64 array.
+    
+    Args:
+        query_hex: Query image's pHash as hex string
+        db: Hashes packed by pack_phashes
+    
+    Returns:
+        Distances as an int array aligned with ``db`` (64 everywhere if the query is invalid)
+    """
+    try:
+        q = np.uint64(int(query_hex, 16))
+    except (ValueError, TypeError):
+        return np.full(db.shape[0], 64, dtype=np.int64)
+    return _popcount64(db ^ q).astype(np.int64)
+
+
+def find_near_duplicates(query_hex: str, db: np.ndarray, threshold: int = 8) -> np.ndarray:
+    """
+    Indices of packed hashes within ``threshold`` bits of ``query_hex``.
+    
+    Args:
+        query_hex: Query image's pHash as hex string
+        db: Hashes packed by pack_phashes
+        threshold: Maximum Hamming distance to consider as duplicate (default: 8)
+    
+    Returns:
+        Array of indices into ``db``
+    """
+    if not query_hex or db.size == 0:
+        return np.empty(0, dtype=np.int64)
+    if threshold >= 8:
+        return np.nonzero(hamming_distances(query_hex, db) <= threshold)[0]
+    try:
+        q = np.uint64(int(query_hex, 16))
+    except (ValueError, TypeError):
+        return np.empty(0, dtype=np.int64)
+    # Every differing byte holds at least one differing bit, so rows with more
+    # than ``threshold`` differing bytes can be dropped before the popcount
+    x = np.ascontiguousarray(db ^ q)
+    cand = np.nonzero((x.view(np.uint8).reshape(-1, 8) != 0).sum(axis=1) <= threshold)[0]
+    return cand[_popcount64(x[cand]).astype(np.int64) <= threshold]
@@ -1,5 +1,9 @@
+import asyncio
+import hashlib
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
 import numpy as np
-from typing import List
 from app.services.vision import to_rgb_np, preprocess_rgb, detect_faces_embeddings
 
 
@@ -8,6 +12,10 @@ from app.config import settings
 _provider = getattr(settings, "EMBEDDINGS_PROVIDER", None)
 _model = None
 
+# Stored on Image.emb_version. Tasks skip re-embedding images whose stored
+# embedding is at this version; bump it to force a recompute.
+EMBEDDING_VERSION = 0
+
 def _ensure_clip() -> bool:
     """Lazily initialize CLIP model; fallback to phash if unavailable."""
     global _model, _provider
@@ -31,32 +39,199 @@ def get_image_embedding(img_bytes: bytes):
     faces = detect_faces_embeddings(rgb)
     return faces
 
+_tensor_path = None  # (vision model, mean, std, size, device) or False once probed
+
+
+def _clip_tensor_path():
+    """Cached handles for feeding uint8 frames straight to the CLIP vision tower.
+
+    Only used on CUDA; CPU deploys keep sentence-transformers' PIL pipeline.
+    """
+    global _tensor_path
+    if _tensor_path is not None:
+        return _tensor_path or None
+    _tensor_path = False
+    try:
+        import torch
+        if not torch.cuda.is_available():
+            return None
+        clip = _model._first_module()
+        proc = clip.processor.image_processor
+        size = proc.crop_size["height"] if isinstance(proc.crop_size, dict) else int(proc.crop_size)
+        device = next(clip.model.parameters()).device
+        if device.type != "cuda":
+            return None
+        mean = torch.tensor(proc.image_mean, device=device).view(1, 3, 1, 1)
+        std = torch.tensor(proc.image_std, device=device).view(1, 3, 1, 1)
+        _tensor_path = (clip.model, mean, std, size, device)
+    except Exception:
+        _tensor_path = False
+    return _tensor_path or None
+
+
+def _encode_frames_tensor(rgbs: List[np.ndarray], path) -> np.ndarray:
+    """CLIP preprocessing (shortest-side resize, centre crop, normalise) on device."""
+    import torch
+    import torch.nn.functional as F
+    vision, mean, std, size, device = path
+    out = []
+    with torch.inference_mode():
+        for x in rgbs:
+            t = torch.from_numpy(np.ascontiguousarray(x)).pin_memory()
+            t = t.to(device, non_blocking=True).permute(2, 0, 1).unsqueeze(0).float()
+            h, w = t.shape[-2:]
+            r = size / min(h, w)
+            t = F.interpolate(t, size=(max(size, round(h * r)), max(size, round(w * r))),
+                              mode="bicubic", align_corners=False, antialias=True)
+            top, left = (t.shape[-2] - size) // 2, (t.shape[-1] - size) // 2
+            t = t[..., top:top + size, left:left + size]
+            out.append(((t / 255.0) - mean) / std)
+        pixels = torch.cat(out).to(torch.float16 if vision.dtype == torch.float16 else vision.dtype)
+        feats = vision.get_image_features(pixel_values=pixels)
+        feats = F.normalize(feats.float(), dim=-1)
+    return feats.cpu().numpy().astype(np.float32)
+
+
+def embedding_cache_namespace() -> str:
+    """Cache key prefix naming the provider, model and EMBEDDING_VERSION in use.
+
+    Resolves the provider first, so a CLIP load failure is cached as phash.
+    """
+    if _ensure_clip():
+        return f"emb:{_provider}:{getattr(settings, 'CLIP_MODEL', 'clip-ViT-B-32')}:v{EMBEDDING_VERSION}"
+    return f"emb:phash:imagehash:v{EMBEDDING_VERSION}"
+
+
 # Return 512-dim float32 vector (pad/trim as needed)
 def image_embedding(np_rgb: np.ndarray) -> np.ndarray:
     global _model
     if _ensure_clip():
-        from PIL import Image
-        vec = _model.encode(Image.fromarray(np_rgb), normalize_embeddings=True)
-        return vec.astype(np.float32)
+        return image_embedding_batch([np_rgb])[0]
     else:
         from PIL import Image
         import imagehash
         img = Image.fromarray(np_rgb).convert("RGB")
         ph = imagehash.phash(img)
-        bits = np.array([int(b) for b in bin(int(str(ph), 16))[2:].zfill(64)], dtype=np.float32)
-        if bits.shape[0] < 512:
-            bits = np.pad(bits, (0, 512 - bits.shape[0]))
-        return bits[:512].astype(np.float32)
+        h = int(str(ph), 16).to_bytes(8, "big")
+        out = np.zeros(512, dtype=np.float32)
+        out[:64] = np.unpackbits(np.frombuffer(h, dtype=np.uint8))
+        return out
+
+def image_embedding_batch(rgbs: List[np.ndarray], batch_size: int = 32) -> np.ndarray:
+    """Embed many frames with one model call; returns an (N, 512) float32 array."""
+    if not rgbs:
+        return np.zeros((0, 512), dtype=np.float32)
+    if _ensure_clip():
+        path = _clip_tensor_path()
+        if path is not None:
+            try:
+                return np.concatenate([
+                    _encode_frames_tensor(rgbs[i:i + batch_size], path)
+                    for i in range(0, len(rgbs), batch_size)
+                ])
+            except Exception:
+                pass  # fall through to the PIL pipeline
+        from PIL import Image
+        pils = [Image.fromarray(x) for x in rgbs]
+        vecs = _model.encode(pils, batch_size=batch_size, convert_to_numpy=True, normalize_embeddings=True)
+        return np.asarray(vecs, dtype=np.float32)
+    return np.stack([image_embedding(x) for x in rgbs])
+
+
+class _EmbeddingBatcher:
+    """Coalesce concurrent single-image requests into one image_embedding_batch call.
+
+    Callers await embed(); a background task drains the queue up to max_batch
+    items or max_wait seconds, whichever comes first, and runs the model off
+    the event loop.
+    """
+
+    def __init__(self, max_batch: int = 32, max_wait: float = 0.005):
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def embed(self, np_rgb: np.ndarray) -> np.ndarray:
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done():
+            self._queue = asyncio.Queue()
+            self._task = loop.create_task(self._run())
+            self._task.add_done_callback(lambda _: _batchers.pop(loop, None))
+        fut = loop.create_future()
+        await self._queue.put((np_rgb, fut))
+        return await fut
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch: List[Tuple[np.ndarray, asyncio.Future]] = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            try:
+                vecs = await asyncio.to_thread(image_embedding_batch, [x for x, _ in batch])
+            except Exception as e:
+                for _, fut in batch:
+                    if not fut.done():
+                        fut.set_exception(e)
+                continue
+            for (_, fut), vec in zip(batch, vecs):
+                if not fut.done():
+                    fut.set_result(vec)
+
+
+# One batcher per event loop: its queue and drain task belong to the loop
+# that made them, and Celery/RQ jobs each start a fresh loop via asyncio.run.
+# An entry is dropped when its drain task ends (asyncio.run cancels it).
+_batchers: "dict[asyncio.AbstractEventLoop, _EmbeddingBatcher]" = {}
+
+
+async def image_embedding_async(np_rgb: np.ndarray) -> np.ndarray:
+    """image_embedding for async callers; concurrent calls share one model batch."""
+    loop = asyncio.get_running_loop()
+    batcher = _batchers.get(loop)
+    if batcher is None:
+        batcher = _batchers[loop] = _EmbeddingBatcher()
+    return await batcher.embed(np_rgb)
+
+
+@lru_cache(maxsize=4096)
+def _text_embedding_cached(query: str) -> np.ndarray:
+    if _ensure_clip():
+        vec = _model.encode(query, normalize_embeddings=True).astype(np.float32)
+    else:
+        h = hashlib.sha256(query.lower().encode()).digest()
+        # Normalise the digest in place inside the output vector
+        vec = np.zeros(512, dtype=np.float32)
+        head = vec[:len(h)]
+        head[:] = np.frombuffer(h, dtype=np.uint8)
+        std = head.std() + 1e-6
+        np.subtract(head, head.mean(), out=head)
+        np.divide(head, std, out=head)
+    # Shared between callers, so keep it read-only
+    vec.setflags(write=False)
+    return vec
+
 
 def text_embedding(query: str) -> np.ndarray:
-    global _model
+    # Search boxes resend the same query while typing
+    return _text_embedding_cached(query)
+
+
+@lru_cache(maxsize=64)
+def text_embedding_batch(queries: Tuple[str, ...]) -> np.ndarray:
+    """Unit-length (N, 512) text embeddings from one encoder call; read-only, cached."""
     if _ensure_clip():
-        vec = _model.encode(query, normalize_embeddings=True)
-        return vec.astype(np.float32)
-    import hashlib
-    h = hashlib.sha256(query.lower().encode()).digest()
-    arr = np.frombuffer(h, dtype=np.uint8).astype(np.float32)
-    arr = (arr - arr.mean()) / (arr.std() + 1e-6)
-    if arr.shape[0] < 512:
-        arr = np.pad(arr, (0, 512 - arr.shape[0]))
-    return arr[:512]
\ No newline at end of file
+        mat = _model.encode(list(queries), normalize_embeddings=True, convert_to_numpy=True).astype(np.float32)
+    else:
+        mat = np.stack([_text_embedding_cached(q) for q in queries])
+        mat /= np.linalg.norm(mat, axis=1, keepdims=True).clip(min=1e-9)
+    mat.setflags(write=False)
+    return mat
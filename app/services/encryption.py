@@ -1,6 +1,14 @@
+import os
 import base64
 import hashlib
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
 from cryptography.fernet import Fernet
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
 from app.config import settings
 
 
@@ -14,11 +22,25 @@ else:
 
 try:
     _master = Fernet(_raw_key)  # try as-is
+    _master_key32 = base64.urlsafe_b64decode(_raw_key_bytes)
 except Exception:
     # Derive a valid Fernet key from the provided value (deterministic)
     digest = hashlib.sha256(_raw_key_bytes).digest()  # 32 bytes
     derived_key = base64.urlsafe_b64encode(digest)
     _master = Fernet(derived_key)
+    _master_key32 = digest
+
+# New DEK wraps use AES-256-GCM under an HKDF subkey of the master key and are
+# stored as "v2." + urlsafe_b64(nonce || ciphertext || tag). Anything without
+# the prefix is a legacy Fernet token and is still accepted by unwrap_dek.
+_DEK_V2_PREFIX = "v2."
+_DEK_AAD = b"photovault dek"
+_master_aead = AESGCM(HKDF(
+    algorithm=hashes.SHA256(),
+    length=32,
+    salt=None,
+    info=b"photovault dek wrap v2",
+).derive(_master_key32))
 
 
 def new_data_key() -> bytes:
@@ -26,12 +48,80 @@ def new_data_key() -> bytes:
 
 
 def wrap_dek(plain_key_b64: bytes) -> str:
-    return _master.encrypt(plain_key_b64).decode()
+    nonce = os.urandom(12)
+    sealed = _master_aead.encrypt(nonce, plain_key_b64, _DEK_AAD)
+    return _DEK_V2_PREFIX + base64.urlsafe_b64encode(nonce + sealed).decode()
 
 
-def unwrap_dek(encrypted_b64: str) -> bytes:
+def _unwrap_dek(encrypted_b64: str) -> bytes:
+    if encrypted_b64.startswith(_DEK_V2_PREFIX):
+        raw = base64.urlsafe_b64decode(encrypted_b64[len(_DEK_V2_PREFIX):])
+        return _master_aead.decrypt(raw[:12], raw[12:], _DEK_AAD)
     return _master.decrypt(encrypted_b64.encode())
 
 
+# Unwrapped DEKs keyed by the wrapped value, so a rotated key is never served
+# stale. Short TTL and a hard cap bound how many plaintext keys sit in memory.
+_DEK_CACHE: "OrderedDict[str, tuple[float, bytes]]" = OrderedDict()
+_DEK_CACHE_MAX = 10_000
+_DEK_TTL_SECONDS = 300
+_DEK_LOCK = threading.Lock()
+
+
+def unwrap_dek(encrypted_b64: str) -> bytes:
+    now = time.monotonic()
+    with _DEK_LOCK:
+        cached = _DEK_CACHE.get(encrypted_b64)
+        if cached and (now - cached[0]) < _DEK_TTL_SECONDS:
+            _DEK_CACHE.move_to_end(encrypted_b64)
+            return cached[1]
+    dek = _unwrap_dek(encrypted_b64)
+    with _DEK_LOCK:
+        _DEK_CACHE[encrypted_b64] = (now, dek)
+        _DEK_CACHE.move_to_end(encrypted_b64)
+        while len(_DEK_CACHE) > _DEK_CACHE_MAX:
+            _DEK_CACHE.popitem(last=False)
+    return dek
+
+
+@lru_cache(maxsize=1024)
 def fernet_from_dek(dek_b64: bytes) -> Fernet:
-    return Fernet(dek_b64)
\ No newline at end of file
+    # Fernet holds no per-message state, so one instance per DEK is safe to share
+    return Fernet(dek_b64)
+
+
+# Blob envelope: VERSION || nonce(12) || ciphertext || tag(16), sealed with
+# AES-256-GCM (single hardware-accelerated pass, no separate HMAC). Legacy blobs
+# are Fernet tokens, whose base64 text always starts with "g" (0x80 version
+# byte), so the leading byte tells the two formats apart.
+BLOB_V2_AESGCM = b"\x02"
+_NONCE_LEN = 12
+
+
+@lru_cache(maxsize=256)
+def aead_from_dek(dek_b64: bytes) -> AESGCM:
+    """AES-256-GCM cipher for blobs, keyed by a subkey derived from the user's DEK.
+
+    Cached per DEK so repeat calls skip both the HKDF and the AES key expansion;
+    AESGCM objects are immutable and safe to share across threads.
+    """
+    key = HKDF(
+        algorithm=hashes.SHA256(),
+        length=32,
+        salt=None,
+        info=b"photovault blob aesgcm v2",
+    ).derive(base64.urlsafe_b64decode(dek_b64))
+    return AESGCM(key)
+
+
+def encrypt_blob(dek_b64: bytes, data: bytes, aad: bytes) -> bytes:
+    nonce = os.urandom(_NONCE_LEN)
+    return BLOB_V2_AESGCM + nonce + aead_from_dek(dek_b64).encrypt(nonce, data, aad)
+
+
+def decrypt_blob(dek_b64: bytes, blob: bytes, aad: bytes) -> bytes:
+    """Decrypt an AES-GCM envelope, or a legacy Fernet token."""
+    if blob[:1] == BLOB_V2_AESGCM:
+        nonce = blob[1:1 + _NONCE_LEN]
+        return aead_from_dek(dek_b64).decrypt(nonce, blob[1 + _NONCE_LEN:], aad)
+    return fernet_from_dek(dek_b64).decrypt(blob)
@@ -0,0 +1,168 @@
+"""
+Per-user face embedding matrix stored next to the metadata store.
+
+Each user directory holds a raw little-endian float16 matrix (one row per
+face, appended) and a parallel list of face ids, so clustering can load
+every embedding with a single np.fromfile instead of decoding one JSON
+column per row. Face.embedding_json stays the source of truth: a later row
+for a face id supersedes earlier ones, and faces that are gone from the
+database are rewritten out of the files. Uploads and job workers run in
+separate processes, so every access holds an flock on the user's lock file.
+"""
+
+import json
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to the in-process lock
+    fcntl = None
+
+import numpy as np
+from app.config import settings
+
+BASE = Path(settings.STORAGE_DIR).resolve() / "face_embeddings"
+
+_DTYPE = np.dtype("<f2")
+_LOCK = threading.Lock()
+
+
+def _user_dir(user_id: str) -> Path:
+    d = BASE / str(user_id)
+    d.mkdir(parents=True, exist_ok=True)
+    return d
+
+
+@contextmanager
+def _locked(user_id: str, shared: bool = False):
+    """Hold the user's store lock across processes (shared for readers)."""
+    if fcntl is None:
+        with _LOCK:
+            yield
+        return
+    with (_user_dir(user_id) / "lock").open("a") as f:
+        fcntl.flock(f, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _paths(user_id: str) -> Tuple[Path, Path, Path]:
+    d = _user_dir(user_id)
+    return d / "embeddings.f16", d / "ids.txt", d / "meta.json"
+
+
+def _clear(paths) -> None:
+    for p in paths:
+        p.unlink(missing_ok=True)
+
+
+def _replace(path: Path, data: bytes) -> None:
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+def save_embedding(user_id: str, face_id: str, vec) -> bool:
+    """Append one face embedding, superseding any earlier row for ``face_id``.
+
+    Returns False if its length does not match the matrix.
+    """
+    row = np.asarray(vec, dtype=np.float32).ravel()
+    mat_path, ids_path, meta_path = _paths(user_id)
+    with _locked(user_id):
+        if meta_path.exists():
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+            if meta.get("compacting"):
+                # a rewrite died half way; the rows can't be trusted
+                _clear((mat_path, ids_path, meta_path))
+            elif meta["dim"] != row.shape[0]:
+                return False
+        if not meta_path.exists():
+            meta_path.write_text(json.dumps({"dim": int(row.shape[0])}), encoding="utf-8")
+        with mat_path.open("ab") as f:
+            f.write(row.astype(_DTYPE).tobytes())
+        with ids_path.open("a", encoding="utf-8") as f:
+            f.write(f"{face_id}\n")
+    return True
+
+
+def _read(user_id: str):
+    mat_path, ids_path, meta_path = _paths(user_id)
+    if not meta_path.exists() or not mat_path.exists() or not ids_path.exists():
+        return None
+    try:
+        meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        if meta.get("compacting"):
+            return None
+        dim = meta["dim"]
+        E = np.fromfile(mat_path, dtype=_DTYPE)
+        ids = ids_path.read_text(encoding="utf-8").split()
+    except Exception:
+        return None
+    # A crash between the two appends can leave one side a row longer
+    n = min(E.size // dim, len(ids))
+    return dim, ids[:n], E[: n * dim].reshape(n, dim)
+
+
+def _latest(ids: List[str], keep=None) -> List[int]:
+    """Row index of the newest entry per id, in file order, limited to ``keep`` if given."""
+    last = {face_id: i for i, face_id in enumerate(ids)}
+    return [i for i, face_id in enumerate(ids) if last[face_id] == i and (keep is None or face_id in keep)]
+
+
+def _compact(user_id: str, dim: int, ids: List[str], E: np.ndarray) -> None:
+    mat_path, ids_path, meta_path = _paths(user_id)
+    meta_path.write_text(json.dumps({"dim": dim, "compacting": True}), encoding="utf-8")
+    _replace(mat_path, E.astype(_DTYPE).tobytes())
+    _replace(ids_path, "".join(f"{i}\n" for i in ids).encode("utf-8"))
+    _replace(meta_path, json.dumps({"dim": dim}).encode("utf-8"))
+
+
+def retain_embeddings(user_id: str, face_ids) -> None:
+    """Rewrite the user's matrix keeping only the newest row of each id in ``face_ids``.
+
+    A no-op when nothing would be dropped.
+    """
+    keep_ids = {str(i) for i in face_ids}
+    with _locked(user_id):
+        stored = _read(user_id)
+        if stored is None:
+            return
+        dim, ids, E = stored
+        keep = _latest(ids, keep_ids)
+        if len(keep) < len(ids):
+            _compact(user_id, dim, [ids[i] for i in keep], E[keep])
+
+
+def delete_embeddings(user_id: str, face_ids) -> None:
+    """Rewrite the user's matrix without ``face_ids``."""
+    drop = {str(i) for i in face_ids}
+    with _locked(user_id):
+        stored = _read(user_id)
+        if stored is None or not drop.intersection(stored[1]):
+            return
+        dim, ids, E = stored
+        keep = [i for i in _latest(ids) if ids[i] not in drop]
+        _compact(user_id, dim, [ids[i] for i in keep], E[keep])
+
+
+def load_embeddings(user_id: str) -> Optional[Tuple[List[str], np.ndarray]]:
+    """Return (face_ids, float32 matrix) for the user, or None if nothing is stored.
+
+    Only the newest row per face is returned.
+    """
+    with _locked(user_id, shared=True):
+        stored = _read(user_id)
+    if stored is None:
+        return None
+    _, ids, E = stored
+    keep = _latest(ids)
+    if len(keep) < len(ids):
+        ids, E = [ids[i] for i in keep], E[keep]
+    return ids, E.astype(np.float32)
@@ -1,4 +1,5 @@
 import os
+import asyncio
 import httpx
 from typing import Optional, Tuple
 import numpy as np
@@ -85,7 +86,7 @@ async def register_face(image_bytes: bytes) -> Tuple[Optional[str], Optional[np.
     face_token = None
     if _facepp_available():
         face_token = await _facepp_detect_face_token(image_bytes)
-    local_vec = _local_face_vector(image_bytes)
+    local_vec = await asyncio.to_thread(_local_face_vector, image_bytes)
     return (face_token, local_vec)
 
 async def verify_face(stored_face_token: Optional[str], stored_vec_json: Optional[list], image_bytes: bytes) -> Tuple[bool, float]:
@@ -107,7 +108,7 @@ async def verify_face(stored_face_token: Optional[str], stored_vec_json: Optiona
             stored_vec = np.array(stored_vec_json, dtype=np.float32)
         except Exception:
             stored_vec = None
-        new_vec = _local_face_vector(image_bytes)
+        new_vec = await asyncio.to_thread(_local_face_vector, image_bytes)
         if stored_vec is not None and new_vec is not None:
             ok, conf_percent = _local_verify(stored_vec, new_vec)
             if ok:
@@ -1,38 +1,75 @@
-# Add simple TTL cache to reduce external lookups
-from app.config import settings
-from geopy.geocoders import Nominatim
+# Reverse geocoding against Nominatim over the shared aiohttp session, with a TTL cache
+import asyncio
 import time
+from collections import OrderedDict
+from typing import Optional
+
+from app.config import settings
 
-_geocoder = None
-if settings.ENABLE_GEOCODER and settings.GEOCODER_EMAIL:
-    _geocoder = Nominatim(user_agent=f"photovault/1 ({settings.GEOCODER_EMAIL})")
+try:
+    from app.services.cloud_storage import _get_session
+except ImportError:  # aiohttp not installed: geocoding stays disabled
+    _get_session = None
 
+_NOMINATIM_URL = "https://nominatim.openstreetmap.org/reverse"
+_ENABLED = bool(settings.ENABLE_GEOCODER and settings.GEOCODER_EMAIL and _get_session)
+_HEADERS = {"User-Agent": f"photovault/1 ({settings.GEOCODER_EMAIL})"}
 
-_CACHE: dict[tuple[float, float], tuple[float, str | None]] = {}
+_CACHE: "OrderedDict[tuple[float, float], tuple[float, Optional[str]]]" = OrderedDict()
+_CACHE_MAX = 100_000
 _TTL_SECONDS = 24 * 60 * 60
+# Photos imported from one venue all ask for the same point at once; share one request
+_INFLIGHT: dict[tuple[float, float], "asyncio.Future[Optional[str]]"] = {}
+
+
+def _format(raw: dict) -> Optional[str]:
+    a = raw.get("address") or {}
+    city = a.get("city") or a.get("town") or a.get("village") or a.get("state")
+    cc = a.get("country_code", "").upper()
+    return f"{city}, {cc}" if city and cc else raw.get("display_name")
+
+
+async def _fetch(lat: float, lng: float) -> Optional[str]:
+    session = await _get_session()
+    params = {"format": "jsonv2", "lat": f"{lat}", "lon": f"{lng}", "zoom": "10", "accept-language": "en"}
+    async with session.get(_NOMINATIM_URL, params=params, headers=_HEADERS) as resp:
+        if resp.status != 200:
+            return None
+        raw = await resp.json(content_type=None)
+    return _format(raw) if isinstance(raw, dict) else None
+
+
+def _remember(key: tuple[float, float], result: Optional[str]) -> None:
+    _CACHE[key] = (time.monotonic(), result)
+    _CACHE.move_to_end(key)
+    while len(_CACHE) > _CACHE_MAX:
+        _CACHE.popitem(last=False)
+
 
 async def reverse(lat: float, lng: float) -> str | None:
-    if not _geocoder:
+    if not _ENABLED:
         return None
 
     key = (round(lat, 6), round(lng, 6))
-    now = time.time()
     cached = _CACHE.get(key)
-    if cached and (now - cached[0]) < _TTL_SECONDS:
+    if cached and (time.monotonic() - cached[0]) < _TTL_SECONDS:
         return cached[1]
-    
+
+    pending = _INFLIGHT.get(key)
+    if pending is not None:
+        return await asyncio.shield(pending)
+
+    fut: "asyncio.Future[Optional[str]]" = asyncio.get_running_loop().create_future()
+    _INFLIGHT[key] = fut
     try:
-        loc = _geocoder.reverse((lat, lng), language="en")
-        if loc and loc.raw and "address" in loc.raw:
-            a = loc.raw["address"]
-            city = a.get("city") or a.get("town") or a.get("village") or a.get("state")
-            cc = a.get("country_code", "").upper()
-            result = f"{city}, {cc}" if city and cc else loc.address
-            _CACHE[key] = (now, result)
-            return result
-    except Exception:
-        _CACHE[key] = (now, None)
-        return None
-    
-    _CACHE[key] = (now, None)
-    return None
\ No newline at end of file
+        try:
+            result = await _fetch(lat, lng)
+        except Exception:
+            result = None
+        _remember(key, result)
+        fut.set_result(result)
+        return result
+    finally:
+        _INFLIGHT.pop(key, None)
+        if not fut.done():
+            fut.set_result(None)
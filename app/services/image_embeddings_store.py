@@ -0,0 +1,168 @@
+"""
+Per-user int8 image embedding matrix for in-process search.
+
+Each user directory holds int8 rows (L2-normalised, scaled per row), a
+parallel float32 scale file and the image ids, mirroring
+face_embeddings_store. At one byte per dimension a 512-d CLIP vector takes
+512 B instead of 2 KB, so the fallback search scans 4x less memory.
+Image.embedding_json stays the source of truth: every writer of that column
+appends here, a later row for an id supersedes earlier ones, and deleting
+an image rewrites the files without it. API workers and job processes all
+write these files, so every access holds an flock on the user's lock file.
+"""
+
+import json
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to the in-process lock
+    fcntl = None
+
+import numpy as np
+from app.config import settings
+from app.utils.math import quantize_int8
+
+BASE = Path(settings.STORAGE_DIR).resolve() / "image_embeddings"
+
+_SCALE_DTYPE = np.dtype("<f4")
+_LOCK = threading.Lock()
+
+
+def _user_dir(user_id: str) -> Path:
+    d = BASE / str(user_id)
+    d.mkdir(parents=True, exist_ok=True)
+    return d
+
+
+@contextmanager
+def _locked(user_id: str, shared: bool = False):
+    """Hold the user's store lock across processes (shared for readers)."""
+    if fcntl is None:
+        with _LOCK:
+            yield
+        return
+    with (_user_dir(user_id) / "lock").open("a") as f:
+        fcntl.flock(f, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _paths(user_id: str) -> Tuple[Path, Path, Path, Path]:
+    d = _user_dir(user_id)
+    return d / "embeddings.i8", d / "scales.f32", d / "ids.txt", d / "meta.json"
+
+
+def _clear(paths) -> None:
+    for p in paths:
+        p.unlink(missing_ok=True)
+
+
+def _replace(path: Path, data: bytes) -> None:
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+def save_embedding(user_id: str, image_id: str, vec) -> bool:
+    """Append one image embedding, superseding any earlier row for ``image_id``.
+
+    Returns False if its length does not match the matrix.
+    """
+    q, scale = quantize_int8(np.asarray(vec, dtype=np.float32).ravel())
+    mat_path, scale_path, ids_path, meta_path = _paths(user_id)
+    with _locked(user_id):
+        if meta_path.exists():
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+            if meta.get("compacting"):
+                # a rewrite died half way; the rows can't be trusted
+                _clear((mat_path, scale_path, ids_path, meta_path))
+            elif meta["dim"] != q.shape[1]:
+                return False
+        if not meta_path.exists():
+            meta_path.write_text(json.dumps({"dim": int(q.shape[1])}), encoding="utf-8")
+        with mat_path.open("ab") as f:
+            f.write(q.tobytes())
+        with scale_path.open("ab") as f:
+            f.write(scale.astype(_SCALE_DTYPE).tobytes())
+        with ids_path.open("a", encoding="utf-8") as f:
+            f.write(f"{image_id}\n")
+    return True
+
+
+def _read(user_id: str):
+    mat_path, scale_path, ids_path, meta_path = _paths(user_id)
+    if not all(p.exists() for p in (mat_path, scale_path, ids_path, meta_path)):
+        return None
+    try:
+        meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        if meta.get("compacting"):
+            return None
+        dim = meta["dim"]
+        Q = np.fromfile(mat_path, dtype=np.int8)
+        scale = np.fromfile(scale_path, dtype=_SCALE_DTYPE)
+        ids = ids_path.read_text(encoding="utf-8").split()
+    except Exception:
+        return None
+    # A crash between the appends can leave one file a row longer
+    n = min(Q.size // dim, scale.size, len(ids))
+    return dim, ids[:n], Q[: n * dim].reshape(n, dim), scale[:n]
+
+
+def _compact(user_id: str, dim: int, ids: List[str], Q: np.ndarray, scale: np.ndarray) -> None:
+    mat_path, scale_path, ids_path, meta_path = _paths(user_id)
+    meta_path.write_text(json.dumps({"dim": dim, "compacting": True}), encoding="utf-8")
+    _replace(mat_path, Q.tobytes())
+    _replace(scale_path, scale.astype(_SCALE_DTYPE).tobytes())
+    _replace(ids_path, "".join(f"{i}\n" for i in ids).encode("utf-8"))
+    _replace(meta_path, json.dumps({"dim": dim}).encode("utf-8"))
+
+
+def _latest(ids: List[str], drop=()) -> List[int]:
+    """Row index of the newest entry per id, in file order, skipping ``drop``."""
+    last = {image_id: i for i, image_id in enumerate(ids)}
+    return [i for i, image_id in enumerate(ids) if last[image_id] == i and image_id not in drop]
+
+
+def delete_embeddings(user_id: str, image_ids) -> None:
+    """Rewrite the user's matrix without ``image_ids`` (and without superseded rows)."""
+    drop = {str(i) for i in image_ids}
+    with _locked(user_id):
+        stored = _read(user_id)
+        if stored is None:
+            return
+        dim, ids, Q, scale = stored
+        if not drop.intersection(ids):
+            return
+        keep = _latest(ids, drop)
+        _compact(user_id, dim, [ids[i] for i in keep], Q[keep], scale[keep])
+
+
+def load_embeddings(user_id: str) -> Optional[Tuple[List[str], np.ndarray, np.ndarray]]:
+    """Return (image_ids, int8 matrix, float32 scales) for the user, or None if nothing is stored.
+
+    Only the newest row per image is returned. Once superseded rows outnumber
+    live ones the files are compacted.
+    """
+    with _locked(user_id, shared=True):
+        stored = _read(user_id)
+    if stored is None:
+        return None
+    dim, ids, Q, scale = stored
+    keep = _latest(ids)
+    if len(keep) == len(ids):
+        return ids, Q, scale
+    ids, Q, scale = [ids[i] for i in keep], Q[keep], scale[keep]
+    if 2 * len(keep) < len(stored[1]):
+        with _locked(user_id):
+            # only if nobody appended since we read
+            again = _read(user_id)
+            if again is not None and len(again[1]) == len(stored[1]):
+                _compact(user_id, dim, ids, Q, scale)
+    return ids, Q, scale
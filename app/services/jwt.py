@@ -1,12 +1,27 @@
-from jose import jwt
+import jwt
 import time
-from typing import Any, Dict
+from typing import Any, Dict, Tuple
 from app.config import settings
 
+# Same bearer on back-to-back requests: skip re-verifying it for a few seconds
+_DECODE_TTL = 30
+_DECODE_MAX = 10_000
+_decoded: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+
 def create_jwt_token(data: dict, expires_in: int = 3600) -> str:
     payload = data.copy()
     payload["exp"] = int(time.time()) + expires_in
     return jwt.encode(payload, settings.JWT_SECRET, algorithm="HS256")
 
 def decode_jwt_token(token: str) -> Dict[str, Any]:
-    return jwt.decode(token, settings.JWT_SECRET, algorithms=["HS256"])
\ No newline at end of file
+    now = time.time()
+    hit = _decoded.get(token)
+    if hit is not None and now < hit[0]:
+        return dict(hit[1])
+    claims = jwt.decode(token, settings.JWT_SECRET, algorithms=["HS256"])
+    # never cache past the token's own expiry
+    until = min(now + _DECODE_TTL, claims.get("exp", now + _DECODE_TTL))
+    if len(_decoded) >= _DECODE_MAX:
+        _decoded.clear()
+    _decoded[token] = (until, claims)
+    return dict(claims)
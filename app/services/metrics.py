@@ -3,17 +3,22 @@ Prometheus metrics service for PhotoVault
 Provides monitoring and observability for the application
 """
 
+import asyncio
 import time
 import os
+from time import perf_counter
+from functools import lru_cache
+from typing import List, Optional
 from fastapi import Request
-from fastapi.responses import Response
+from fastapi.responses import Response, StreamingResponse
 
 # Guarded imports with fallbacks
 try:
-    from prometheus_client import Counter, Histogram, generate_latest, CONTENT_TYPE_LATEST
+    from prometheus_client import Counter, Histogram, generate_latest, CONTENT_TYPE_LATEST, REGISTRY
     _PROM_AVAILABLE = True
 except Exception:
     _PROM_AVAILABLE = False
+    REGISTRY = None
     CONTENT_TYPE_LATEST = "text/plain"
     def generate_latest():
         return b""
@@ -26,90 +31,79 @@ except Exception:
             pass
     Counter = Histogram = _NoopMetric
 
-# Metrics definitions - with duplicate check
-try:
-    REQUESTS_TOTAL = Counter(
-        "photovault_http_requests_total", 
-        "Total HTTP requests", 
-        ["method", "path", "status"]
-    )
-except Exception:
-    try:
-        from prometheus_client import REGISTRY
-        REQUESTS_TOTAL = REGISTRY._names_to_collectors.get("photovault_http_requests_total") or Counter()
-    except Exception:
-        REQUESTS_TOTAL = Counter()
-
-try:
-    REQUEST_DURATION = Histogram(
-        "photovault_http_request_seconds", 
-        "Request duration in seconds", 
-        ["method", "path"]
-    )
-except Exception:
-    try:
-        from prometheus_client import REGISTRY
-        REQUEST_DURATION = REGISTRY._names_to_collectors.get("photovault_http_request_seconds") or Histogram()
-    except Exception:
-        REQUEST_DURATION = Histogram()
-
-try:
-    UPLOADS_TOTAL = Counter(
-        "photovault_uploads_total",
-        "Total image uploads",
-        ["status"]
-    )
-except Exception:
-    try:
-        from prometheus_client import REGISTRY
-        UPLOADS_TOTAL = REGISTRY._names_to_collectors.get("photovault_uploads_total") or Counter()
-    except Exception:
-        UPLOADS_TOTAL = Counter()
 
-try:
-    DUPLICATES_DETECTED = Counter(
-        "photovault_duplicates_detected_total",
-        "Total duplicate images detected"
-    )
-except Exception:
+def _get_or_create(cls, name: str, doc: str, labels=()):
+    """Register a metric, or return the existing collector on re-import."""
+    if not _PROM_AVAILABLE:
+        return _NoopMetric()
     try:
-        from prometheus_client import REGISTRY
-        DUPLICATES_DETECTED = REGISTRY._names_to_collectors.get("photovault_duplicates_detected_total") or Counter()
-    except Exception:
-        DUPLICATES_DETECTED = Counter()
+        return cls(name, doc, labels) if labels else cls(name, doc)
+    except ValueError:
+        # Duplicated timeseries: the module was imported twice (reload, tests)
+        return REGISTRY._names_to_collectors[name]
 
-try:
-    SHARES_CREATED = Counter(
-        "photovault_shares_created_total",
-        "Total share links created"
-    )
-except Exception:
-    try:
-        from prometheus_client import REGISTRY
-        SHARES_CREATED = REGISTRY._names_to_collectors.get("photovault_shares_created_total") or Counter()
-    except Exception:
-        SHARES_CREATED = Counter()
 
-try:
-    SHARES_VIEWED = Counter(
-        "photovault_shares_viewed_total", 
-        "Total share link views"
-    )
-except Exception:
-    try:
-        from prometheus_client import REGISTRY
-        SHARES_VIEWED = REGISTRY._names_to_collectors.get("photovault_shares_viewed_total") or Counter()
-    except Exception:
-        SHARES_VIEWED = Counter()
+# Metrics definitions - with duplicate check
+REQUESTS_TOTAL = _get_or_create(Counter, "photovault_http_requests_total", "Total HTTP requests", ["method", "path", "status"])
+REQUEST_DURATION = _get_or_create(Histogram, "photovault_http_request_seconds", "Request duration in seconds", ["method", "path"])
+UPLOADS_TOTAL = _get_or_create(Counter, "photovault_uploads_total", "Total image uploads", ["status"])
+DUPLICATES_DETECTED = _get_or_create(Counter, "photovault_duplicates_detected_total", "Total duplicate images detected")
+SHARES_CREATED = _get_or_create(Counter, "photovault_shares_created_total", "Total share links created")
+SHARES_VIEWED = _get_or_create(Counter, "photovault_shares_viewed_total", "Total share link views")
 
 # Check if metrics are enabled and available
 ENABLED = os.getenv("METRICS_ENABLED") == "1" and _PROM_AVAILABLE
 
+# Scrapes landing within this window share one encoding of the registry
+SCRAPE_CACHE_TTL = float(os.getenv("METRICS_SCRAPE_CACHE_TTL", "1.0"))
+_scrape_lock = asyncio.Lock()
+_cached_chunks: Optional[List[bytes]] = None
+_cached_at = 0.0
+
+
+class _SingleFamily:
+    """Registry-shaped wrapper so generate_latest encodes one metric family."""
+
+    def __init__(self, family):
+        self._family = family
+
+    def collect(self):
+        return [self._family]
+
+
+def _encode_families() -> List[bytes]:
+    # One chunk per family: the response streams them without first joining
+    # the whole exposition into a single buffer
+    return [generate_latest(_SingleFamily(family)) for family in REGISTRY.collect()]
+
+
+async def _exposition_chunks() -> List[bytes]:
+    global _cached_chunks, _cached_at
+    async with _scrape_lock:
+        if _cached_chunks is None or time.monotonic() - _cached_at >= SCRAPE_CACHE_TTL:
+            _cached_chunks = await asyncio.to_thread(_encode_families)
+            _cached_at = time.monotonic()
+        return _cached_chunks
+
+
 async def metrics_endpoint():
     """Prometheus metrics endpoint"""
     if not ENABLED:
         return Response(b"metrics disabled", media_type="text/plain")
-    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+    chunks = await _exposition_chunks()
+    return StreamingResponse(iter(chunks), media_type=CONTENT_TYPE_LATEST)
+
+# Route templates and status classes keep these label sets bounded, so the
+# labelled children can be cached instead of re-resolved on every request.
+@lru_cache(maxsize=4096)
+def _req_child(method: str, path: str, status_class: str):
+    return REQUESTS_TOTAL.labels(method, path, status_class)
+
+
+@lru_cache(maxsize=4096)
+def _dur_child(method: str, path: str):
+    return REQUEST_DURATION.labels(method, path)
+
 
 def metrics_middleware(app):
     """Add metrics middleware to FastAPI app"""
@@ -118,21 +112,16 @@ def metrics_middleware(app):
     
     @app.middleware("http")
     async def _metrics(request: Request, call_next):
-        start = time.time()
+        start = perf_counter()
         response = await call_next(request)
         
-        # Record metrics
-        path = request.url.path
-        REQUESTS_TOTAL.labels(
-            method=request.method, 
-            path=path, 
-            status=str(response.status_code)
-        ).inc()
-        
-        REQUEST_DURATION.labels(
-            method=request.method, 
-            path=path
-        ).observe(time.time() - start)
+        # Label by route template ("/albums/{album_id}"), never the raw path:
+        # ids in URLs would give every request its own time series
+        route = request.scope.get("route")
+        path = getattr(route, "path", None) or "unmatched"
+        method = request.method
+        _req_child(method, path, f"{response.status_code // 100}xx").inc()
+        _dur_child(method, path).observe(perf_counter() - start)
         
         return response
 
@@ -5,13 +5,12 @@ Observability service with OpenTelemetry tracing and optional Sentry
 import os
 import logging
 from typing import Optional
-from contextlib import contextmanager
+from contextlib import contextmanager, nullcontext
 
 try:
     from opentelemetry import trace
-    from opentelemetry.exporter.jaeger.thrift import JaegerExporter
     from opentelemetry.sdk.trace import TracerProvider
-    from opentelemetry.sdk.trace.export import BatchSpanProcessor
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor, SimpleSpanProcessor
     from opentelemetry.sdk.resources import Resource
     from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
     from opentelemetry.instrumentation.httpx import HTTPXClientInstrumentor
@@ -19,6 +18,17 @@ try:
 except ImportError:
     OTEL_AVAILABLE = False
 
+# Exporters are optional independently of the SDK; only the selected one is needed
+try:
+    from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
+except ImportError:
+    OTLPSpanExporter = None
+
+try:
+    from opentelemetry.exporter.jaeger.thrift import JaegerExporter
+except ImportError:
+    JaegerExporter = None
+
 try:
     import sentry_sdk
     SENTRY_AVAILABLE = True
@@ -28,6 +38,49 @@ except ImportError:
 logger = logging.getLogger(__name__)
 tracer: Optional[object] = None
 
+def _span_exporter():
+    """OTLP/gRPC by default; OTEL_EXPORTER=jaeger (or only JAEGER_AGENT_HOST set) keeps Thrift/UDP."""
+    kind = os.getenv("OTEL_EXPORTER")
+    if kind is None:
+        if os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT"):
+            kind = "otlp"
+        elif os.getenv("JAEGER_AGENT_HOST"):
+            kind = "jaeger"
+        else:
+            return None
+    kind = kind.lower()
+
+    if kind == "otlp":
+        if OTLPSpanExporter is None:
+            logger.warning("OTLP exporter not installed")
+            return None
+        endpoint = os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT", "http://localhost:4317")
+        logger.info("OTLP tracing initialized")
+        return OTLPSpanExporter(endpoint=endpoint, insecure=endpoint.startswith("http://"))
+    if kind == "jaeger":
+        if JaegerExporter is None:
+            logger.warning("Jaeger exporter not installed")
+            return None
+        logger.info("Jaeger tracing initialized")
+        return JaegerExporter(
+            agent_host_name=os.getenv("JAEGER_AGENT_HOST", "localhost"),
+            agent_port=int(os.getenv("JAEGER_AGENT_PORT", "6831")),
+        )
+    logger.warning("Unknown OTEL_EXPORTER %r", kind)
+    return None
+
+def _span_processor(exporter):
+    """Batching tuned for upload bursts; OTEL_SPAN_PROCESSOR=simple exports each span inline (debug only)."""
+    if os.getenv("OTEL_SPAN_PROCESSOR", "batch").lower() == "simple":
+        return SimpleSpanProcessor(exporter)
+    return BatchSpanProcessor(
+        exporter,
+        max_queue_size=int(os.getenv("OTEL_BSP_MAX_QUEUE_SIZE", "4096")),
+        schedule_delay_millis=int(os.getenv("OTEL_BSP_SCHEDULE_DELAY", "1000")),
+        max_export_batch_size=int(os.getenv("OTEL_BSP_MAX_EXPORT_BATCH_SIZE", "256")),
+        export_timeout_millis=int(os.getenv("OTEL_BSP_EXPORT_TIMEOUT", "10000")),
+    )
+
 def init_observability(app_name: str = "photovault"):
     if SENTRY_AVAILABLE and os.getenv("SENTRY_DSN"):
         sentry_sdk.init(
@@ -48,13 +101,9 @@ def init_observability(app_name: str = "photovault"):
     tp = TracerProvider(resource=resource)
     trace.set_tracer_provider(tp)
 
-    if os.getenv("JAEGER_AGENT_HOST"):
-        exporter = JaegerExporter(
-            agent_host_name=os.getenv("JAEGER_AGENT_HOST", "localhost"),
-            agent_port=int(os.getenv("JAEGER_AGENT_PORT", "6831")),
-        )
-        tp.add_span_processor(BatchSpanProcessor(exporter))
-        logger.info("Jaeger tracing initialized")
+    exporter = _span_exporter()
+    if exporter is not None:
+        tp.add_span_processor(_span_processor(exporter))
 
     global tracer
     tracer = trace.get_tracer(__name__)
@@ -65,16 +114,25 @@ def instrument_fastapi(app):
         HTTPXClientInstrumentor().instrument()
         logger.info("FastAPI instrumentation enabled")
 
+# Reusable no-op context: untraced calls allocate nothing
+_NOOP_SPAN = nullcontext()
+
+
 @contextmanager
+def _traced(name: str, attrs: dict):
+    with tracer.start_as_current_span(name) as span:
+        for k, v in attrs.items():
+            span.set_attribute(k, str(v))
+        try:
+            yield span
+        except Exception as e:
+            span.record_exception(e)
+            raise
+
+
 def trace_operation(name: str, **attrs):
-    if tracer:
-        with tracer.start_as_current_span(name) as span:
-            for k, v in attrs.items():
-                span.set_attribute(k, str(v))
-            try:
-                yield span
-            except Exception as e:
-                span.record_exception(e)
-                raise
-    else:
-        yield None
\ No newline at end of file
+    # A function rather than a module global rebound at init, so that
+    # `from ... import trace_operation` picks up the tracer once it exists
+    if tracer is None:
+        return _NOOP_SPAN
+    return _traced(name, attrs)
@@ -1,11 +1,26 @@
-import qrcode
 import io
 
-def generate_qr_code(data: str) -> bytes:
+try:
+    import segno  # type: ignore
+except ImportError:  # optional; writes PNG without building a PIL image
+    segno = None
+    import qrcode
+
+
+def write_qr_png(data: str, out) -> None:
+    """Write a PNG QR code (10px modules, 4-module border) to a path or binary file."""
+    if segno is not None:
+        # Encodes and writes PNG directly, no PIL image in between
+        segno.make(data, error="m").save(out, kind="png", scale=10, border=4)
+        return
     qr = qrcode.QRCode(version=1, box_size=10, border=4)
     qr.add_data(data)
     qr.make(fit=True)
     img = qr.make_image(fill="black", back_color="white")
+    img.save(out, format="PNG")
+
+
+def generate_qr_code(data: str) -> bytes:
     buf = io.BytesIO()
-    img.save(buf, format="PNG")
-    return buf.getvalue()
\ No newline at end of file
+    write_qr_png(data, buf)
+    return buf.getvalue()
@@ -1,5 +1,6 @@
 import os
 import logging
+from typing import List
 
 log = logging.getLogger("photovault.jobs")
 
@@ -12,24 +13,34 @@ def _inline_noop(name: str):
         return True
     return _fn
 
-# Default inline functions (run immediately in-process)
-_enqueue_thumb = _inline_noop("generate_thumbnail")
-_enqueue_embs  = _inline_noop("generate_embeddings")
-_enqueue_ai_tags = _inline_noop("ai_tagging")
+# Each backend maps to (thumbnail, embeddings, ai_tagging) enqueue callables;
+# the selection happens once here and the public names alias it directly.
+_KINDS = ("thumbnail", "embeddings", "ai_tagging")
+# Backends with a native batched submit, keyed like _BACKENDS
+_MANY = {}
+_BACKENDS = {
+    "inline": (
+        _inline_noop("generate_thumbnail"),
+        _inline_noop("generate_embeddings"),
+        _inline_noop("ai_tagging"),
+    ),
+}
 
 # Try Celery
 if JOBS_BACKEND == "celery":
     try:
         from app.workers.tasks import task_generate_thumbnail, task_generate_embeddings, task_ai_tagging
-        def _enqueue_thumb(image_id: str, user_id: str):
-            job = task_generate_thumbnail.delay(image_id, user_id)
-            return job.id
-        def _enqueue_embs(image_id: str, user_id: str):
-            job = task_generate_embeddings.delay(image_id, user_id)
-            return job.id
-        def _enqueue_ai_tags(image_id: str, user_id: str):
-            job = task_ai_tagging.delay(image_id, user_id)
-            return job.id
+
+        def _celery_enqueue(task):
+            def _fn(image_id: str, user_id: str):
+                return task.delay(image_id, user_id).id
+            return _fn
+
+        _BACKENDS["celery"] = (
+            _celery_enqueue(task_generate_thumbnail),
+            _celery_enqueue(task_generate_embeddings),
+            _celery_enqueue(task_ai_tagging),
+        )
         log.info("Queue backend: Celery")
     except Exception as e:
         log.warning("Celery not available (%s). Falling back to inline.", e)
@@ -41,32 +52,52 @@ if JOBS_BACKEND == "rq":
         import redis
         from rq import Queue
         from app.workers.rq_tasks import generate_thumbnail, generate_embeddings, ai_tagging
-        conn = redis.from_url(os.getenv("REDIS_URL", "redis://127.0.0.1:6379/0"))
-        q_thumbs = Queue("thumbnails", connection=conn)
-        q_embs   = Queue("embeddings", connection=conn)
-        q_tags   = Queue("ai_tagging", connection=conn)
-        def _enqueue_thumb(image_id: str, user_id: str):
-            job = q_thumbs.enqueue(generate_thumbnail, image_id, user_id)
-            return job.get_id()
-        def _enqueue_embs(image_id: str, user_id: str):
-            job = q_embs.enqueue(generate_embeddings, image_id, user_id)
-            return job.get_id()
-        def _enqueue_ai_tags(image_id: str, user_id: str):
-            job = q_tags.enqueue(ai_tagging, image_id, user_id)
-            return job.get_id()
+        # One explicit keep-alive pool shared by all three queues
+        pool = redis.ConnectionPool.from_url(
+            os.getenv("REDIS_URL", "redis://127.0.0.1:6379/0"),
+            max_connections=int(os.getenv("REDIS_POOL", "32")),
+            socket_keepalive=True,
+        )
+        conn = redis.Redis(connection_pool=pool)
+        _rq_queues = {
+            "thumbnail": (Queue("thumbnails", connection=conn), generate_thumbnail),
+            "embeddings": (Queue("embeddings", connection=conn), generate_embeddings),
+            "ai_tagging": (Queue("ai_tagging", connection=conn), ai_tagging),
+        }
+
+        def _rq_enqueue(queue, fn):
+            def _fn(image_id: str, user_id: str):
+                return queue.enqueue(fn, image_id, user_id).get_id()
+            return _fn
+
+        def _rq_enqueue_many(kind: str, image_ids: List[str], user_id: str) -> List[str]:
+            # Queue.enqueue_many pushes every job through a single pipeline
+            queue, fn = _rq_queues[kind]
+            jobs = queue.enqueue_many([Queue.prepare_data(fn, (i, user_id)) for i in image_ids])
+            return [j.get_id() for j in jobs]
+
+        _BACKENDS["rq"] = tuple(_rq_enqueue(q, fn) for q, fn in _rq_queues.values())
+        _MANY["rq"] = _rq_enqueue_many
         log.info("Queue backend: RQ")
     except Exception as e:
         log.warning("RQ not available (%s). Falling back to inline.", e)
         JOBS_BACKEND = "inline"
 
-def enqueue_thumbnail(image_id: str, user_id: str):
-    return _enqueue_thumb(image_id, user_id)
+enqueue_thumbnail, enqueue_embeddings, enqueue_ai_tagging = _BACKENDS.get(JOBS_BACKEND, _BACKENDS["inline"])
+
 
-def enqueue_embeddings(image_id: str, user_id: str):
-    return _enqueue_embs(image_id, user_id)
+def enqueue_many(kind: str, image_ids: List[str], user_id: str) -> List:
+    """Enqueue one ``kind`` job ("thumbnail", "embeddings", "ai_tagging") per image id.
 
-def enqueue_ai_tagging(image_id: str, user_id: str):
-    return _enqueue_ai_tags(image_id, user_id)
+    RQ submits the whole batch in one round-trip; other backends enqueue one by one.
+    """
+    if not image_ids:
+        return []
+    many = _MANY.get(JOBS_BACKEND)
+    if many is not None:
+        return many(kind, image_ids, user_id)
+    fn = dict(zip(_KINDS, (enqueue_thumbnail, enqueue_embeddings, enqueue_ai_tagging)))[kind]
+    return [fn(i, user_id) for i in image_ids]
 
 # Add the following functions to solve the import error
 def generate_thumbnail(image_id: str, user_id: str):
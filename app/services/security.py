@@ -1,7 +1,22 @@
+import asyncio
+import base64
 import datetime as dt
+import json
+import hmac
+import os
 import secrets
 import hashlib
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Optional
 from jose import jwt
+from tortoise import Tortoise
+from tortoise.signals import post_delete, post_save
+from tortoise.transactions import in_transaction
 from fastapi import HTTPException, status, Depends, Request, Response
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from argon2 import PasswordHasher
@@ -9,6 +24,11 @@ from app.config import settings
 from app.models.user import User
 from app.models.session import Session
 
+try:
+    import orjson  # type: ignore
+except ImportError:  # pragma: no cover - optional dependency at runtime
+    orjson = None  # type: ignore
+
 
 bearer = HTTPBearer()
 ph = PasswordHasher()
@@ -20,39 +40,100 @@ class AuthUser:
         self.is_admin = is_admin
 
 
+def _resolve_jwt_secret() -> Optional[str]:
+    if settings.JWT_SECRET and len(settings.JWT_SECRET.strip()) >= 32:
+        return settings.JWT_SECRET
+    # In non-production, fall back to a safe dev secret to avoid 500s in tests
+    if (settings.APP_ENV or "").strip().lower() != "production":
+        return "dev-jwt-secret-change-me-very-long-32-chars-minimum"
+    return None
+
+
+def _b64url(raw: bytes) -> bytes:
+    return base64.urlsafe_b64encode(raw).rstrip(b"=")
+
+
+def _json_compact(value: dict) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, separators=(",", ":")).encode()
+
+
+# HS256 tokens are minted by HMAC-ing the fixed header and the payload with a
+# pre-keyed template instead of going through jose's per-call key and
+# algorithm handling. Same bytes jose would produce. Signers are resolved on
+# each call (and cached per secret) so a changed JWT_SECRET takes effect.
+_JWT_HEADER_B64 = _b64url(b'{"alg":"HS256","typ":"JWT"}')
+
+
+@lru_cache(maxsize=8)
+def _signer_for(secret: str):
+    return hmac.new(secret.encode(), digestmod=hashlib.sha256)
+
+
+def _jwt_signer():
+    secret = _resolve_jwt_secret()
+    return _signer_for(secret) if secret else None
+
+
+def _share_signer():
+    # Share links never accept the dev fallback secret
+    secret = settings.JWT_SECRET
+    return _signer_for(secret) if secret and len(secret.strip()) >= 32 else None
+
+
+def _mint_hs256(signer, payload: dict) -> str:
+    signing_input = _JWT_HEADER_B64 + b"." + _b64url(_json_compact(payload))
+    h = signer.copy()
+    h.update(signing_input)
+    return (signing_input + b"." + _b64url(h.digest())).decode()
+
+
 def create_token(user_id: str) -> str:
-    # Validate JWT secret
-    if not settings.JWT_SECRET or len(settings.JWT_SECRET.strip()) < 32:
-        # In non-production, fall back to a safe dev secret to avoid 500s in tests
-        if (settings.APP_ENV or "").strip().lower() != "production":
-            secret = "dev-jwt-secret-change-me-very-long-32-chars-minimum"
-        else:
-            raise ValueError("JWT_SECRET must be at least 32 characters long")
-    else:
-        secret = settings.JWT_SECRET
+    signer = _jwt_signer()
+    if signer is None:
+        raise ValueError("JWT_SECRET must be at least 32 characters long")
+
+    now = int(time.time())
+    exp = now + settings.ACCESS_TOKEN_EXPIRES_MIN * 60
+    return _mint_hs256(signer, {"sub": user_id, "iat": now, "exp": exp})
 
-    # Use datetime.now() with UTC timezone
-    now = dt.datetime.now(dt.timezone.utc)
-    exp = now + dt.timedelta(minutes=settings.ACCESS_TOKEN_EXPIRES_MIN)
-    payload = {"sub": user_id, "iat": int(now.timestamp()), "exp": int(exp.timestamp())}
-    return jwt.encode(payload, secret, algorithm="HS256")
+
+# Revoke the user's live sessions and insert the new one in a single statement;
+# the sessions_active partial index keeps the UPDATE off revoked history.
+_ROTATE_SESSION_SQL = """
+WITH revoked AS (
+    UPDATE sessions SET revoked = true, modified_at = $5
+    WHERE user_id = $2 AND revoked = false
+    RETURNING 1
+)
+INSERT INTO sessions (id, user_id, token, revoked, expires_at, created_at, modified_at)
+VALUES ($1, $2, $3, false, $4, $5, $5)
+"""
 
 
 async def create_session_token(user_id: str) -> str:
     """Create a secure session token for refresh functionality"""
     token = secrets.token_urlsafe(32)
-    expires_at = dt.datetime.now(dt.timezone.utc) + dt.timedelta(days=30)
+    now = dt.datetime.now(dt.timezone.utc)
+    expires_at = now + dt.timedelta(days=30)
     
-    # Revoke existing sessions for this user (optional - single session per user)
-    await Session.filter(user_id=user_id).update(revoked=True)
+    conn = Tortoise.get_connection("default")
+    if conn.capabilities.dialect == "postgres":
+        await conn.execute_query(_ROTATE_SESSION_SQL, [uuid.uuid4(), user_id, token, expires_at, now])
+        return token
     
-    # Create new session
-    await Session.create(
-        user_id=user_id,
-        token=token,
-        expires_at=expires_at,
-        revoked=False
-    )
+    # Other backends: same effect, two statements in one transaction
+    async with in_transaction() as tx:
+        # Revoke existing sessions for this user (optional - single session per user)
+        await Session.filter(user_id=user_id, revoked=False).using_db(tx).update(revoked=True)
+        await Session.create(
+            user_id=user_id,
+            token=token,
+            expires_at=expires_at,
+            revoked=False,
+            using_db=tx,
+        )
     
     return token
 
@@ -77,34 +158,202 @@ def validate_csrf_tokens(header_token: str, cookie_token: str) -> bool:
     return secrets.compare_digest(header_hash, cookie_token)
 
 
+# Argon2 is deliberately slow (~100 ms); clients retrying a login within a few
+# seconds reuse the last verdict. Keys are an HMAC under a per-process random
+# key, so neither passwords nor anything offline-attackable is held, and the
+# cache dies with the process. Failures expire quickly.
+_VERIFY_KEY = secrets.token_bytes(32)
+_VERIFY_OK_TTL = 30.0
+_VERIFY_FAIL_TTL = 2.0
+_VERIFY_MAX = 2048
+_verify_cache: "OrderedDict[bytes, tuple[float, bool]]" = OrderedDict()
+_verify_lock = threading.Lock()
+
+
+def _verify_cache_key(pw: str, pw_hash: str) -> bytes:
+    return hmac.new(_VERIFY_KEY, f"{pw_hash}\0{pw}".encode(), "sha256").digest()
+
+
 def verify_password(pw: str, pw_hash: str) -> bool:
+    key = _verify_cache_key(pw, pw_hash)
+    now = time.monotonic()
+    with _verify_lock:
+        hit = _verify_cache.get(key)
+        if hit is not None:
+            if now < hit[0]:
+                return hit[1]
+            del _verify_cache[key]
     try:
         ph.verify(pw_hash, pw)
-        return True
+        ok = True
     except Exception:
-        return False
+        ok = False
+    with _verify_lock:
+        _verify_cache[key] = (now + (_VERIFY_OK_TTL if ok else _VERIFY_FAIL_TTL), ok)
+        while len(_verify_cache) > _VERIFY_MAX:
+            _verify_cache.popitem(last=False)
+    return ok
+
+
+# Dedicated pool for the KDF: argon2-cffi releases the GIL while hashing, so
+# throughput scales to core count without starving the default executor
+_KDF_POOL = ThreadPoolExecutor(max_workers=os.cpu_count() or 1, thread_name_prefix="argon2")
+
+
+async def verify_password_async(pw: str, pw_hash: str) -> bool:
+    """verify_password off the event loop."""
+    return await asyncio.get_running_loop().run_in_executor(_KDF_POOL, verify_password, pw, pw_hash)
 
 
 def hash_password(pw: str) -> str:
     return ph.hash(pw)
 
 
+async def hash_password_async(pw: str) -> str:
+    """hash_password off the event loop."""
+    return await asyncio.get_running_loop().run_in_executor(_KDF_POOL, hash_password, pw)
+
+
+# Access tokens are verified with the pre-keyed HS256 template instead of
+# jose.jwt.decode; verified tokens are remembered briefly so a client firing
+# a burst of requests with the same bearer only pays for one HMAC.
+_ACCESS_LEEWAY = 30  # seconds of clock skew tolerance
+_ACCESS_CACHE_TTL = 30.0
+_ACCESS_CACHE_MAX = 8192
+_access_cache: "OrderedDict[str, tuple[float, str, int, object]]" = OrderedDict()
+_access_lock = threading.Lock()
+
+
+def _b64url_decode(segment: bytes) -> bytes:
+    return base64.urlsafe_b64decode(segment + b"=" * (-len(segment) % 4))
+
+
+def _json_loads(raw: bytes):
+    return orjson.loads(raw) if orjson is not None else json.loads(raw)
+
+
+def _decode_access_token(token: str) -> str:
+    """Verify an HS256 access token and return its subject."""
+    now = time.time()
+    signer = _jwt_signer()
+    with _access_lock:
+        hit = _access_cache.get(token)
+        if hit is not None:
+            cached_at, user_id, exp, cached_signer = hit
+            # only trust entries verified under the current secret
+            if now - cached_at < _ACCESS_CACHE_TTL and exp >= now - _ACCESS_LEEWAY and cached_signer is signer:
+                return user_id
+            del _access_cache[token]
+
+    if signer is None:
+        raise jwt.JWTError("JWT secret not configured")
+    try:
+        header_b64, payload_b64, sig_b64 = token.encode().split(b".")
+        header = _json_loads(_b64url_decode(header_b64))
+    except Exception:
+        raise jwt.JWTError("Malformed token")
+    if header.get("alg") != "HS256":
+        raise jwt.JWTError("Unexpected algorithm")
+    h = signer.copy()
+    h.update(header_b64 + b"." + payload_b64)
+    if not hmac.compare_digest(_b64url(h.digest()), sig_b64):
+        raise jwt.JWTError("Bad signature")
+    try:
+        payload = _json_loads(_b64url_decode(payload_b64))
+        user_id = str(payload["sub"])
+        exp = int(payload["exp"])
+    except Exception:
+        raise jwt.JWTError("Invalid claims")
+    if exp < now - _ACCESS_LEEWAY:
+        raise jwt.ExpiredSignatureError("Signature has expired")
+
+    with _access_lock:
+        _access_cache[token] = (now, user_id, exp, signer)
+        if len(_access_cache) > _ACCESS_CACHE_MAX:
+            _access_cache.popitem(last=False)
+    return user_id
+
+
+# user_id -> (loaded_at, is_admin), or is_admin=None for a missing user.
+# Concurrent misses for the same id share one query through _user_inflight.
+# The TTL is short because other workers can't see our invalidations: a
+# deleted user keeps access for at most this long. require_admin re-reads
+# is_admin from the database rather than trusting this cache.
+_USER_CACHE_TTL = 5.0
+_USER_CACHE_MAX = 16384
+_user_cache: "OrderedDict[str, tuple[float, Optional[bool]]]" = OrderedDict()
+_user_inflight: "dict[str, asyncio.Future]" = {}
+
+
+class _LookupAbandoned(Exception):
+    """The request running a shared user lookup was cancelled before it finished."""
+
+
+async def _load_user(user_id: str) -> Optional[bool]:
+    """Return the user's is_admin flag, or None if the user does not exist."""
+    now = time.monotonic()
+    hit = _user_cache.get(user_id)
+    if hit is not None and now - hit[0] < _USER_CACHE_TTL:
+        return hit[1]
+
+    pending = _user_inflight.get(user_id)
+    if pending is not None:
+        try:
+            return await asyncio.shield(pending)
+        except _LookupAbandoned:
+            pass  # run the query ourselves
+
+    fut = asyncio.get_running_loop().create_future()
+    _user_inflight[user_id] = fut
+    try:
+        db_user = await User.filter(id=user_id).only("id", "is_admin").first()
+        is_admin = bool(db_user.is_admin) if db_user else None
+    except Exception as e:
+        fut.set_exception(e)
+        fut.exception()  # mark retrieved when nobody else was waiting
+        raise
+    else:
+        fut.set_result(is_admin)
+    finally:
+        if _user_inflight.get(user_id) is fut:
+            del _user_inflight[user_id]
+        if not fut.done():
+            # cancelled mid-query: let waiters retry instead of cancelling them
+            fut.set_exception(_LookupAbandoned())
+            fut.exception()
+
+    _user_cache[user_id] = (time.monotonic(), is_admin)
+    _user_cache.move_to_end(user_id)
+    if len(_user_cache) > _USER_CACHE_MAX:
+        _user_cache.popitem(last=False)
+    return is_admin
+
+
+def invalidate_user_cache(user_id: str) -> None:
+    """Drop a cached user so the next request re-reads it from the database."""
+    _user_cache.pop(str(user_id), None)
+
+
+@post_save(User)
+async def _user_saved(sender, instance, created, using_db, update_fields) -> None:
+    invalidate_user_cache(instance.id)
+
+
+@post_delete(User)
+async def _user_deleted(sender, instance, using_db) -> None:
+    invalidate_user_cache(instance.id)
+
+
 async def require_user(creds: HTTPAuthorizationCredentials = Depends(bearer)) -> AuthUser:
     if not creds or not creds.scheme.lower().startswith("bearer"):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid auth")
     
     try:
-        payload = jwt.decode(
-            creds.credentials,
-            settings.JWT_SECRET,
-            algorithms=["HS256"],
-            options={"leeway": 30},  # 30s clock skew tolerance
-        )
-        user_id = str(payload["sub"])
-        db_user = await User.filter(id=user_id).first()
-        if not db_user:
+        user_id = _decode_access_token(creds.credentials)
+        is_admin = await _load_user(user_id)
+        if is_admin is None:
             raise HTTPException(status_code=401, detail="User not found")
-        return AuthUser(user_id, bool(db_user.is_admin))
+        return AuthUser(user_id, is_admin)
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token expired")
     except jwt.JWTError:
@@ -115,38 +364,49 @@ async def require_user(creds: HTTPAuthorizationCredentials = Depends(bearer)) ->
 
 # --- ADMIN GUARD ---
 async def require_admin(user: AuthUser = Depends(require_user)) -> AuthUser:
-    if not user.is_admin:
+    # Never trust the cached flag here: a demoted admin must lose access now
+    if not await User.filter(id=user.user_id, is_admin=True).exists():
         raise HTTPException(status_code=403, detail="Admin only")
     return user
 
 
 # --- SHARE TOKENS (album-level) ---
 def create_share_token(user_id: str, album_id: str, hours: int = 72) -> str:
-    # Validate JWT secret
-    if not settings.JWT_SECRET or len(settings.JWT_SECRET.strip()) < 32:
+    signer = _share_signer()
+    if signer is None:
         raise ValueError("JWT_SECRET must be at least 32 characters long")
     
-    now = dt.datetime.now(dt.timezone.utc)
-    exp = now + dt.timedelta(hours=hours)
+    now = int(time.time())
     payload = {
         "typ": "share",
         "sub": user_id,
         "alb": album_id,
-        "iat": int(now.timestamp()),
-        "exp": int(exp.timestamp()),
+        "iat": now,
+        "exp": now + hours * 3600,
     }
-    return jwt.encode(payload, settings.JWT_SECRET, algorithm="HS256")
+    return _mint_hs256(signer, payload)
 
 
 def decode_share_token(token: str) -> dict:
-    # Validate JWT secret
-    if not settings.JWT_SECRET or len(settings.JWT_SECRET.strip()) < 32:
+    signer = _share_signer()
+    if signer is None:
         raise ValueError("JWT_SECRET must be at least 32 characters long")
     
     try:
-        data = jwt.decode(token, settings.JWT_SECRET, algorithms=["HS256"])
+        header_b64, payload_b64, sig_b64 = token.encode().split(b".")
+        header = json.loads(base64.urlsafe_b64decode(header_b64 + b"=" * (-len(header_b64) % 4)))
+        if header.get("alg") != "HS256":
+            raise jwt.JWTError("Unexpected algorithm")
+        h = signer.copy()
+        h.update(header_b64 + b"." + payload_b64)
+        if not hmac.compare_digest(_b64url(h.digest()), sig_b64):
+            raise jwt.JWTError("Bad signature")
+        data = json.loads(base64.urlsafe_b64decode(payload_b64 + b"=" * (-len(payload_b64) % 4)))
+        exp = data.get("exp")
+        if exp is not None and int(exp) < time.time():
+            raise jwt.JWTError("Expired")
         if data.get("typ") != "share":
             raise jwt.JWTError("Wrong token type")
         return data
-    except jwt.JWTError:
-        raise jwt.JWTError("Invalid share token")
\ No newline at end of file
+    except Exception:
+        raise jwt.JWTError("Invalid share token")
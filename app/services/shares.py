@@ -6,16 +6,55 @@ Handles creation, validation, and tracking of public share links
 import hashlib
 import uuid
 import datetime as dt
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
 from jose import jwt
 from app.config import settings
 from tortoise import Tortoise
 
 
+# Stored fingerprints are a keyed BLAKE2b-256 MAC, so a leaked public_shares
+# table cannot be used to test candidate tokens. The MAC key is an HKDF subkey
+# of its own SHARE_HASH_KEY setting rather than the JWT signing key. Rotating
+# SHARE_HASH_KEY invalidates every share link.
+_SHARE_HASH_KEY = HKDF(
+    algorithm=hashes.SHA256(),
+    length=32,
+    salt=None,
+    info=b"photovault share token hash v1",
+).derive(settings.SHARE_HASH_KEY.encode())
+
+
 def _hash_token(tok: str) -> str:
     """Hash token for secure storage"""
+    return hashlib.blake2b(tok.encode(), digest_size=32, key=_SHARE_HASH_KEY).hexdigest()
+
+
+def _legacy_hash_token(tok: str) -> str:
+    # Unkeyed SHA-256 used by rows written before the keyed hash
     return hashlib.sha256(tok.encode()).hexdigest()
 
 
+# Hot-path statements kept as constants: asyncpg caches prepared statements by
+# query text, so every share view reuses one parsed plan. The lookups are
+# served by the public_shares_live partial index (migrations/).
+_VALIDATE_AND_COUNT_SQL = """
+UPDATE public_shares
+SET view_count = view_count + 1
+WHERE token_hash IN ($1, $2) AND revoked = false AND NOW() < expires_at
+  AND (max_views IS NULL OR view_count < max_views)
+RETURNING id, album_id, created_by, view_count, max_views, expires_at
+"""
+
+_VALIDATE_SQL = """
+SELECT id, album_id, created_by, view_count, max_views, expires_at FROM public_shares
+WHERE token_hash IN ($1, $2) AND revoked = false AND NOW() < expires_at
+  AND (max_views IS NULL OR view_count < max_views)
+"""
+
+_INCREMENT_VIEW_SQL = "UPDATE public_shares SET view_count = view_count + 1 WHERE token_hash IN ($1, $2)"
+
+
 def create_share_jwt(user_id: str, album_id: str, hours: int) -> str:
     """
     Create a JWT token for sharing an album.
@@ -90,12 +129,18 @@ async def record_share(
     return share_id
 
 
-async def validate_share(token: str) -> dict | None:
+async def validate_share(token: str, count_view: bool = True) -> dict | None:
     """
     Validate a share token and return share information.
     
+    With ``count_view`` (the default) the view is counted in the same
+    statement: one UPDATE ... RETURNING checks revocation, expiry and the
+    view limit and increments view_count atomically, so concurrent viewers
+    cannot overshoot ``max_views``.
+    
     Args:
         token: JWT token string
+        count_view: Count this validation as a view of the share
     
     Returns:
         Dictionary with JWT payload and share info, or None if invalid
@@ -106,41 +151,38 @@ async def validate_share(token: str) -> dict | None:
     except Exception:
         return None
     
-    # Check database record
-    token_hash = _hash_token(token)
-    rows = await Tortoise.get_connection("default").execute_query_dict(
-        """
-        SELECT * FROM public_shares
-        WHERE token_hash = $1 AND revoked = false AND NOW() < expires_at
-        """,
-        [token_hash],
-    )
+    conn = Tortoise.get_connection("default")
+    params = [_hash_token(token), _legacy_hash_token(token)]
+    if count_view:
+        rows = await conn.execute_query_dict(
+            _VALIDATE_AND_COUNT_SQL,
+            params,
+        )
+    else:
+        rows = await conn.execute_query_dict(
+            _VALIDATE_SQL,
+            params,
+        )
     
     if not rows:
         return None
     
-    share = rows[0]
-    
-    # Check view limit
-    max_views = share.get("max_views")
-    view_count = share.get("view_count", 0)
-    if max_views is not None and view_count >= max_views:
-        return None
-    
-    return {"jwt": data, "share": share}
+    return {"jwt": data, "share": rows[0]}
 
 
 async def increment_share_view(token: str):
     """
     Increment the view count for a share.
     
+    validate_share already counts the view; only needed after
+    ``validate_share(token, count_view=False)``.
+    
     Args:
         token: JWT token string
     """
-    token_hash = _hash_token(token)
     await Tortoise.get_connection("default").execute_query(
-        "UPDATE public_shares SET view_count = view_count + 1 WHERE token_hash = $1",
-        [token_hash],
+        _INCREMENT_VIEW_SQL,
+        [_hash_token(token), _legacy_hash_token(token)],
     )
 
 
@@ -169,7 +211,8 @@ async def get_share_stats(share_id: str) -> dict | None:
     """
     rows = await Tortoise.get_connection("default").execute_query_dict(
         """
-        SELECT view_count, max_views, expires_at, revoked, created_at
+        SELECT view_count, max_views, expires_at, revoked, created_at,
+               expires_at < NOW() AS is_expired
         FROM public_shares
         WHERE id = $1
         """,
@@ -186,5 +229,5 @@ async def get_share_stats(share_id: str) -> dict | None:
         "expires_at": share["expires_at"],
         "revoked": share["revoked"],
         "created_at": share["created_at"],
-        "is_expired": dt.datetime.now(dt.timezone.utc) > share["expires_at"]
+        "is_expired": share["is_expired"]
     }
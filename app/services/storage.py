@@ -1,4 +1,5 @@
 import os
+from functools import lru_cache
 from pathlib import Path
 from typing import BinaryIO
 from slugify import slugify
@@ -8,23 +9,52 @@ from app.config import settings
 BASE = Path(settings.STORAGE_DIR)
 BASE.mkdir(parents=True, exist_ok=True)
 
+# Uploads this large are not read back soon; keep them out of the page cache
+_FADVISE_MIN_BYTES = 1_048_576
+
+
+# slugify runs Unicode normalisation and several regexes; user ids and folder
+# names repeat on every request, so memoise the results
+_user_slug = lru_cache(maxsize=65536)(slugify)
+_folder_slug = lru_cache(maxsize=4096)(slugify)
+
+
+@lru_cache(maxsize=65536)
+def _ensure_dir(path: Path) -> Path:
+    # mkdir once per process; _write_file recreates it if removed underneath us
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def _write_file(path: Path, data: bytes) -> None:
+    # Raw fd writes: no BufferedWriter copy in between for multi-MB uploads
+    try:
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    except FileNotFoundError:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+        if len(data) >= _FADVISE_MIN_BYTES and hasattr(os, "posix_fadvise"):
+            # Starts writeback and drops whatever pages are already clean
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+    finally:
+        os.close(fd)
+
 
 class LocalStorage:
     def save(self, user_id: str, filename: str, data: bytes) -> str:
-        folder = BASE / slugify(user_id)
-        folder.mkdir(parents=True, exist_ok=True)
+        folder = _ensure_dir(BASE / _user_slug(user_id))
         path = folder / filename
-        with open(path, "wb") as f:
-            f.write(data)
+        _write_file(path, data)
         return str(path.relative_to(BASE))
 
     def save_in_folder(self, user_id: str, folder: str, filename: str, data: bytes) -> str:
-        user_dir = BASE / slugify(user_id)
-        dest_dir = user_dir / slugify(folder)
-        dest_dir.mkdir(parents=True, exist_ok=True)
+        dest_dir = _ensure_dir(BASE / _user_slug(user_id) / _folder_slug(folder))
         path = dest_dir / filename
-        with open(path, "wb") as f:
-            f.write(data)
+        _write_file(path, data)
         return str(path.relative_to(BASE))
 
     def move_to_folder(self, key: str, folder: str) -> str:
@@ -35,7 +65,7 @@ class LocalStorage:
 
         parts = Path(key).parts
         user_slug = parts[0] if parts else "unknown"
-        dest_dir = BASE / user_slug / slugify(folder)
+        dest_dir = BASE / user_slug / _folder_slug(folder)
         dest_dir.mkdir(parents=True, exist_ok=True)
         dest = dest_dir / src.name
         src.rename(dest)
@@ -0,0 +1,94 @@
+"""
+Concurrent multi-file operations for the hybrid storage backends.
+
+Cloudinary and Deta have no multi-object upload or HEAD, so "batching" means
+keeping a bounded number of single-file requests in flight at once.
+"""
+
+import asyncio
+import inspect
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+SaveFn = Callable[[str, str, bytes], Union[str, Awaitable[str]]]
+
+
+async def save_many(
+    save: SaveFn,
+    user_id: str,
+    items: Sequence[Tuple[str, bytes]],
+    concurrency: int = 8,
+    return_exceptions: bool = False,
+) -> List[Union[str, BaseException]]:
+    """Save ``(filename, data)`` items concurrently; storage keys come back in submit order.
+
+    With ``return_exceptions`` a failed upload leaves its exception in that
+    slot instead of raising once every upload has finished.
+    """
+    sem = asyncio.Semaphore(concurrency)
+
+    async def _one(filename: str, data: bytes) -> str:
+        async with sem:
+            key = save(user_id, filename, data)
+            if inspect.isawaitable(key):
+                key = await key
+            return key
+
+    results = await asyncio.gather(*[_one(f, d) for f, d in items], return_exceptions=True)
+    if not return_exceptions:
+        for r in results:
+            if isinstance(r, BaseException):
+                raise r
+    return list(results)
+
+
+class ExistsCache:
+    """TTL cache of storage_key -> exists, including negative (404) results.
+
+    Backends record what they learn from save/delete so a fresh upload is
+    never reported missing from a stale negative entry.
+    """
+
+    def __init__(self, maxsize: int = 100_000, ttl: float = 300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, bool]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[bool]:
+        hit = self._entries.get(key)
+        if hit is None:
+            return None
+        if time.monotonic() - hit[0] >= self.ttl:
+            self._entries.pop(key, None)
+            return None
+        return hit[1]
+
+    def set(self, key: str, exists: bool) -> None:
+        self._entries[key] = (time.monotonic(), exists)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def discard(self, key: str) -> None:
+        self._entries.pop(key, None)
+
+
+async def exists_many(
+    exists: Callable[[str], Awaitable[bool]],
+    keys: Sequence[str],
+    concurrency: int = 32,
+) -> Dict[str, bool]:
+    """Run ``exists`` over ``keys`` concurrently; failures count as missing."""
+    sem = asyncio.Semaphore(concurrency)
+
+    async def _one(key: str) -> bool:
+        async with sem:
+            try:
+                return bool(await exists(key))
+            except Exception:
+                return False
+
+    unique = list(dict.fromkeys(keys))
+    results = await asyncio.gather(*[_one(k) for k in unique])
+    return dict(zip(unique, results))
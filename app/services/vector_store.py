@@ -1,18 +1,53 @@
 import numpy as np
-from typing import List, Tuple
+from typing import Any, List
+
+def _unit(vec) -> np.ndarray:
+    # scale to max |x| == 1 in float64 first so tiny inputs survive float32
+    v = np.asarray(vec, dtype=np.float64).ravel()
+    m = float(np.abs(v).max()) if v.size else 0.0
+    if m == 0.0:
+        return v.astype(np.float32)
+    v = v / m
+    return (v / np.linalg.norm(v)).astype(np.float32)
+
 
 class InMemoryVectorStore:
+    """Struct-of-arrays store: one contiguous (capacity, D) float32 matrix of
+    L2-normalised rows plus a parallel list of ids; capacity doubles."""
+
     def __init__(self):
-        self.vectors: List[Tuple[int, np.ndarray]] = []  # (image_id, embedding)
+        self._ids: List[Any] = []
+        self._mat = np.empty((0, 0), dtype=np.float32)
+        self._n = 0
 
-    def add(self, image_id: int, embedding: np.ndarray):
-        self.vectors.append((image_id, embedding))
+    def __len__(self) -> int:
+        return self._n
 
-    def search(self, query: np.ndarray, top_k: int = 5) -> List[int]:
-        sims = [(image_id, float(np.dot(vec, query) / ((np.linalg.norm(vec) * np.linalg.norm(query)) or 1e-9)))
-                for image_id, vec in self.vectors]
-        sims.sort(key=lambda x: x[1], reverse=True)
-        return [image_id for image_id, _ in sims[:top_k]]
+    def _grow(self, dim: int) -> None:
+        mat = np.empty((max(16, 2 * self._mat.shape[0]), dim), dtype=np.float32)
+        if self._n:
+            mat[:self._n] = self._mat[:self._n]
+        self._mat = mat
+
+    def add(self, image_id: Any, embedding: np.ndarray):
+        vec = _unit(embedding)
+        if self._n == self._mat.shape[0]:
+            self._grow(vec.shape[0])
+        self._mat[self._n] = vec
+        self._ids.append(image_id)
+        self._n += 1
+
+    def search(self, query: np.ndarray, top_k: int = 5) -> List[Any]:
+        if self._n == 0 or top_k <= 0:
+            return []
+        q = _unit(query)
+        sims = self._mat[:self._n] @ q
+        if top_k < self._n:
+            idx = np.argpartition(-sims, top_k)[:top_k]
+        else:
+            idx = np.arange(self._n)
+        idx = idx[np.argsort(-sims[idx], kind="stable")]
+        return [self._ids[i] for i in idx]
 
 """
 pgvector service for PhotoVault
@@ -21,6 +56,7 @@ Handles vector embeddings storage and similarity search using PostgreSQL with pg
 
 from typing import List, Dict, Any
 from tortoise import Tortoise
+from tortoise.transactions import in_transaction
 
 
 def _is_postgres() -> bool:
@@ -32,6 +68,19 @@ def _is_postgres() -> bool:
         return False
 
 
+def _unit_half(vec: List[float]) -> str:
+    """L2-normalise, round to float16 and format as a pgvector '[x,y,...]' literal.
+
+    Stored and query vectors are unit length, so inner product equals cosine
+    and the search can use <#> without pgvector recomputing norms. The vector
+    is bound as one text parameter and cast in SQL ($n::text::halfvec), so the
+    driver does not adapt every element of a Python list.
+    """
+    v = np.asarray(vec, dtype=np.float32)
+    v = v / (np.linalg.norm(v) or 1e-9)
+    return "[" + ",".join(map(str, v.astype(np.float16).tolist())) + "]"
+
+
 async def upsert_image_vector(image_id: str, emb: List[float]) -> None:
     """
     Store or update image embedding in pgvector table.
@@ -44,10 +93,11 @@ async def upsert_image_vector(image_id: str, emb: List[float]) -> None:
         return
     
     try:
+        emb = _unit_half(emb)
         await Tortoise.get_connection("default").execute_query(
             """
             INSERT INTO image_embeddings (image_id, emb)
-            VALUES ($1, $2)
+            VALUES ($1, $2::text::halfvec)
             ON CONFLICT (image_id)
             DO UPDATE SET emb = EXCLUDED.emb
             """,
@@ -57,6 +107,97 @@ async def upsert_image_vector(image_id: str, emb: List[float]) -> None:
         print(f"Failed to upsert vector embedding: {e}")
 
 
+async def upsert_image_vectors(items: List[tuple]) -> None:
+    """
+    Store or update many (image_id, emb) pairs with one multi-row INSERT.
+    
+    Args:
+        items: (image_id, embedding) pairs
+    """
+    if not _is_postgres() or not items:
+        return
+    
+    try:
+        values = ", ".join(f"(${2 * i + 1}, ${2 * i + 2}::text::halfvec)" for i in range(len(items)))
+        params: List[Any] = []
+        for image_id, emb in items:
+            params += [image_id, _unit_half(emb)]
+        await Tortoise.get_connection("default").execute_query(
+            f"""
+            INSERT INTO image_embeddings (image_id, emb)
+            VALUES {values}
+            ON CONFLICT (image_id)
+            DO UPDATE SET emb = EXCLUDED.emb
+            """,
+            params,
+        )
+    except Exception as e:
+        print(f"Failed to upsert vector embeddings: {e}")
+
+
+# HNSW build/search parameters by table size: (max rows, m, ef_construction, ef_search)
+_HNSW_TIERS = (
+    (100_000, 16, 64, 40),
+    (1_000_000, 24, 100, 100),
+    (None, 32, 128, 200),
+)
+_HNSW_BUILD_MEM = "2GB"
+_ef_search = 40
+
+
+def _hnsw_params(count: int) -> tuple:
+    for limit, m, ef_construction, ef_search in _HNSW_TIERS:
+        if limit is None or count < limit:
+            return m, ef_construction, ef_search
+
+
+_HNSW_INDEX = "idx_image_emb"
+
+
+async def _hnsw_index_exists() -> bool:
+    rows = await Tortoise.get_connection("default").execute_query_dict(
+        "SELECT 1 FROM pg_indexes WHERE tablename = 'image_embeddings' AND indexdef ILIKE '%USING hnsw%'"
+    )
+    return bool(rows)
+
+
+async def tune_hnsw_search() -> None:
+    """Pick ef_search for the current table size; cheap enough for startup."""
+    global _ef_search
+    if not _is_postgres():
+        return
+    count = (await get_vector_stats()).get("count", 0)
+    _ef_search = _hnsw_params(count)[2]
+
+
+async def ensure_hnsw_index() -> None:
+    """Build the HNSW index sized to the current row count, if there is none.
+
+    Ops command, not a startup hook (see scripts/build_hnsw_index.py): the
+    build runs CONCURRENTLY so writes keep flowing, which rules out a
+    transaction, so the memory setting is applied to one pinned connection
+    and reset afterwards. Any existing HNSW index on the table, whatever its
+    name, is left alone; drop it to rebuild with today's parameters.
+    """
+    global _ef_search
+    if not _is_postgres():
+        return
+
+    count = (await get_vector_stats()).get("count", 0)
+    m, ef_construction, _ef_search = _hnsw_params(count)
+    if await _hnsw_index_exists():
+        return
+    async with Tortoise.get_connection("default").acquire_connection() as conn:
+        await conn.execute(f"SET maintenance_work_mem = '{_HNSW_BUILD_MEM}'")
+        try:
+            await conn.execute(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {_HNSW_INDEX} ON image_embeddings "
+                f"USING hnsw (emb halfvec_ip_ops) WITH (m = {m}, ef_construction = {ef_construction})"
+            )
+        finally:
+            await conn.execute("RESET maintenance_work_mem")
+
+
 async def search_vectors(query_vec: List[float], top_k: int = 20) -> List[Dict[str, Any]]:
     """
     Search for similar images using pgvector cosine similarity.
@@ -72,15 +213,19 @@ async def search_vectors(query_vec: List[float], top_k: int = 20) -> List[Dict[s
         return []
     
     try:
-        rows = await Tortoise.get_connection("default").execute_query_dict(
-            """
-            SELECT image_id, 1 - (emb <=> $1) AS score
-            FROM image_embeddings
-            ORDER BY emb <=> $1
-            LIMIT $2
-            """,
-            [query_vec, top_k],
-        )
+        query_vec = _unit_half(query_vec)
+        async with in_transaction("default") as conn:
+            # ef_search below LIMIT would cap the number of rows HNSW returns
+            await conn.execute_query(f"SET LOCAL hnsw.ef_search = {max(_ef_search, int(top_k))}")
+            rows = await conn.execute_query_dict(
+                """
+                SELECT image_id, -(emb <#> $1::text::halfvec) AS score
+                FROM image_embeddings
+                ORDER BY emb <#> $1::text::halfvec
+                LIMIT $2
+                """,
+                [query_vec, top_k],
+            )
         return rows
     except Exception as e:
         print(f"Vector search failed: {e}")
@@ -1,10 +1,14 @@
 import io
+import asyncio
+import threading
 import cv2
 import numpy as np
 from typing import Tuple, List
-from PIL import Image
-from app.utils.exif import extract_exif
-from app.utils.guard import in01
+from PIL import Image, ImageOps
+from app.config import settings
+from app.utils.exif import extract_exif_from_pil
+from app.utils.guard import all_in01
+from app.utils import simd
 
 # Optional: if using face_recognition (HOG/CNN)
 try:
@@ -13,8 +17,37 @@ try:
 except Exception:
     _HAS_FACE_REC = False
 
-# Minimal face detection using OpenCV Haar cascades (offline & free).
+# Face detection uses OpenCV's YuNet DNN (cv2.FaceDetectorYN) when its ONNX
+# model is available; the Haar cascade remains the fallback for builds or
+# deployments without it.
 _face = cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_frontalface_default.xml")
+_DETECT_MAX_SIDE = 1024
+_tls = threading.local()  # FaceDetectorYN instances are not thread-safe
+
+
+def _yunet():
+    if not hasattr(_tls, "yunet"):
+        try:
+            _tls.yunet = cv2.FaceDetectorYN.create(settings.YUNET_MODEL, "", (320, 320), score_threshold=0.6)
+        except (AttributeError, cv2.error):
+            _tls.yunet = None
+    return _tls.yunet
+
+
+def _detect_faces(img: np.ndarray):
+    """Face boxes (x, y, w, h) in pixels for a BGR image."""
+    H, W = img.shape[:2]
+    yn = _yunet()
+    if yn is not None:
+        try:
+            yn.setInputSize((W, H))
+            _, det = yn.detect(img)
+            return [] if det is None else [tuple(row[:4]) for row in det]
+        except cv2.error:
+            pass
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    return _face.detectMultiScale(gray, scaleFactor=1.2, minNeighbors=5, minSize=(60, 60))
+
 
 class Processed:
     def __init__(self, exif, lat, lng, w, h, faces: List[Tuple[float, float, float, float]]):
@@ -26,25 +59,42 @@ class Processed:
         self.faces = faces  # normalized [0..1]
 
 async def analyze(content_bytes: bytes) -> Processed:
-    # EXIF & GPS
-    exif, lat, lng, w, h = extract_exif(content_bytes)
-
-    # faces
-    npimg = np.frombuffer(content_bytes, np.uint8)
-    img = cv2.imdecode(npimg, cv2.IMREAD_COLOR)
-    if img is None:
-        # try via PIL
-        pil = Image.open(io.BytesIO(content_bytes)).convert("RGB")
-        img = cv2.cvtColor(np.array(pil), cv2.COLOR_RGB2BGR)
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-    det = _face.detectMultiScale(gray, scaleFactor=1.2, minNeighbors=5, minSize=(60, 60))
+    """Decode, read EXIF and detect faces in a worker thread."""
+    return await asyncio.to_thread(_analyze_sync, content_bytes)
+
+
+def _analyze_sync(content_bytes: bytes) -> Processed:
+    # One PIL open serves EXIF & GPS (headers only) and the pixel decode
+    im = Image.open(io.BytesIO(content_bytes))
+    W0, H0 = im.size
+    if im.getexif().get(0x0112) in (5, 6, 7, 8):  # rotated 90/270: report upright size
+        W0, H0 = H0, W0
+    exif, lat, lng, w, h = extract_exif_from_pil(im)
+
+    # faces; for JPEG, draft() lets libjpeg decode at a reduced DCT scale
+    # that is still at least the detection size
+    im.draft("RGB", (_DETECT_MAX_SIDE, _DETECT_MAX_SIDE))
+    # cv2.imdecode used to apply EXIF orientation; sideways faces are missed
+    im = ImageOps.exif_transpose(im)
+    img = cv2.cvtColor(np.asarray(im.convert("RGB")), cv2.COLOR_RGB2BGR)
+    # Detect on a copy whose long side is at most _DETECT_MAX_SIDE; the boxes
+    # are normalised against the size they were found at, so no rescale back.
+    # draft() may already have shrunk the decode, so scale from what we got.
+    scale = _DETECT_MAX_SIDE / max(img.shape[:2])
+    if scale < 1:
+        img = cv2.resize(img, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    det = _detect_faces(img)
     faces = []
-    H, W = gray.shape
+    H, W = img.shape[:2]
     for (x, y, w0, h0) in det:
+        # DNN boxes may overhang the frame; clip before normalising
+        x, y = max(0.0, float(x)), max(0.0, float(y))
+        w0, h0 = min(float(w0), W - x), min(float(h0), H - y)
         fx, fy, fw, fh = (x / W), (y / H), (w0 / W), (h0 / H)
-        in01(fx, "face_x"); in01(fy, "face_y"); in01(fw, "face_w"); in01(fh, "face_h")
         faces.append((fx, fy, fw, fh))
-    return Processed(exif, lat, lng, W, H, faces)
+    if __debug__:  # stripped entirely under python -O
+        all_in01(faces, "face box")
+    return Processed(exif, lat, lng, W0, H0, faces)
 
 def to_rgb_np(img_bytes: bytes) -> np.ndarray:
     file_bytes = np.frombuffer(img_bytes, np.uint8)
@@ -54,12 +104,22 @@ def to_rgb_np(img_bytes: bytes) -> np.ndarray:
     rgb = cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB)
     return rgb
 
-def preprocess_rgb(rgb: np.ndarray) -> np.ndarray:
-    denoised = cv2.fastNlMeansDenoisingColored(rgb, None, 3, 3, 7, 21)
-    gamma = 1.2
-    invGamma = 1.0 / gamma
-    table = np.array([(i / 255.0) ** invGamma * 255 for i in np.arange(0, 256)]).astype("uint8")
-    out = cv2.LUT(denoised, table)
+async def to_rgb_np_async(img_bytes: bytes) -> np.ndarray:
+    """to_rgb_np in a worker thread."""
+    return await asyncio.to_thread(to_rgb_np, img_bytes)
+
+
+_GAMMA = 1.2
+_GAMMA_LUT = (((np.arange(256, dtype=np.float32) / 255.0) ** (1.0 / _GAMMA)) * 255).astype(np.uint8)
+
+
+def preprocess_rgb(rgb: np.ndarray, denoise: str = "fast") -> np.ndarray:
+    """Denoise and gamma-correct. "fast" is a 3x3 Gaussian blur; "quality" is NL-means."""
+    if denoise == "quality":
+        denoised = cv2.fastNlMeansDenoisingColored(rgb, None, 3, 3, 7, 21)
+    else:
+        denoised = cv2.GaussianBlur(rgb, (3, 3), 0)
+    out = cv2.LUT(denoised, _GAMMA_LUT)
     return out
 
 def detect_faces_embeddings(rgb: np.ndarray) -> List[np.ndarray]:
@@ -72,5 +132,4 @@ def detect_faces_embeddings(rgb: np.ndarray) -> List[np.ndarray]:
     return [np.array(e, dtype=np.float32) for e in enc]
 
 def cosine_sim(a: np.ndarray, b: np.ndarray) -> float:
-    denom = (np.linalg.norm(a) * np.linalg.norm(b)) or 1e-9
-    return float(np.dot(a, b) / denom)
\ No newline at end of file
+    return simd.cosine(a, b)
\ No newline at end of file
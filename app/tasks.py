@@ -4,18 +4,22 @@ Handles async processing for embeddings, thumbnails, and other heavy operations
 """
 
 import os
+import asyncio
+from typing import List
 from rq import Queue
 from redis import Redis
 from app.consolidated_services import (
-    image_embedding,
-    upsert_image_vector,
+    image_embedding_batch,
+    upsert_image_vectors,
     analyze,
     to_rgb_np,
     make_thumbnail,
     storage,
     unwrap_dek,
-    fernet_from_dek,
 )
+from app.services.encryption import decrypt_blob, encrypt_blob
+from app.services.embeddings import EMBEDDING_VERSION
+from app.services.image_embeddings_store import save_embedding as save_image_embedding
 from app.models.image import Image
 from app.models.user import User
 
@@ -36,42 +40,68 @@ async def generate_embedding_and_vector(image_id: str):
     """
     Generate embedding and store in pgvector (background task)
     """
+    await generate_embeddings_batch([image_id])
+
+
+def _load_rgb(img: Image, user: User):
+    dek_b64 = unwrap_dek(user.dek_encrypted_b64)
+    enc = storage.read(img.storage_key)
+    plain = decrypt_blob(dek_b64, enc, str(user.id).encode())
+    return to_rgb_np(plain)
+
+
+async def generate_embeddings_batch(image_ids: List[str]):
+    """
+    Generate embeddings for many images with one model batch, then save them
+    with one bulk update and one multi-row pgvector upsert (background task)
+    """
     try:
-        img = await Image.filter(id=image_id).first()
-        if not img:
-            print(f"Image {image_id} not found")
+        imgs = await Image.filter(id__in=image_ids)
+        if not imgs:
+            print(f"Images {image_ids} not found")
             return
-        
-        # Load user and decrypt image
-        user = await User.filter(id=img.user_id).first()
-        if not user:
-            print(f"User {img.user_id} not found")
+        # Already embedded at the current version (a retry after a pgvector
+        # failure): only redo the upsert
+        done = [img for img in imgs if img.embedding_json and img.emb_version >= EMBEDDING_VERSION]
+        if done:
+            await upsert_image_vectors([(str(img.id), img.embedding_json) for img in done])
+        imgs = [img for img in imgs if not (img.embedding_json and img.emb_version >= EMBEDDING_VERSION)]
+        if not imgs:
             return
-            
-        dek_b64 = unwrap_dek(user.dek_encrypted_b64)
-        fernet = fernet_from_dek(dek_b64)
+        users = {u.id: u for u in await User.filter(id__in={img.user_id for img in imgs})}
+        jobs = [(img, users[img.user_id]) for img in imgs if img.user_id in users]
         
-        # Read and decrypt image
-        enc = storage.read(img.storage_key)
-        plain = fernet.decrypt(enc)
-        
-        # Convert to RGB numpy array
-        np_rgb = await to_rgb_np(plain)
+        # Read + decrypt + decode concurrently; one bad image does not sink the batch
+        rgbs = await asyncio.gather(
+            *(asyncio.to_thread(_load_rgb, img, user) for img, user in jobs),
+            return_exceptions=True,
+        )
+        ready = []
+        for (img, _), rgb in zip(jobs, rgbs):
+            if isinstance(rgb, BaseException):
+                print(f"Failed to load image {img.id}: {rgb}")
+            else:
+                ready.append((img, rgb))
+        if not ready:
+            return
         
-        # Generate embedding
-        emb = image_embedding(np_rgb)
+        embs = await asyncio.to_thread(image_embedding_batch, [rgb for _, rgb in ready])
         
-        # Save JSON embedding for fallback
-        img.embedding_json = emb
-        await img.save()
+        # Save JSON embeddings for fallback
+        for (img, _), emb in zip(ready, embs):
+            img.embedding_json = emb.tolist()
+            img.emb_version = EMBEDDING_VERSION
+        await Image.bulk_update([img for img, _ in ready], fields=["embedding_json", "emb_version"])
+        for img, _ in ready:
+            save_image_embedding(str(img.user_id), str(img.id), img.embedding_json)
         
         # Store in pgvector
-        await upsert_image_vector(str(img.id), emb)
+        await upsert_image_vectors([(str(img.id), img.embedding_json) for img, _ in ready])
         
-        print(f"Generated embedding for image {image_id}")
+        print(f"Generated embeddings for {len(ready)} images")
         
     except Exception as e:
-        print(f"Failed to generate embedding for {image_id}: {e}")
+        print(f"Failed to generate embeddings for {image_ids}: {e}")
 
 
 async def ensure_thumbnail(image_id: str):
@@ -90,11 +120,10 @@ async def ensure_thumbnail(image_id: str):
             return
             
         dek_b64 = unwrap_dek(user.dek_encrypted_b64)
-        fernet = fernet_from_dek(dek_b64)
         
         # Read and decrypt original image
         enc = storage.read(img.storage_key)
-        plain = fernet.decrypt(enc)
+        plain = decrypt_blob(dek_b64, enc, str(user.id).encode())
         
         # Generate thumbnail
         thumb = make_thumbnail(plain)
@@ -103,7 +132,7 @@ async def ensure_thumbnail(image_id: str):
             return
         
         # Encrypt thumbnail
-        enc_thumb = fernet.encrypt(thumb)
+        enc_thumb = encrypt_blob(dek_b64, thumb, str(user.id).encode())
         
         # Save thumbnail
         thumb_key = storage.save(
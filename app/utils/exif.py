@@ -1,38 +1,74 @@
 from PIL import Image as PILImage, ExifTags
+from collections.abc import Mapping
 from typing import Tuple, Dict, Any
 
 
 
-def extract_exif(path_or_bytes) -> tuple[dict | None, float | None, float | None, int | None, int | None]:
+def extract_exif(path_or_bytes) -> tuple[Mapping | None, float | None, float | None, int | None, int | None]:
     try:
         if isinstance(path_or_bytes, (bytes, bytearray)):
             from io import BytesIO
             im = PILImage.open(BytesIO(path_or_bytes))
         else:
             im = PILImage.open(path_or_bytes)
-        
+    except Exception:
+        return None, None, None, None, None
+    return extract_exif_from_pil(im)
+
+
+_GPS_IFD = 0x8825
+
+
+class _LazyTagDict(Mapping):
+    """Tag-name -> value view of an image's EXIF, built on first access.
+
+    Renaming every tag (MakerNotes included) is the costly part of EXIF
+    reading, and callers that only want GPS and size never touch it.
+    """
+
+    def __init__(self, im):
+        self._im = im
+        self._data: Dict[str, Any] | None = None
+
+    def _load(self) -> Dict[str, Any]:
+        if self._data is None:
+            try:
+                raw = self._im._getexif() or {}
+            except Exception:  # formats without EXIF support (PNG, ...)
+                raw = {}
+            self._data = {ExifTags.TAGS.get(k, str(k)): v for k, v in raw.items()}
+            self._im = None
+        return self._data
+
+    def __getitem__(self, key):
+        return self._load()[key]
+
+    def __iter__(self):
+        return iter(self._load())
+
+    def __len__(self):
+        return len(self._load())
+
+
+def _dms(ref, coord) -> float | None:
+    if not ref or not coord:
+        return None
+    # IFDRational on current Pillow; (num, den) pairs on old versions
+    d, m, s = (x[0] / x[1] if isinstance(x, tuple) else float(x) for x in coord)
+    sign = 1 if ref in ("N", "E") else -1
+    return sign * (d + m / 60 + s / 3600)
+
+
+def extract_exif_from_pil(im) -> tuple[Mapping | None, float | None, float | None, int | None, int | None]:
+    """extract_exif for an already-opened PIL image; reads headers only.
+
+    GPS comes straight from the GPS IFD; the full tag dict is lazy.
+    """
+    try:
         width, height = im.size
-        exif = im._getexif() or {}
-        exif_readable: Dict[str, Any] = {}
-        
-        for k, v in exif.items():
-            tag = ExifTags.TAGS.get(k, str(k))
-            exif_readable[tag] = v
-        
-        gps = exif_readable.get("GPSInfo")
-        lat = lng = None
-        
-        if gps:
-            def _convert(ref, coord):
-                d = coord[0][0] / coord[0][1]
-                m = coord[1][0] / coord[1][1]
-                s = coord[2][0] / coord[2][1]
-                sign = 1 if ref in ["N", "E"] else -1
-                return sign * (d + m/60 + s/3600)
-            
-            lat = _convert(gps.get(1), gps.get(2)) if gps.get(1) and gps.get(2) else None
-            lng = _convert(gps.get(3), gps.get(4)) if gps.get(3) and gps.get(4) else None
-        
-        return exif_readable, lat, lng, width, height
+        gps = im.getexif().get_ifd(_GPS_IFD) or {}
+        lat = _dms(gps.get(1), gps.get(2))
+        lng = _dms(gps.get(3), gps.get(4))
+        return _LazyTagDict(im), lat, lng, width, height
     except Exception:
-        return None, None, None, None, None
\ No newline at end of file
+        return None, None, None, None, None
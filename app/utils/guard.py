@@ -1,4 +1,5 @@
 # app/utils/guard.py
+import numpy as np
 
 def in01(x: float, name: str = "value"):
     """Assert that a value is normalized between 0 and 1"""
@@ -15,3 +16,16 @@ def non_empty(seq, name: str = "sequence"):
 def positive(x: float, name: str = "value"):
     """Assert that a value is positive"""
     assert x > 0, f"{name} must be positive: {x}"
+
+def all_in01(values, name: str = "values"):
+    """Assert that every value in an array-like is normalized between 0 and 1"""
+    arr = np.asarray(values, dtype=np.float64)
+    assert arr.size == 0 or (arr.min() >= 0.0 and arr.max() <= 1.0), f"{name} not normalized [0,1]: {values}"
+
+
+if not __debug__:
+    # Under python -O the asserts above compile away; make the calls free too
+    def _noop(*args, **kwargs):
+        return None
+
+    in01 = same_len = non_empty = positive = all_in01 = _noop
@@ -1,20 +1,76 @@
 # app/utils/math.py
 """Safe mathematical operations to prevent logic bugs"""
 
+import numpy as np
+
+from app.utils.simd import cosine as _simd_cosine
+
+try:
+    from numba import njit, prange  # type: ignore
+except ImportError:  # optional JIT; numpy path below is used instead
+    njit = None
+    prange = range
+
+# Below this many rows a fused JIT loop beats a BLAS GEMV call plus the
+# separate norm pass; above it BLAS wins.
+_JIT_MAX_ROWS = 10_000
+
+
+if njit is not None:
+    @njit(cache=True, fastmath=True)
+    def _cosine_kernel(a, b):
+        dot = 0.0
+        na = 0.0
+        nb = 0.0
+        for i in range(a.shape[0]):
+            x = a[i]
+            y = b[i]
+            dot += x * y
+            na += x * x
+            nb += y * y
+        if na == 0.0 or nb == 0.0:
+            return 1.0 if na == 0.0 and nb == 0.0 else 0.0
+        s = dot / (np.sqrt(na) * np.sqrt(nb))
+        return min(1.0, max(-1.0, s))
+
+    @njit(cache=True, fastmath=True)
+    def _normalize_kernel(v):
+        n = 0.0
+        for i in range(v.shape[0]):
+            n += v[i] * v[i]
+        out = np.zeros_like(v)
+        if n == 0.0:
+            return out
+        n = np.sqrt(n)
+        for i in range(v.shape[0]):
+            out[i] = v[i] / n
+        return out
+
+    # Compile (or load from the on-disk cache) at import, not on first request
+    _cosine_kernel(np.ones(2), np.ones(2))
+    _normalize_kernel(np.ones(2))
+else:
+    _cosine_kernel = None
+    _normalize_kernel = None
+
+
 def safe_cosine(a, b) -> float:
     """Safe cosine similarity that handles edge cases"""
     try:
         if not a or not b or len(a) != len(b):
             return 0.0
-        a = [float(x) for x in a]
-        b = [float(x) for x in b]
-        n1 = sum(x*x for x in a) ** 0.5
-        n2 = sum(y*y for y in b) ** 0.5
-        if n1 == 0.0 or n2 == 0.0:
-            if n1 == 0.0 and n2 == 0.0:
+        a = np.ascontiguousarray(a, dtype=np.float64)
+        b = np.ascontiguousarray(b, dtype=np.float64)
+        a_zero = not a.any()
+        b_zero = not b.any()
+        if a_zero or b_zero:
+            if a_zero and b_zero:
                 return 1.0
             return 0.0
-        result = sum(x * y for x, y in zip(a, b)) / (n1 * n2)
+        if _cosine_kernel is not None:
+            # scale to max |x| == 1 so tiny or huge inputs don't under/overflow
+            return float(_cosine_kernel(a / np.abs(a).max(), b / np.abs(b).max()))
+        result = _simd_cosine(a, b, dtype=np.float64)
         # Clamp to [-1.0, 1.0] to avoid floating-point overshoot
         return max(-1.0, min(1.0, result))
     except Exception:
@@ -24,10 +80,118 @@ def safe_normalize(vec) -> list[float]:
     try:
         if not vec:
             return []
-        vec = [float(x) for x in vec]
+        # scale to max |x| == 1 first so the squared norm cannot under/overflow
+        m = max(abs(float(x)) for x in vec)
+        if m == 0.0:
+            return [0.0] * len(vec)
+        if _normalize_kernel is not None:
+            return _normalize_kernel(np.ascontiguousarray(vec, dtype=np.float64) / m).tolist()
+        vec = [float(x) / m for x in vec]
         norm = sum(x*x for x in vec) ** 0.5
         if norm == 0.0:
             return [0.0] * len(vec)
         return [x / norm for x in vec]
     except Exception:
         return [0.0] * len(vec) if vec else []
+
+
+if njit is not None:
+    @njit(cache=True, parallel=True, fastmath=True)
+    def _cosine_scores_jit(M, q):
+        n, d = M.shape
+        qn = 0.0
+        for j in range(d):
+            qn += q[j] * q[j]
+        qn = np.sqrt(qn)
+        out = np.zeros(n, dtype=np.float32)
+        if qn == 0.0:
+            return out
+        for i in prange(n):
+            dot = 0.0
+            mn = 0.0
+            for j in range(d):
+                dot += M[i, j] * q[j]
+                mn += M[i, j] * M[i, j]
+            if mn > 0.0:
+                s = dot / (np.sqrt(mn) * qn)
+                out[i] = min(1.0, max(-1.0, s))
+        return out
+else:
+    _cosine_scores_jit = None
+
+
+def _cosine_scores_blas(M: np.ndarray, q: np.ndarray) -> np.ndarray:
+    qn = float(np.linalg.norm(q))
+    mn = np.linalg.norm(M, axis=1)
+    if qn == 0.0:
+        return np.zeros(M.shape[0], dtype=np.float32)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        s = (M @ q) / (mn * qn)
+    s[mn == 0.0] = 0.0
+    return np.clip(s, -1.0, 1.0).astype(np.float32, copy=False)
+
+
+def topk_cosine(M, q, k: int) -> tuple[np.ndarray, np.ndarray]:
+    """Top-k cosine similarity of ``q`` against the rows of ``M``.
+
+    Returns ``(indices, scores)`` sorted by descending score. Zero rows score 0.0.
+    """
+    M = np.asarray(M, dtype=np.float64)
+    q = np.asarray(q, dtype=np.float64).ravel()
+    n = M.shape[0] if M.ndim == 2 else 0
+    k = min(int(k), n)
+    if k <= 0 or M.shape[1] != q.shape[0]:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+    # Scale each row (and q) to max |x| == 1 before dropping to float32, so
+    # tiny or huge components neither flush to zero nor overflow the norms
+    m = np.abs(M).max(axis=1, keepdims=True) if M.shape[1] else np.zeros((n, 1))
+    M = np.ascontiguousarray(M / np.where(m > 0.0, m, 1.0), dtype=np.float32)
+    qm = float(np.abs(q).max()) if q.size else 0.0
+    q = np.ascontiguousarray(q / qm if qm else q, dtype=np.float32)
+    if _cosine_scores_jit is not None and n < _JIT_MAX_ROWS:
+        scores = _cosine_scores_jit(M, q)
+    else:
+        scores = _cosine_scores_blas(M, q)
+    idx = np.argpartition(-scores, k - 1)[:k]
+    idx = idx[np.argsort(-scores[idx], kind="stable")]
+    return idx.astype(np.int64, copy=False), scores[idx]
+
+
+def quantize_int8(M) -> tuple[np.ndarray, np.ndarray]:
+    """L2-normalise each row and quantise it to int8 with a per-row scale.
+
+    ``Q[i] * scale[i]`` approximates the unit vector of ``M[i]``; zero rows get
+    scale 0.0 so they score 0.0 in :func:`topk_cosine_int8`.
+    """
+    M = np.atleast_2d(np.asarray(M, dtype=np.float32))
+    norms = np.linalg.norm(M, axis=1, keepdims=True)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        U = np.where(norms > 0.0, M / norms, 0.0)
+    amax = np.abs(U).max(axis=1) if U.shape[1] else np.zeros(U.shape[0], dtype=np.float32)
+    scale = (amax / 127.0).astype(np.float32)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        Q = np.where(scale[:, None] > 0.0, np.round(U / scale[:, None]), 0.0)
+    return np.clip(Q, -127, 127).astype(np.int8), scale
+
+
+def topk_cosine_int8(Q: np.ndarray, scale: np.ndarray, q, k: int) -> tuple[np.ndarray, np.ndarray]:
+    """Top-k cosine of ``q`` against rows quantised by :func:`quantize_int8`.
+
+    Same return shape as :func:`topk_cosine`.
+    """
+    q = np.asarray(q, dtype=np.float32).ravel()
+    n = Q.shape[0] if Q.ndim == 2 else 0
+    k = min(int(k), n)
+    if k <= 0 or Q.shape[1] != q.shape[0]:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+    qn = float(np.linalg.norm(q))
+    if qn == 0.0:
+        scores = np.zeros(n, dtype=np.float32)
+    else:
+        # numpy has no int8 GEMM, so widen to float32 for BLAS; storage and
+        # load stay at one byte per dimension
+        scores = (Q.astype(np.float32) @ (q / qn)) * scale
+        scores = np.clip(scores, -1.0, 1.0).astype(np.float32, copy=False)
+    idx = np.argpartition(-scores, k - 1)[:k]
+    idx = idx[np.argsort(-scores[idx], kind="stable")]
+    return idx.astype(np.int64, copy=False), scores[idx]
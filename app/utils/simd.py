@@ -0,0 +1,50 @@
+# app/utils/simd.py
+"""Cosine kernels, dispatched to SimSIMD when it is installed"""
+
+import numpy as np
+
+try:
+    import simsimd as _simd  # type: ignore
+except ImportError:  # optional SIMD kernels; numpy path below is used instead
+    _simd = None
+
+
+def _vec(x, dtype) -> np.ndarray:
+    return np.ascontiguousarray(x, dtype=dtype).ravel()
+
+
+def _rescaled(x, dtype) -> np.ndarray:
+    # Cosine ignores scale; dividing by max |x| first keeps the squared norm
+    # from underflowing (or overflowing) before the sqrt
+    x = np.asarray(x, dtype=np.float64).ravel()
+    m = float(np.max(np.abs(x))) if x.size else 0.0
+    return _vec(x / m if m else x, dtype)
+
+
+def cosine(a, b, dtype=np.float32) -> float:
+    """Cosine similarity of two equal-length vectors.
+
+    Zero vectors are the caller's problem: the NumPy path scores them 0.0,
+    SimSIMD scores two zero vectors 1.0.
+    """
+    a = _rescaled(a, dtype)
+    b = _rescaled(b, dtype)
+    if _simd is not None:
+        return 1.0 - float(_simd.cosine(a, b))
+    den = float(np.sqrt(np.vdot(a, a)) * np.sqrt(np.vdot(b, b)))
+    return float(np.dot(a, b)) / den if den else 0.0
+
+
+def cosine_many(q, M, dtype=np.float32) -> np.ndarray:
+    """Cosine similarity of q against every row of M, shape (N,)"""
+    q = _rescaled(q, dtype)
+    M = np.asarray(M, dtype=np.float64)
+    m = np.abs(M).max(axis=1, keepdims=True) if M.size else np.ones((M.shape[0], 1))
+    M = np.ascontiguousarray(M / np.where(m > 0.0, m, 1.0), dtype=dtype)
+    if _simd is not None:
+        return 1.0 - np.asarray(_simd.cdist(q[None, :], M, metric="cosine"), dtype=dtype).ravel()
+    den = np.sqrt(np.einsum("ij,ij->i", M, M)) * np.sqrt(np.vdot(q, q))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        s = (M @ q) / den
+    s[den == 0] = 0.0
+    return s
@@ -2,12 +2,17 @@ import asyncio
 from app.models.image import Image
 from app.models.user import User
 from app.models.face import Face
-from app.services.encryption import unwrap_dek, fernet_from_dek
-from app.services.vision import to_rgb_np
-from app.services.embeddings import image_embedding, text_embedding
+from app.services.encryption import unwrap_dek, decrypt_blob, encrypt_blob
+from app.services.vision import to_rgb_np_async
+from app.services.embeddings import EMBEDDING_VERSION, image_embedding, text_embedding_batch
+from app.services.vector_store import upsert_image_vector
+from app.services.image_embeddings_store import save_embedding as save_image_embedding, delete_embeddings as delete_image_embeddings
 from app.consolidated_services import storage, make_thumbnail
 from app.services.ai_metadata_store import save_metadata
 
+# CLIP zero-shot categories; their embeddings are computed once per process
+_CAND = ("portrait", "landscape", "objects", "people")
+
 async def _load(image_id: str, user_id: str):
     img = await Image.filter(id=image_id, user_id=user_id).first()
     user = await User.filter(id=user_id).first()
@@ -20,12 +25,11 @@ def generate_thumbnail(image_id: str, user_id: str):
             return
         enc = storage.read(img.storage_key)
         dek = unwrap_dek(user.dek_encrypted_b64)
-        f = fernet_from_dek(dek)
-        plain = f.decrypt(enc)
+        plain = decrypt_blob(dek, enc, str(user.id).encode())
         thumb = make_thumbnail(plain)
         if not thumb:
             return
-        enc_thumb = f.encrypt(thumb)
+        enc_thumb = encrypt_blob(dek, thumb, str(user.id).encode())
         key = storage.save(str(user.id), f"{img.id}_thumb.jpg", enc_thumb)
         img.thumb_storage_key = key
         await img.save()
@@ -36,16 +40,23 @@ def generate_embeddings(image_id: str, user_id: str):
         user, img = await _load(image_id, user_id)
         if not user or not img:
             return
+        if img.embedding_json and img.emb_version >= EMBEDDING_VERSION:
+            # Retry after a pgvector failure: only the upsert is missing
+            await upsert_image_vector(str(img.id), img.embedding_json)
+            return
         enc = storage.read(img.storage_key)
         dek = unwrap_dek(user.dek_encrypted_b64)
-        f = fernet_from_dek(dek)
-        plain = f.decrypt(enc)
-        np_rgb = await to_rgb_np(plain)
+        plain = decrypt_blob(dek, enc, str(user.id).encode())
+        np_rgb = await to_rgb_np_async(plain)
         emb = image_embedding(np_rgb)
         img.embedding_json = list(map(float, emb)) if emb is not None else None
+        img.emb_version = EMBEDDING_VERSION
         await img.save()
+        if img.embedding_json:
+            save_image_embedding(str(img.user_id), str(img.id), img.embedding_json)
+        else:
+            delete_image_embeddings(str(img.user_id), [img.id])
         try:
-            from app.services.vector_store import upsert_image_vector
             await upsert_image_vector(str(img.id), emb)
         except Exception:
             pass
@@ -66,12 +77,9 @@ def ai_tagging(image_id: str, user_id: str):
             if img.embedding_json:
                 import numpy as np
                 ivec = np.array(img.embedding_json, dtype=np.float32)
-                cand = ["portrait", "landscape", "objects", "people"]
-                sims = [(c, float(np.dot(ivec, text_embedding(c)) / (np.linalg.norm(ivec) * np.linalg.norm(text_embedding(c)) + 1e-9))) for c in cand]
-                best = sorted(sims, key=lambda t: t[1], reverse=True)[:1]
-                for c, _ in best:
-                    if c not in categories:
-                        categories.append(c)
+                best = _CAND[int((text_embedding_batch(_CAND) @ ivec).argmax())]
+                if best not in categories:
+                    categories.append(best)
         except Exception:
             pass
         save_metadata(str(user.id), str(img.id), {
@@ -7,9 +7,11 @@ from tortoise import Tortoise
 from app.models.image import Image
 from app.models.user import User
 from app.models.face import Face
-from app.services.encryption import unwrap_dek, fernet_from_dek
-from app.services.vision import to_rgb_np
-from app.services.embeddings import image_embedding, text_embedding
+from app.services.encryption import unwrap_dek, decrypt_blob, encrypt_blob
+from app.services.vision import to_rgb_np_async
+from app.services.embeddings import EMBEDDING_VERSION, image_embedding, text_embedding_batch
+from app.services.vector_store import upsert_image_vector
+from app.services.image_embeddings_store import save_embedding as save_image_embedding, delete_embeddings as delete_image_embeddings
 from app.consolidated_services import storage, make_thumbnail
 from app.services.ai_metadata_store import save_metadata
 
@@ -18,6 +20,26 @@ BACKEND = os.getenv("CELERY_RESULT_BACKEND", BROKER)
 
 celery_app = Celery("photovault", broker=BROKER, backend=BACKEND)
 
+# Jobs are long and uneven (embeddings dwarf thumbnails): ack after the work
+# is done and reserve one job per process, so a quick thumbnail never waits
+# in the prefetch buffer of a worker busy with embeddings. Each task type
+# gets its own queue so workers can be sized per workload (see Makefile):
+#   celery -A app.workers.tasks worker -Ofair -Q embeddings   (CPU bound)
+#   celery -A app.workers.tasks worker -Ofair -Q thumbnails,ai_tagging -c 16
+celery_app.conf.update(
+    task_acks_late=True,
+    worker_prefetch_multiplier=1,
+    worker_concurrency=int(os.getenv("CELERY_WORKER_CONCURRENCY", str(os.cpu_count() or 1))),
+    task_routes={
+        "task_generate_thumbnail": {"queue": "thumbnails"},
+        "task_generate_embeddings": {"queue": "embeddings"},
+        "task_ai_tagging": {"queue": "ai_tagging"},
+    },
+)
+
+# CLIP zero-shot categories; their embeddings are computed once per process
+_CAND = ("portrait", "landscape", "objects", "people")
+
 async def _ensure_db():
     if not Tortoise._inited:
         await Tortoise.init(TORTOISE_ORM)
@@ -31,8 +53,7 @@ async def _load_user_image(image_id: str, user_id: str):
 def _decrypt_bytes(enc_bytes: bytes, user: User) -> Optional[bytes]:
     try:
         dek_b64 = unwrap_dek(user.dek_encrypted_b64)
-        fernet = fernet_from_dek(dek_b64)
-        return fernet.decrypt(enc_bytes)
+        return decrypt_blob(dek_b64, enc_bytes, str(user.id).encode())
     except Exception:
         return None
 
@@ -49,9 +70,7 @@ def task_generate_thumbnail(image_id: str, user_id: str):
         thumb = make_thumbnail(plain)
         if not thumb:
             return
-        dek_b64 = unwrap_dek(user.dek_encrypted_b64)
-        fernet = fernet_from_dek(dek_b64)
-        enc_thumb = fernet.encrypt(thumb)
+        enc_thumb = encrypt_blob(unwrap_dek(user.dek_encrypted_b64), thumb, str(user.id).encode())
         key = storage.save(str(user.id), f"{img.id}_thumb.jpg", enc_thumb)
         img.thumb_storage_key = key
         await img.save()
@@ -63,17 +82,25 @@ def task_generate_embeddings(image_id: str, user_id: str):
         user, img = await _load_user_image(image_id, user_id)
         if not user or not img:
             return
+        if img.embedding_json and img.emb_version >= EMBEDDING_VERSION:
+            # Retry after a pgvector failure: only the upsert is missing
+            await upsert_image_vector(str(img.id), img.embedding_json)
+            return
         enc_bytes = storage.read(img.storage_key)
         plain = _decrypt_bytes(enc_bytes, user)
         if not plain:
             return
-        np_rgb = await to_rgb_np(plain)
+        np_rgb = await to_rgb_np_async(plain)
         emb = image_embedding(np_rgb)
         img.embedding_json = list(map(float, emb)) if emb is not None else None
+        img.emb_version = EMBEDDING_VERSION
         await img.save()
+        if img.embedding_json:
+            save_image_embedding(str(img.user_id), str(img.id), img.embedding_json)
+        else:
+            delete_image_embeddings(str(img.user_id), [img.id])
         # Upsert into pgvector if enabled
         try:
-            from app.services.vector_store import upsert_image_vector
             await upsert_image_vector(str(img.id), emb)
         except Exception:
             pass
@@ -114,15 +141,11 @@ def task_ai_tagging(image_id: str, user_id: str):
         # Optional semantic category via CLIP if available
         try:
             if img.embedding_json:
-                cand = ["portrait", "landscape", "objects", "people"]
-                q_embs = [(c, text_embedding(c)) for c in cand]
                 import numpy as np
                 ivec = np.array(img.embedding_json, dtype=np.float32)
-                sims = [(c, float(np.dot(ivec, q) / (np.linalg.norm(ivec) * np.linalg.norm(q) + 1e-9))) for c, q in q_embs]
-                best = sorted(sims, key=lambda t: t[1], reverse=True)[:1]
-                for c, _ in best:
-                    if c not in categories:
-                        categories.append(c)
+                best = _CAND[int((text_embedding_batch(_CAND) @ ivec).argmax())]
+                if best not in categories:
+                    categories.append(best)
         except Exception:
             pass
 
@@ -6,18 +6,36 @@ Starts the backend and checks for all errors
 
 import asyncio
 import subprocess
+from concurrent.futures import ThreadPoolExecutor
 import sys
+import tempfile
 import time
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import hashlib
 import json
 import os
 from pathlib import Path
 
+# Result of the last successful schema check, keyed by the route set
+OPENAPI_CACHE = Path(".cache/openapi.json")
+
 class PhotoVaultErrorChecker:
     def __init__(self):
         self.backend_process = None
+        # Server output goes to unbuffered temp files, not pipes nobody reads
+        self.backend_stdout = None
+        self.backend_stderr = None
         self.errors_found = []
         self.warnings_found = []
+        # One keep-alive connection pool for every probe against the local server
+        self.session = requests.Session()
+        self.session.mount("http://127.0.0.1", HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=5,  # one connection per concurrent probe
+            max_retries=Retry(total=2, backoff_factor=0.1),
+        ))
         
     def log(self, message: str, level: str = "INFO"):
         """Log messages with timestamp"""
@@ -64,36 +82,55 @@ class PhotoVaultErrorChecker:
         
         try:
             # Start uvicorn server
+            self.backend_stdout = tempfile.TemporaryFile(buffering=0)
+            self.backend_stderr = tempfile.TemporaryFile(buffering=0)
             self.backend_process = subprocess.Popen([
                 sys.executable, "-m", "uvicorn", 
                 "app.main:app", 
                 "--host", "127.0.0.1", 
                 "--port", "8000",
                 "--log-level", "info"
-            ], env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+            ], env=env, stdout=self.backend_stdout, stderr=self.backend_stderr)
             
-            # Wait for server to start
+            # Wait for server to start: poll /health with backoff, 15s budget
             self.log("⏳ Waiting for server to initialize...")
-            time.sleep(5)
+            deadline = time.monotonic() + 15
+            delay = 0.05
+            while time.monotonic() < deadline:
+                if self.backend_process.poll() is not None:
+                    self.backend_process.wait()
+                    stderr = self._tail(self.backend_stderr)
+                    self.errors_found.append(f"Backend failed to start. STDERR: {stderr}")
+                    return False
+                try:
+                    if self.session.get("http://127.0.0.1:8000/health", timeout=0.5).status_code == 200:
+                        return True
+                except requests.exceptions.RequestException:
+                    pass
+                time.sleep(delay)
+                delay = min(delay * 2, 0.5)
             
-            # Check if process is still running
-            if self.backend_process.poll() is not None:
-                stdout, stderr = self.backend_process.communicate()
-                self.errors_found.append(f"Backend failed to start. STDERR: {stderr}")
-                return False
-                
-            return True
+            self.errors_found.append("Backend did not become ready within 15s")
+            return False
             
         except Exception as e:
             self.errors_found.append(f"Failed to start backend: {e}")
             return False
             
+    @staticmethod
+    def _tail(f, size: int = 8192) -> str:
+        """Last `size` bytes written to a log file."""
+        if f is None:
+            return ""
+        f.seek(max(0, os.fstat(f.fileno()).st_size - size))
+        return f.read().decode(errors="replace")
+            
     def check_backend_health(self):
         """Check if backend is responding"""
         self.log("🏥 Checking backend health...")
         
         try:
-            response = requests.get("http://127.0.0.1:8000/health", timeout=10)
+            response = self.session.get("http://127.0.0.1:8000/health", timeout=10)
             if response.status_code == 200:
                 self.log("✓ Backend health check passed")
                 return True
@@ -109,7 +146,7 @@ class PhotoVaultErrorChecker:
         self.log("📚 Checking Swagger UI...")
         
         try:
-            response = requests.get("http://127.0.0.1:8000/docs", timeout=10)
+            response = self.session.get("http://127.0.0.1:8000/docs", timeout=10)
             if response.status_code == 200:
                 self.log("✓ Swagger UI is accessible")
                 return True
@@ -125,7 +162,7 @@ class PhotoVaultErrorChecker:
         self.log("🛣️ Checking loaded routes...")
         
         try:
-            response = requests.get("http://127.0.0.1:8000/ops/routes", timeout=10)
+            response = self.session.get("http://127.0.0.1:8000/ops/routes", timeout=10)
             if response.status_code == 200:
                 data = response.json()
                 route_count = data.get("count", 0)
@@ -142,16 +179,41 @@ class PhotoVaultErrorChecker:
             self.warnings_found.append(f"Cannot check routes: {e}")
             return False
             
+    def _route_hash(self):
+        """SHA-256 over the server's (path, methods) list, or None if unavailable."""
+        response = self.session.get("http://127.0.0.1:8000/ops/routes", timeout=10)
+        if response.status_code != 200:
+            return None
+        routes = sorted((r.get("path", ""), sorted(r.get("methods", []))) for r in response.json().get("routes", []))
+        return hashlib.sha256(json.dumps(routes).encode()).hexdigest()
+        
     def check_openapi_schema(self):
         """Check OpenAPI schema generation"""
         self.log("📋 Checking OpenAPI schema...")
         
+        # A schema already generated for this exact route set is not rebuilt
         try:
-            response = requests.get("http://127.0.0.1:8000/openapi.json", timeout=10)
+            route_hash = self._route_hash()
+        except (requests.exceptions.RequestException, ValueError):
+            route_hash = None
+        if route_hash:
+            try:
+                cached = json.loads(OPENAPI_CACHE.read_text())
+                if cached.get("route_hash") == route_hash:
+                    self.log(f"✓ OpenAPI schema unchanged since last run ({cached['paths_count']} paths, cached)")
+                    return True
+            except (OSError, ValueError, KeyError):
+                pass
+        
+        try:
+            response = self.session.get("http://127.0.0.1:8000/openapi.json", timeout=10)
             if response.status_code == 200:
                 schema = response.json()
                 paths_count = len(schema.get("paths", {}))
                 self.log(f"✓ OpenAPI schema generated with {paths_count} paths")
+                if route_hash:
+                    OPENAPI_CACHE.parent.mkdir(exist_ok=True)
+                    OPENAPI_CACHE.write_text(json.dumps({"route_hash": route_hash, "paths_count": paths_count}))
                 return True
             else:
                 self.errors_found.append(f"OpenAPI schema failed with status {response.status_code}")
@@ -165,7 +227,7 @@ class PhotoVaultErrorChecker:
         self.log("🗄️ Checking database connection...")
         
         try:
-            response = requests.get("http://127.0.0.1:8000/ops/db-health", timeout=10)
+            response = self.session.get("http://127.0.0.1:8000/ops/db-health", timeout=10)
             if response.status_code == 200:
                 data = response.json()
                 if data.get("status") == "healthy":
@@ -183,18 +245,16 @@ class PhotoVaultErrorChecker:
             
     def get_backend_logs(self):
         """Get backend logs to check for errors"""
-        if self.backend_process and self.backend_process.poll() is None:
-            try:
-                # Get recent output
-                self.backend_process.stdout.flush()
-                self.backend_process.stderr.flush()
-                return "Backend is running - check console for live logs"
-            except:
-                return "Could not retrieve logs"
-        return "Backend process not running"
+        if self.backend_process is None:
+            return "Backend process not running"
+        try:
+            return self._tail(self.backend_stdout) + self._tail(self.backend_stderr)
+        except OSError:
+            return "Could not retrieve logs"
         
     def cleanup(self):
         """Clean up resources"""
+        self.session.close()
         if self.backend_process:
             self.log("🧹 Stopping backend server...")
             self.backend_process.terminate()
@@ -202,6 +262,9 @@ class PhotoVaultErrorChecker:
                 self.backend_process.wait(timeout=5)
             except subprocess.TimeoutExpired:
                 self.backend_process.kill()
+        for f in (self.backend_stdout, self.backend_stderr):
+            if f is not None:
+                f.close()
                 
     def run_comprehensive_check(self):
         """Run all error checks"""
@@ -218,12 +281,20 @@ class PhotoVaultErrorChecker:
             if not self.start_backend():
                 return False
                 
-            # Step 3: Health checks
-            self.check_backend_health()
-            self.check_swagger_ui()
-            self.check_routes_count()
-            self.check_openapi_schema()
-            self.check_database_connection()
+            # Step 3: Health checks. The probes are independent, so run them
+            # side by side; list.append is atomic, so they can share the
+            # error/warning lists without a lock.
+            probes = (
+                self.check_backend_health,
+                self.check_swagger_ui,
+                self.check_routes_count,
+                self.check_openapi_schema,
+                self.check_database_connection,
+            )
+            with ThreadPoolExecutor(max_workers=len(probes)) as pool:
+                futures = [pool.submit(probe) for probe in probes]
+            for f in futures:
+                f.result()  # re-raise anything a probe did not handle
             
             # Step 4: Report results
             self.log("=" * 60)
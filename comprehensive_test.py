@@ -1,4 +1,5 @@
-import requests
+import asyncio
+import httpx
 import json
 import time
 import os
@@ -10,29 +11,24 @@ class PhotoVaultTester:
     def __init__(self):
         self.token = None
         self.user_id = None
-        self.session = requests.Session()
+        self.client: Optional[httpx.AsyncClient] = None
         
     def log(self, message: str, status: str = "INFO"):
         print(f"[{status}] {message}")
         
-    def test_endpoint(self, method: str, endpoint: str, data=None, files=None, headers=None):
+    async def test_endpoint(self, method: str, endpoint: str, data=None, files=None, headers=None):
         """Generic endpoint tester"""
         url = f"{BASE_URL}{endpoint}"
         try:
-            if method.upper() == "GET":
-                response = self.session.get(url, headers=headers)
-            elif method.upper() == "POST":
-                if files:
-                    response = self.session.post(url, files=files, headers=headers)
-                else:
-                    response = self.session.post(url, json=data, headers=headers)
-            elif method.upper() == "PUT":
-                response = self.session.put(url, json=data, headers=headers)
-            elif method.upper() == "DELETE":
-                response = self.session.delete(url, headers=headers)
-            else:
+            if method.upper() not in ("GET", "POST", "PUT", "DELETE"):
                 self.log(f"Unsupported method: {method}", "ERROR")
                 return None
+            if files:
+                response = await self.client.request(method, url, files=files, headers=headers)
+            elif data is not None and method.upper() in ("POST", "PUT"):
+                response = await self.client.request(method, url, json=data, headers=headers)
+            else:
+                response = await self.client.request(method, url, headers=headers)
                 
             self.log(f"{method} {endpoint} -> {response.status_code}")
             if response.status_code < 400:
@@ -53,20 +49,20 @@ class PhotoVaultTester:
             return {"Authorization": f"Bearer {self.token}"}
         return {}
     
-    def test_health_endpoints(self):
+    async def test_health_endpoints(self):
         """Test health and system endpoints"""
         self.log("=== TESTING HEALTH ENDPOINTS ===")
         
         # Basic health check
-        self.test_endpoint("GET", "/health")
+        await self.test_endpoint("GET", "/health")
         
         # Metrics endpoint
-        self.test_endpoint("GET", "/metrics")
+        await self.test_endpoint("GET", "/metrics")
         
         # Database health (if available)
-        self.test_endpoint("GET", "/ops/db-health", headers=self.get_auth_headers())
+        await self.test_endpoint("GET", "/ops/db-health", headers=self.get_auth_headers())
     
-    def test_auth_endpoints(self):
+    async def test_auth_endpoints(self):
         """Test authentication endpoints"""
         self.log("=== TESTING AUTH ENDPOINTS ===")
         
@@ -77,7 +73,7 @@ class PhotoVaultTester:
             "name": "Auto Test User"
         }
         
-        result = self.test_endpoint("POST", "/auth/signup", data=signup_data)
+        result = await self.test_endpoint("POST", "/auth/signup", data=signup_data)
         if result and "access_token" in result:
             self.token = result["access_token"]
             self.log("Signup successful, token obtained")
@@ -88,102 +84,102 @@ class PhotoVaultTester:
             "password": "AutoTest123!"
         }
         
-        result = self.test_endpoint("POST", "/auth/login", data=login_data)
+        result = await self.test_endpoint("POST", "/auth/login", data=login_data)
         if result and "access_token" in result:
             self.token = result["access_token"]
             self.log("Login successful, token updated")
         
         # Test token verification
-        self.test_endpoint("GET", "/auth/verify", headers=self.get_auth_headers())
+        await self.test_endpoint("GET", "/auth/verify", headers=self.get_auth_headers())
         
         # Test token info
-        self.test_endpoint("GET", "/auth/token-info", headers=self.get_auth_headers())
+        await self.test_endpoint("GET", "/auth/token-info", headers=self.get_auth_headers())
         
         # Test session endpoints
         if self.user_id:
-            self.test_endpoint("POST", "/auth/session-login", data={"user_id": self.user_id})
-            self.test_endpoint("POST", "/auth/refresh", data={"session_token": "dummy_token"})
-            self.test_endpoint("POST", "/auth/logout", data={"session_token": "dummy_token"})
+            await self.test_endpoint("POST", "/auth/session-login", data={"user_id": self.user_id})
+            await self.test_endpoint("POST", "/auth/refresh", data={"session_token": "dummy_token"})
+            await self.test_endpoint("POST", "/auth/logout", data={"session_token": "dummy_token"})
     
-    def test_dashboard_endpoints(self):
+    async def test_dashboard_endpoints(self):
         """Test dashboard endpoints"""
         self.log("=== TESTING DASHBOARD ENDPOINTS ===")
         
         headers = self.get_auth_headers()
         
         # Common dashboard endpoints
-        self.test_endpoint("GET", "/dashboard", headers=headers)
-        self.test_endpoint("GET", "/dashboard/stats", headers=headers)
-        self.test_endpoint("GET", "/dashboard/recent", headers=headers)
-        self.test_endpoint("GET", "/dashboard/summary", headers=headers)
+        await self.test_endpoint("GET", "/dashboard", headers=headers)
+        await self.test_endpoint("GET", "/dashboard/stats", headers=headers)
+        await self.test_endpoint("GET", "/dashboard/recent", headers=headers)
+        await self.test_endpoint("GET", "/dashboard/summary", headers=headers)
     
-    def test_album_endpoints(self):
+    async def test_album_endpoints(self):
         """Test album management endpoints"""
         self.log("=== TESTING ALBUM ENDPOINTS ===")
         
         headers = self.get_auth_headers()
         
         # List albums
-        self.test_endpoint("GET", "/albums", headers=headers)
+        await self.test_endpoint("GET", "/albums", headers=headers)
         
         # Create album
         album_data = {
             "name": "Test Album",
             "description": "Auto-generated test album"
         }
-        album_result = self.test_endpoint("POST", "/albums", data=album_data, headers=headers)
+        album_result = await self.test_endpoint("POST", "/albums", data=album_data, headers=headers)
         
         album_id = None
         if album_result and "id" in album_result:
             album_id = album_result["id"]
             
             # Test album operations with ID
-            self.test_endpoint("GET", f"/albums/{album_id}", headers=headers)
-            self.test_endpoint("PUT", f"/albums/{album_id}", data={"name": "Updated Album"}, headers=headers)
-            self.test_endpoint("DELETE", f"/albums/{album_id}", headers=headers)
+            await self.test_endpoint("GET", f"/albums/{album_id}", headers=headers)
+            await self.test_endpoint("PUT", f"/albums/{album_id}", data={"name": "Updated Album"}, headers=headers)
+            await self.test_endpoint("DELETE", f"/albums/{album_id}", headers=headers)
     
-    def test_image_endpoints(self):
+    async def test_image_endpoints(self):
         """Test image management endpoints"""
         self.log("=== TESTING IMAGE ENDPOINTS ===")
         
         headers = self.get_auth_headers()
         
         # List images
-        self.test_endpoint("GET", "/images", headers=headers)
-        self.test_endpoint("GET", "/images/recent", headers=headers)
+        await self.test_endpoint("GET", "/images", headers=headers)
+        await self.test_endpoint("GET", "/images/recent", headers=headers)
         
         # Bulk operations
-        self.test_endpoint("GET", "/images/bulk", headers=headers)
-        self.test_endpoint("POST", "/images/upload/bulk", headers=headers)
+        await self.test_endpoint("GET", "/images/bulk", headers=headers)
+        await self.test_endpoint("POST", "/images/upload/bulk", headers=headers)
         
         # Search endpoints
-        self.test_endpoint("GET", "/search/advanced", headers=headers)
-        self.test_endpoint("POST", "/search/advanced", data={"query": "test"}, headers=headers)
+        await self.test_endpoint("GET", "/search/advanced", headers=headers)
+        await self.test_endpoint("POST", "/search/advanced", data={"query": "test"}, headers=headers)
     
-    def test_admin_endpoints(self):
+    async def test_admin_endpoints(self):
         """Test admin endpoints"""
         self.log("=== TESTING ADMIN ENDPOINTS ===")
         
         headers = self.get_auth_headers()
         
         # Admin endpoints (may require admin privileges)
-        self.test_endpoint("GET", "/admin", headers=headers)
-        self.test_endpoint("GET", "/admin/users", headers=headers)
-        self.test_endpoint("GET", "/admin/stats", headers=headers)
-        self.test_endpoint("GET", "/admin/system", headers=headers)
+        await self.test_endpoint("GET", "/admin", headers=headers)
+        await self.test_endpoint("GET", "/admin/users", headers=headers)
+        await self.test_endpoint("GET", "/admin/stats", headers=headers)
+        await self.test_endpoint("GET", "/admin/system", headers=headers)
     
-    def test_public_endpoints(self):
+    async def test_public_endpoints(self):
         """Test public sharing endpoints"""
         self.log("=== TESTING PUBLIC ENDPOINTS ===")
         
         # Public endpoints (no auth required)
-        self.test_endpoint("GET", "/share")
-        self.test_endpoint("GET", "/share/public")
+        await self.test_endpoint("GET", "/share")
+        await self.test_endpoint("GET", "/share/public")
         
         # Test with dummy share token
-        self.test_endpoint("GET", "/share/dummy-token")
+        await self.test_endpoint("GET", "/share/dummy-token")
     
-    def test_api_endpoints(self):
+    async def test_api_endpoints(self):
         """Test general API endpoints"""
         self.log("=== TESTING GENERAL API ENDPOINTS ===")
         
@@ -198,27 +194,34 @@ class PhotoVaultTester:
         ]
         
         for endpoint in endpoints:
-            self.test_endpoint("GET", endpoint, headers=headers)
+            await self.test_endpoint("GET", endpoint, headers=headers)
     
-    def run_all_tests(self):
+    async def run_all_tests(self):
         """Run comprehensive test suite"""
         self.log("STARTING COMPREHENSIVE API TESTING")
         self.log(f"Testing against: {BASE_URL}")
         
-        # Test in logical order
-        self.test_health_endpoints()
-        self.test_auth_endpoints()
-        
-        if self.token:
-            self.test_dashboard_endpoints()
-            self.test_album_endpoints()
-            self.test_image_endpoints()
-            self.test_admin_endpoints()
-            self.test_api_endpoints()
-        else:
-            self.log("No authentication token available, skipping protected endpoints", "WARNING")
-        
-        self.test_public_endpoints()
+        limits = httpx.Limits(max_keepalive_connections=20, max_connections=50)
+        async with httpx.AsyncClient(limits=limits, timeout=30) as client:
+            self.client = client
+            
+            # Health first, then auth (the other groups need its token)
+            await self.test_health_endpoints()
+            await self.test_auth_endpoints()
+            
+            # The remaining groups are independent of each other
+            groups = [self.test_public_endpoints()]
+            if self.token:
+                groups = [
+                    self.test_dashboard_endpoints(),
+                    self.test_album_endpoints(),
+                    self.test_image_endpoints(),
+                    self.test_admin_endpoints(),
+                    self.test_api_endpoints(),
+                ] + groups
+            else:
+                self.log("No authentication token available, skipping protected endpoints", "WARNING")
+            await asyncio.gather(*groups)
         
         self.log("TESTING COMPLETED")
 
@@ -229,7 +232,7 @@ def main():
     
     # Check if server is running
     try:
-        response = requests.get(f"{BASE_URL}/health", timeout=5)
+        response = httpx.get(f"{BASE_URL}/health", timeout=5)
         print(f"Server is running (Status: {response.status_code})")
     except:
         print("Server is not running!")
@@ -240,7 +243,12 @@ def main():
     
     # Run tests
     tester = PhotoVaultTester()
-    tester.run_all_tests()
+    asyncio.run(tester.run_all_tests())
 
 if __name__ == "__main__":
+    try:
+        import uvloop  # not available on Windows
+        uvloop.install()
+    except ImportError:
+        pass
     main()
\ No newline at end of file
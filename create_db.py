@@ -22,12 +22,10 @@ async def create_database():
         print("Database initialized successfully!")
         
         # Test database connection
-        from tortoise import Tortoise
         from app.models.user import User
         
-        # Create a test user if none exists
-        user_count = await User.all().count()
-        if user_count == 0:
+        # Create a test user if none exists (SELECT ... LIMIT 1, not COUNT(*))
+        if not await User.exists():
             print("Creating test user...")
             test_user = await User.create(
                 email="test@example.com",
@@ -36,7 +34,7 @@ async def create_database():
             )
             print(f"Test user created: {test_user.email}")
         else:
-            print(f"Found {user_count} existing users")
+            print("Users already present, skipping seeding")
             
     except Exception as e:
         print(f"Database initialization failed: {e}")
@@ -47,6 +45,11 @@ async def create_database():
     return True
 
 if __name__ == "__main__":
+    try:
+        import uvloop  # not available on Windows
+        uvloop.install()
+    except ImportError:
+        pass
     success = asyncio.run(create_database())
     if success:
         print("PhotoVault database setup complete!")
@@ -23,15 +23,12 @@ async def initialize_database():
         print("✅ Database initialized successfully!")
         
         # Test database connection and create test user if needed
-        from tortoise import Tortoise
-        
-        # Check if we can query users
         try:
-            user_count = await User.all().count()
-            print(f"📊 Found {user_count} existing users")
-            
-            if user_count == 0:
-                print("👤 Creating test user...")
+            # SELECT ... LIMIT 1 instead of a full COUNT(*)
+            if await User.exists():
+                print("📊 Users already present, skipping seeding")
+            else:
+                print("👤 Seeding test user...")
                 test_user = await User.create(
                     email="test@example.com",
                     name="Test User",
@@ -52,6 +49,11 @@ async def initialize_database():
     return True
 
 if __name__ == "__main__":
+    try:
+        import uvloop  # not available on Windows
+        uvloop.install()
+    except ImportError:
+        pass
     success = asyncio.run(initialize_database())
     if success:
         print("🎉 PhotoVault database setup complete!")
@@ -27,6 +27,11 @@ async def initialize_database():
         await close_db()
 
 if __name__ == "__main__":
+    try:
+        import uvloop  # not available on Windows
+        uvloop.install()
+    except ImportError:
+        pass
     success = asyncio.run(initialize_database())
     if not success:
         sys.exit(1)
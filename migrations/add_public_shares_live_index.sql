@@ -0,0 +1,7 @@
+-- Share views look up live shares by token fingerprint. The partial index
+-- skips revoked rows and INCLUDEs the columns the validity check reads, so
+-- the lookup does not visit the heap for them (Postgres 11+).
+CREATE INDEX IF NOT EXISTS public_shares_live
+    ON public_shares (token_hash)
+    INCLUDE (view_count, max_views, expires_at, album_id, created_by)
+    WHERE revoked = false;
@@ -0,0 +1,3 @@
+-- Partial index for session rotation: revoking a user's live sessions only
+-- touches rows that are not revoked yet
+CREATE INDEX IF NOT EXISTS sessions_active ON sessions (user_id) WHERE revoked = false;
@@ -0,0 +1,11 @@
+-- Store image embeddings as L2-normalised halfvec (pgvector 0.7+).
+-- Unit vectors make inner product equal to cosine, so search orders by
+-- emb <#> q instead of <=>, and float16 halves the bytes per distance.
+DROP INDEX IF EXISTS image_embeddings_idx;
+DROP INDEX IF EXISTS idx_image_emb;
+
+ALTER TABLE image_embeddings
+    ALTER COLUMN emb TYPE halfvec(512) USING l2_normalize(emb)::halfvec(512);
+
+CREATE INDEX IF NOT EXISTS idx_image_emb
+    ON image_embeddings USING hnsw (emb halfvec_ip_ops);
@@ -89,11 +89,11 @@ CREATE EXTENSION IF NOT EXISTS vector;
 -- Image embeddings table for pgvector similarity search
 CREATE TABLE IF NOT EXISTS image_embeddings (
   image_id uuid PRIMARY KEY REFERENCES "image" (id) ON DELETE CASCADE,
-  emb vector(512)
+  emb halfvec(512)  -- L2-normalised, so inner product == cosine
 );
 
 -- Index for fast similarity search
-CREATE INDEX IF NOT EXISTS idx_image_emb ON image_embeddings USING ivfflat (emb vector_cosine_ops);
+CREATE INDEX IF NOT EXISTS idx_image_emb ON image_embeddings USING hnsw (emb halfvec_ip_ops);
 
 -- Public shares tracking table
 CREATE TABLE IF NOT EXISTS public_shares (
@@ -0,0 +1,22 @@
+"""Build the pgvector HNSW index on image_embeddings, sized to the table.
+
+Run after loading embeddings or when the table has grown into a new tier
+(drop idx_image_emb first to rebuild). The build is CONCURRENTLY, so the
+app can keep serving while it runs:
+
+    python -m scripts.build_hnsw_index
+"""
+
+from tortoise import run_async
+
+from app.db import init_db
+from app.services.vector_store import ensure_hnsw_index
+
+
+async def main():
+    await init_db()
+    await ensure_hnsw_index()
+
+
+if __name__ == '__main__':
+    run_async(main())
@@ -3,9 +3,9 @@ CREATE EXTENSION IF NOT EXISTS vector;
 
 CREATE TABLE IF NOT EXISTS image_embeddings (
     image_id UUID PRIMARY KEY REFERENCES images (id) ON DELETE CASCADE,
-    emb vector(512) NOT NULL
+    emb halfvec(512) NOT NULL  -- L2-normalised, so inner product == cosine
 );
 
--- IVFFlat index for cosine similarity
-CREATE INDEX IF NOT EXISTS image_embeddings_idx
-ON image_embeddings USING ivfflat (emb vector_cosine_ops) WITH (lists = 100);
\ No newline at end of file
+-- HNSW index for inner-product search over unit vectors (pgvector 0.7+)
+CREATE INDEX IF NOT EXISTS idx_image_emb
+ON image_embeddings USING hnsw (emb halfvec_ip_ops);
\ No newline at end of file
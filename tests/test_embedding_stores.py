@@ -0,0 +1,142 @@
+# tests/test_embedding_stores.py
+"""Round-trip and compaction of the on-disk int8/float16 embedding stores"""
+
+import hashlib
+import json
+
+import numpy as np
+import pytest
+
+from app.models.image import Image
+from app.models.user import User
+from app.routers import search
+from app.services import face_embeddings_store, image_embeddings_store
+
+USER = "user-1"
+
+
+@pytest.fixture
+def image_store(monkeypatch, tmp_path):
+    monkeypatch.setattr(image_embeddings_store, "BASE", tmp_path / "image_embeddings")
+    return image_embeddings_store
+
+
+@pytest.fixture
+def face_store(monkeypatch, tmp_path):
+    monkeypatch.setattr(face_embeddings_store, "BASE", tmp_path / "face_embeddings")
+    return face_embeddings_store
+
+
+def _vecs(n: int, dim: int = 16, seed: int = 0) -> np.ndarray:
+    return np.random.default_rng(seed).normal(size=(n, dim)).astype(np.float32)
+
+
+def _unit(v: np.ndarray) -> np.ndarray:
+    return v / np.linalg.norm(v)
+
+
+def _raw_rows(store) -> int:
+    stored = store._read(USER)
+    return 0 if stored is None else len(stored[1])
+
+
+def test_image_store_append_supersede_delete_reload(image_store):
+    a, b, b2, c = _vecs(4)
+    for image_id, v in (("a", a), ("b", b), ("c", c), ("b", b2)):
+        assert image_store.save_embedding(USER, image_id, v)
+    assert not image_store.save_embedding(USER, "d", np.ones(8, dtype=np.float32))
+
+    ids, Q, scale = image_store.load_embeddings(USER)
+    assert ids == ["a", "c", "b"]
+    deq = Q.astype(np.float32) * scale[:, None]
+    for row, v in zip(deq, (a, c, b2)):
+        np.testing.assert_allclose(row, _unit(v), atol=0.01)
+
+    image_store.delete_embeddings(USER, ["a"])
+    assert _raw_rows(image_store) == 2  # the delete rewrote out the stale "b" row too
+    ids, _, _ = image_store.load_embeddings(USER)
+    assert ids == ["c", "b"]
+
+
+def test_image_store_compacts_when_stale_rows_dominate(image_store):
+    vs = _vecs(6)
+    image_store.save_embedding(USER, "keep", vs[0])
+    for v in vs[1:]:
+        image_store.save_embedding(USER, "hot", v)
+    assert _raw_rows(image_store) == 6
+
+    ids, Q, scale = image_store.load_embeddings(USER)
+    assert ids == ["keep", "hot"]
+    assert _raw_rows(image_store) == 2
+    np.testing.assert_allclose(Q[1].astype(np.float32) * scale[1], _unit(vs[-1]), atol=0.01)
+
+
+def test_image_store_discards_interrupted_compaction(image_store):
+    a, b = _vecs(2)
+    image_store.save_embedding(USER, "a", a)
+    meta = image_store._paths(USER)[3]
+    meta.write_text(json.dumps({"dim": 16, "compacting": True}), encoding="utf-8")
+    assert image_store.load_embeddings(USER) is None
+
+    image_store.save_embedding(USER, "b", b)
+    ids, _, _ = image_store.load_embeddings(USER)
+    assert ids == ["b"]
+
+
+def test_face_store_append_supersede_delete_reload(face_store):
+    a, b, b2, c = _vecs(4, seed=1)
+    for face_id, v in (("a", a), ("b", b), ("c", c), ("b", b2)):
+        assert face_store.save_embedding(USER, face_id, v)
+    assert not face_store.save_embedding(USER, "d", np.ones(8, dtype=np.float32))
+
+    ids, E = face_store.load_embeddings(USER)
+    assert ids == ["a", "c", "b"]
+    assert E.dtype == np.float32
+    np.testing.assert_allclose(E, np.stack([a, c, b2]), rtol=1e-3, atol=1e-3)
+
+    face_store.delete_embeddings(USER, ["a"])
+    assert _raw_rows(face_store) == 2
+    ids, E = face_store.load_embeddings(USER)
+    assert ids == ["c", "b"]
+    np.testing.assert_allclose(E, np.stack([c, b2]), rtol=1e-3, atol=1e-3)
+
+
+def test_face_store_retain_drops_missing_faces(face_store):
+    vs = _vecs(3, seed=2)
+    for face_id, v in zip(("a", "b", "c"), vs):
+        face_store.save_embedding(USER, face_id, v)
+    face_store.save_embedding(USER, "a", vs[2])
+
+    face_store.retain_embeddings(USER, {"a", "c"})
+    assert _raw_rows(face_store) == 2
+    ids, E = face_store.load_embeddings(USER)
+    assert ids == ["c", "a"]
+    np.testing.assert_allclose(E[1], vs[2], rtol=1e-3, atol=1e-3)
+
+    # nothing to drop: the files are left alone
+    face_store.retain_embeddings(USER, {"a", "c", "z"})
+    assert _raw_rows(face_store) == 2
+
+
+@pytest.mark.asyncio
+async def test_search_ranks_from_store_and_fills_gaps(db_setup, image_store):
+    u = await User.create(email="stores@test.com", password_hash="test_hash", dek_encrypted_b64="test_dek")
+    vs = _vecs(5, seed=3)
+    imgs = []
+    for i, v in enumerate(vs):
+        imgs.append(await Image.create(
+            user=u,
+            storage_key=f"k{i}",
+            checksum_sha256=hashlib.sha256(f"k{i}".encode()).hexdigest(),
+            embedding_json=v.tolist(),
+        ))
+        if i < 3:  # the last two are only in the JSON column
+            image_store.save_embedding(str(u.id), str(imgs[-1].id), v)
+    image_store.save_embedding(str(u.id), "deleted-image", vs[4])
+
+    top = await search._rank_by_embedding(vs[4].tolist(), u.id, 3)
+    assert str(top[0][1].id) == str(imgs[4].id)
+    assert all(str(m.id) != "deleted-image" for _, m in top)
+
+    top = await search._rank_by_embedding(vs[1].tolist(), u.id, 10, exclude=imgs[1].id)
+    assert sorted(str(m.id) for _, m in top) == sorted(str(m.id) for m in imgs if m.id != imgs[1].id)
@@ -4,9 +4,15 @@
 import pytest
 from hypothesis import given, strategies as st
 from app.services.embeddings import text_embedding
-from app.services.encryption import new_data_key, fernet_from_dek
-from app.utils.math import safe_cosine, safe_normalize
+from app.services.encryption import (
+    new_data_key, fernet_from_dek, encrypt_blob, decrypt_blob, wrap_dek, unwrap_dek, _master,
+)
+from app.utils.math import safe_cosine, safe_normalize, topk_cosine, quantize_int8, topk_cosine_int8
 from app.utils.guard import in01
+from app.services.duplicates import (
+    calculate_hamming_distance, pack_phashes, hamming_distances, find_near_duplicates, is_near_duplicate,
+)
+from app.services.vector_store import InMemoryVectorStore
 
 
 @given(st.text(min_size=1, max_size=80))
@@ -22,6 +28,21 @@ def test_encrypt_roundtrip(b):
     assert f.decrypt(f.encrypt(b)) == b
 
 
+@given(st.binary(min_size=0, max_size=256))
+def test_blob_roundtrip_and_legacy(b):
+    """AES-GCM blobs roundtrip and legacy Fernet blobs still decrypt"""
+    dek = new_data_key()
+    assert decrypt_blob(dek, encrypt_blob(dek, b, b"user-1"), b"user-1") == b
+    assert decrypt_blob(dek, fernet_from_dek(dek).encrypt(b), b"user-1") == b
+
+
+def test_dek_wrap_roundtrip_and_legacy():
+    """AES-GCM DEK wraps roundtrip and legacy Fernet wraps still unwrap"""
+    dek = new_data_key()
+    assert unwrap_dek(wrap_dek(dek)) == dek
+    assert unwrap_dek(_master.encrypt(dek).decode()) == dek
+
+
 @given(st.lists(st.floats(min_value=-10, max_value=10), min_size=1, max_size=100))
 def test_safe_cosine_properties(vec):
     """Cosine similarity should be symmetric and bounded"""
@@ -37,6 +58,76 @@ def test_safe_cosine_properties(vec):
     assert -1.0 <= result <= 1.0
 
 
+@given(
+    st.lists(st.lists(st.floats(min_value=-10, max_value=10), min_size=4, max_size=4), min_size=1, max_size=30),
+    st.lists(st.floats(min_value=-10, max_value=10), min_size=4, max_size=4),
+    st.integers(min_value=1, max_value=10),
+)
+def test_topk_cosine_matches_safe_cosine(rows, q, k):
+    """Batched top-k should agree with the scalar cosine and be sorted"""
+    idx, scores = topk_cosine(rows, q, k)
+    assert len(idx) == min(k, len(rows))
+    assert all(scores[i] >= scores[i + 1] - 1e-6 for i in range(len(scores) - 1))
+    for i, s in zip(idx, scores):
+        if any(rows[i]) and any(q):
+            assert abs(safe_cosine(rows[i], q) - float(s)) < 1e-4
+
+
+@given(
+    st.lists(st.lists(st.integers(min_value=-100, max_value=100), min_size=8, max_size=8), min_size=1, max_size=30),
+    st.lists(st.integers(min_value=-100, max_value=100), min_size=8, max_size=8),
+)
+def test_topk_cosine_int8_close_to_float(rows, q):
+    """Int8-quantised scores stay within quantisation error of the exact cosine"""
+    Q, scale = quantize_int8(rows)
+    idx, scores = topk_cosine_int8(Q, scale, q, len(rows))
+    assert len(idx) == len(rows)
+    for i, s in zip(idx, scores):
+        if any(rows[i]) and any(q):
+            assert abs(safe_cosine(rows[i], q) - float(s)) < 0.02
+
+
+@given(
+    st.lists(st.integers(min_value=0, max_value=2**64 - 1), min_size=1, max_size=50),
+    st.integers(min_value=0, max_value=2**64 - 1),
+)
+def test_hamming_distances_match_scalar(db, q):
+    """Packed popcount agrees with the per-pair Hamming distance"""
+    hexes = [f"{h:016x}" for h in db]
+    dists = hamming_distances(f"{q:016x}", pack_phashes(hexes))
+    assert list(dists) == [calculate_hamming_distance(f"{q:016x}", h) for h in hexes]
+
+
+@given(
+    st.lists(st.integers(min_value=0, max_value=2**64 - 1), min_size=1, max_size=50),
+    st.integers(min_value=0, max_value=2**64 - 1),
+    st.integers(min_value=0, max_value=12),
+)
+def test_find_near_duplicates_match_scalar(db, q, t):
+    """Byte prefilter never drops a hash the scalar check accepts"""
+    hexes = [f"{h:016x}" for h in db]
+    found = find_near_duplicates(f"{q:016x}", pack_phashes(hexes), t)
+    assert list(found) == [i for i, h in enumerate(hexes) if is_near_duplicate(f"{q:016x}", h, t)]
+
+
+@given(
+    st.lists(st.lists(st.floats(min_value=-10, max_value=10), min_size=4, max_size=4), min_size=1, max_size=30),
+    st.lists(st.floats(min_value=-10, max_value=10), min_size=4, max_size=4),
+    st.integers(min_value=1, max_value=10),
+)
+def test_vector_store_search_sorted_by_cosine(rows, q, k):
+    """In-memory store returns ids ordered by cosine to the query"""
+    if not any(q):
+        return
+    store = InMemoryVectorStore()
+    for i, r in enumerate(rows):
+        store.add(i, r)
+    ids = store.search(q, top_k=k)
+    assert len(ids) == min(k, len(rows))
+    sims = [safe_cosine(rows[i], q) for i in ids]
+    assert all(sims[i] >= sims[i + 1] - 1e-4 for i in range(len(sims) - 1))
+
+
 @given(st.lists(st.floats(min_value=-10, max_value=10), min_size=1, max_size=100))
 def test_safe_normalize_properties(vec):
     """Normalized vectors should have unit length"""
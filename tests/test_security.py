@@ -0,0 +1,101 @@
+# tests/test_security.py
+"""HS256 access/share token minting and verification"""
+
+import base64
+import json
+import time
+
+import pytest
+from jose import jwt
+
+from app.config import settings
+from app.services import security
+
+SECRET_B = "another-jwt-secret-that-is-at-least-32-chars"
+
+
+@pytest.fixture(autouse=True)
+def _clear_access_cache():
+    security._access_cache.clear()
+    yield
+    security._access_cache.clear()
+
+
+def _b64(obj) -> str:
+    return base64.urlsafe_b64encode(json.dumps(obj).encode()).rstrip(b"=").decode()
+
+
+def test_access_token_roundtrips_with_jose():
+    tok = security.create_token("user-1")
+    claims = jwt.decode(tok, settings.JWT_SECRET, algorithms=["HS256"])
+    assert claims["sub"] == "user-1"
+    assert security._decode_access_token(tok) == "user-1"
+
+    # and tokens jose mints verify here
+    other = jwt.encode({"sub": "user-2", "exp": int(time.time()) + 60}, settings.JWT_SECRET, algorithm="HS256")
+    assert security._decode_access_token(other) == "user-2"
+
+
+def test_tampered_signature_rejected():
+    head, payload, sig = security.create_token("user-1").split(".")
+    forged = _b64({"sub": "admin", "exp": int(time.time()) + 60})
+    with pytest.raises(jwt.JWTError):
+        security._decode_access_token(f"{head}.{forged}.{sig}")
+    flipped = sig[:-2] + ("AA" if sig[-2:] != "AA" else "BB")
+    with pytest.raises(jwt.JWTError):
+        security._decode_access_token(f"{head}.{payload}.{flipped}")
+
+
+def test_alg_none_rejected():
+    tok = f"{_b64({'alg': 'none', 'typ': 'JWT'})}.{_b64({'sub': 'user-1', 'exp': int(time.time()) + 60})}."
+    with pytest.raises(jwt.JWTError):
+        security._decode_access_token(tok)
+
+
+def test_expired_past_leeway_rejected():
+    exp = int(time.time()) - security._ACCESS_LEEWAY - 5
+    tok = jwt.encode({"sub": "user-1", "exp": exp}, settings.JWT_SECRET, algorithm="HS256")
+    with pytest.raises(jwt.ExpiredSignatureError):
+        security._decode_access_token(tok)
+
+
+@pytest.mark.parametrize("tok", ["", "abc", "a.b", "a.b.c.d", "!!!.e30.sig", "e30.!!!.sig"])
+def test_malformed_rejected(tok):
+    with pytest.raises(jwt.JWTError):
+        security._decode_access_token(tok)
+
+
+def test_cache_never_serves_past_exp(monkeypatch):
+    now = time.time()
+    tok = jwt.encode({"sub": "user-1", "exp": int(now) + 5}, settings.JWT_SECRET, algorithm="HS256")
+    assert security._decode_access_token(tok) == "user-1"
+    assert tok in security._access_cache
+
+    later = int(now) + 5 + security._ACCESS_LEEWAY + 1
+    monkeypatch.setattr(security.time, "time", lambda: later)
+    with pytest.raises(jwt.ExpiredSignatureError):
+        security._decode_access_token(tok)
+
+
+def test_secret_change_takes_effect(monkeypatch):
+    old = security.create_token("user-1")
+    assert security._decode_access_token(old) == "user-1"
+
+    monkeypatch.setattr(settings, "JWT_SECRET", SECRET_B)
+    with pytest.raises(jwt.JWTError):
+        security._decode_access_token(old)
+    new = security.create_token("user-1")
+    assert jwt.decode(new, SECRET_B, algorithms=["HS256"])["sub"] == "user-1"
+
+
+def test_share_token_roundtrip_and_tamper():
+    tok = security.create_share_token("user-1", "album-1", hours=1)
+    data = security.decode_share_token(tok)
+    assert (data["sub"], data["alb"], data["typ"]) == ("user-1", "album-1", "share")
+
+    access = security.create_token("user-1")
+    with pytest.raises(jwt.JWTError):
+        security.decode_share_token(access)
+    head, payload, sig = tok.split(".")
+    with pytest.raises(jwt.JWTError):
+        security.decode_share_token(f"{head}.{_b64({'typ': 'share', 'sub': 'x', 'alb': 'y'})}.{sig}")
@@ -0,0 +1,91 @@
+# tests/test_upload.py
+"""Upload routes end to end against SQLite, with blob storage kept in memory"""
+
+import io
+
+import numpy as np
+import pytest
+from fastapi import FastAPI
+from httpx import AsyncClient
+from PIL import Image as PILImage
+
+from app.main import app
+from app.models.image import Image
+from app.models.user import User
+from app.routers import api as api_router
+from app.services import encryption, face_embeddings_store, image_embeddings_store
+from app.services.security import AuthUser, require_user
+
+
+class _MemStorage:
+    def __init__(self):
+        self.blobs = {}
+
+    async def save(self, user_id: str, filename: str, data: bytes) -> str:
+        key = f"{user_id}/{filename}"
+        self.blobs[key] = data
+        return key
+
+
+def _jpeg() -> bytes:
+    rng = np.random.default_rng(0)
+    px = np.kron(rng.integers(0, 255, (8, 12, 3)), np.ones((16, 16, 1))).astype("uint8")
+    buf = io.BytesIO()
+    PILImage.fromarray(px).save(buf, "JPEG")
+    return buf.getvalue()
+
+
+@pytest.fixture
+async def upload_user(db_setup, monkeypatch, tmp_path):
+    monkeypatch.setattr(image_embeddings_store, "BASE", tmp_path / "image_embeddings")
+    monkeypatch.setattr(face_embeddings_store, "BASE", tmp_path / "face_embeddings")
+    return await User.create(
+        email="upload@test.com",
+        password_hash="test_hash",
+        dek_encrypted_b64=encryption.wrap_dek(encryption.new_data_key()),
+    )
+
+
+async def _post_upload(target: FastAPI, user: User):
+    target.dependency_overrides[require_user] = lambda: AuthUser(str(user.id))
+    try:
+        async with AsyncClient(app=target, base_url="http://test") as ac:
+            files = {"file": ("photo.jpg", _jpeg(), "image/jpeg")}
+            return await ac.post("/images/upload", files=files)
+    finally:
+        target.dependency_overrides.pop(require_user, None)
+
+
+async def _assert_embedded(resp, user: User, mem: _MemStorage):
+    img = await Image.get(id=resp.json()["id"])
+    assert img.original_filename == "photo.jpg"
+    assert img.embedding_json is not None and len(img.embedding_json) == 512
+    assert img.storage_key in mem.blobs
+    assert image_embeddings_store.load_embeddings(str(user.id))[0] == [str(img.id)]
+
+
+@pytest.mark.asyncio
+async def test_api_upload_stores_embedding(upload_user, monkeypatch):
+    mem = _MemStorage()
+    monkeypatch.setattr(api_router, "storage", mem)
+
+    resp = await _post_upload(app, upload_user)
+
+    assert resp.status_code == 201, resp.text
+    await _assert_embedded(resp, upload_user, mem)
+
+
+@pytest.mark.asyncio
+async def test_images_upload_stores_embedding(upload_user, monkeypatch):
+    pytest.importorskip("deta")
+    from app.routers import images
+
+    mem = _MemStorage()
+    monkeypatch.setattr(images, "storage", mem)
+    target = FastAPI()
+    target.include_router(images.router)
+
+    resp = await _post_upload(target, upload_user)
+
+    assert resp.status_code == 200, resp.text
+    await _assert_embedded(resp, upload_user, mem)